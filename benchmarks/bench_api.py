@@ -0,0 +1,122 @@
+"""
+Load test of the HTTP API on localhost. Reports the requests per second of
+event dispatching over keep-alive connections, and the fan-out latency: the
+time from posting an event until the last of 500 server-sent event
+subscribers received it.
+
+The server runs in its own process. Run from project root:
+
+    python -m benchmarks.bench_api
+"""
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+
+from joseph.api import ApiServer
+from joseph.core import Joseph
+from joseph.events import EventBus
+
+CONNECTIONS = 20
+REQUESTS = 2000
+SUBSCRIBERS = 500
+FANOUT_EVENTS = 200
+
+
+def serve(ports) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    bus = EventBus(Joseph(loop))
+    bus.state.set_state('RUNNING')
+    server = ApiServer(bus, port=0)
+    loop.run_until_complete(server.start())
+
+    ports.send(server.port)
+    loop.run_forever()
+
+
+async def post(writer, reader, event: bytes, body: bytes = b'{}') -> None:
+    writer.write(b'POST /events/%s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n%s'
+                 % (event, len(body), body))
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+    await reader.readexactly(length)
+
+
+async def requests_per_second(port: int) -> float:
+    async def client():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for _ in range(REQUESTS // CONNECTIONS):
+            await post(writer, reader, b'bench:load')
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(CONNECTIONS)))
+    return REQUESTS / (time.perf_counter() - started)
+
+
+async def fanout(port: int) -> list:
+    received = {}
+
+    async def subscriber(ready):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /events?event=bench:fanout HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        await reader.readuntil(b'\r\n\r\n')
+        ready.set_result(None)
+
+        try:
+            while True:
+                chunk = await reader.readuntil(b'\n\n')
+                data = json.loads(chunk.split(b'data: ', 1)[1])['data']
+                received.setdefault(data['id'], []).append(time.time())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    loop = asyncio.get_event_loop()
+    ready = [loop.create_future() for _ in range(SUBSCRIBERS)]
+    subscribers = [loop.create_task(subscriber(future)) for future in ready]
+    await asyncio.gather(*ready)
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    latencies = []
+    for number in range(FANOUT_EVENTS):
+        sent = time.time()
+        await post(writer, reader, b'bench:fanout', json.dumps({'id': number}).encode('utf-8'))
+        while len(received.get(number, ())) < SUBSCRIBERS:
+            await asyncio.sleep(0)
+        latencies.append(max(received[number]) - sent)
+
+    writer.close()
+    for task in subscribers:
+        task.cancel()
+    await asyncio.gather(*subscribers, return_exceptions=True)
+    return latencies
+
+
+def main():
+    ports, child = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=serve, args=(child,), daemon=True)
+    server.start()
+    port = ports.recv()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        rps = loop.run_until_complete(requests_per_second(port))
+        latencies = sorted(loop.run_until_complete(fanout(port)))
+    finally:
+        server.terminate()
+
+    print("{:<36}{:>12,.0f}".format("requests/sec ({} connections)".format(CONNECTIONS), rps))
+    print("{:<36}{:>12.2f} ms".format("fan-out p50 ({} subscribers)".format(SUBSCRIBERS),
+                                      statistics.median(latencies) * 1000))
+    print("{:<36}{:>12.2f} ms".format("fan-out p99 ({} subscribers)".format(SUBSCRIBERS),
+                                      latencies[int(len(latencies) * 0.99) - 1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
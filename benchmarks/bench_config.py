@@ -0,0 +1,38 @@
+"""
+Compares reading the mutable config with reading its frozen snapshot, and
+reports the one-off cost of freezing. The last read is the one a worker
+does for every task it runs.
+
+Run from project root:
+
+    python -m benchmarks.bench_config
+"""
+import timeit
+
+from joseph.config import Config
+from joseph.core import CONFIG_SCHEMA
+
+READS = 1000000
+
+
+def main():
+    config = Config(DEBUG=True, WORKER_COUNT=4, THREAD_POOL_SIZE=4, PROCESS_POOL_SIZE=None,
+                    QUEUE_MAX_SIZE=10000, QUEUE_POLICY='drop_lowest', ENTITY_PATH='entities',
+                    ENTITY_WRITE_DELAY=1.0)
+    frozen = config.freeze(CONFIG_SCHEMA)
+
+    print("{:<24}{:>14}{:>14}".format("ns/operation", "Config", "FrozenConfig"))
+    for name, statement in (('config.KEY', 'c.WORKER_COUNT'), ("config['KEY']", "c['WORKER_COUNT']"),
+                            ('config.get(KEY)', "c.get('WORKER_COUNT')"), ('config.items()', 'c.items()'),
+                            ('config.keys()', 'c.keys()'), ('config.proxy', 'c.proxy'),
+                            ('per task', "c.get('LISTENER_TIMEOUT')")):
+        times = [min(timeit.repeat(statement, globals={'c': c}, number=READS, repeat=3)) / READS * 1e9
+                 for c in (config, frozen)]
+        print("{:<24}{:>14.1f}{:>14.1f}".format(name, *times))
+
+    freeze = min(timeit.repeat(lambda: config.freeze(CONFIG_SCHEMA), number=10000, repeat=3)) / 10000 * 1e6
+    print("{:<24}{:>14.1f} us".format("freeze (once)", freeze))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Ingesting a poll of 200 device updates from a hub: 200 ``dispatch`` calls
+against a single ``dispatch_many``, for a ``hub:*`` listener and for a
+listener registered with ``batch=True``. Measures the time from the first
+update until every listener task is queued, and the tasks queued.
+
+Run from project root:
+
+    python -m benchmarks.bench_dispatch_many
+"""
+import asyncio
+import timeit
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+
+UPDATES = 200
+POLLS = 500
+
+
+def listener(event):
+    pass
+
+
+def run(batch: bool, many: bool) -> tuple:
+    """ Returns the microseconds per poll and the tasks queued per poll """
+    loop = asyncio.new_event_loop()
+    joseph = Joseph(loop)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+    bus.listen('hub:*', batch=batch)(listener)
+
+    updates = [('hub:device{}'.format(device), {'state': 'on', 'level': device}) for device in range(UPDATES)]
+
+    def poll():
+        if many:
+            bus.dispatch_many(updates)
+        else:
+            for name, data in updates:
+                bus.dispatch(name, **data)
+        queued = joseph.queue.qsize()
+        joseph.queue.drain_nowait()
+        return queued
+
+    queued = poll()
+    elapsed = min(timeit.repeat(poll, number=POLLS, repeat=5)) / POLLS
+    loop.close()
+    return elapsed * 1e6, queued
+
+
+def main():
+    print("{} updates per poll".format(UPDATES))
+    for name, batch, many in (('dispatch', False, False), ('dispatch_many', False, True),
+                              ('dispatch, batch=True', True, False), ('dispatch_many, batch=True', True, True)):
+        elapsed, queued = run(batch, many)
+        print("{:<28}{:>10.0f} us {:>6} tasks".format(name, elapsed, queued))
+
+
+if __name__ == '__main__':
+    main()
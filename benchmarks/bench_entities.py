@@ -0,0 +1,111 @@
+"""
+Loading and saving a house of 5,000 entities: the whole database as a single
+YAML document with the pure Python and the C loader, and the entity store
+writing a single change to its journal compared with rewriting the document.
+Also shows how long the event loop is blocked by a compaction, written on
+the loop and in the executor.
+
+Run from project root:
+
+    python -m benchmarks.bench_entities
+"""
+import asyncio
+import shutil
+import tempfile
+import time
+
+import yaml
+
+from joseph.entities import Dumper, Entity, EntityStore, Loader
+
+ENTITIES = 5000
+CHANGES = 100
+
+
+def make_store(directory: str) -> EntityStore:
+    store = EntityStore(directory, asyncio.new_event_loop())
+    for number in range(ENTITIES):
+        store.put(Entity('sensors.{}'.format(number), 'sensor', 'sensors', {
+            'room': 'room {}'.format(number % 40),
+            'value': number * 0.5,
+            'unit': 'lux',
+            'battery': number % 100,
+            'tags': ['indoor', 'zigbee'],
+        }))
+    return store
+
+
+def timed(func: callable, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def blocked(store: EntityStore, save: callable) -> float:
+    """ Returns the longest the loop didn't get to a 1 ms ticker while :param save: ran, in seconds """
+    gaps = []
+
+    async def ticker():
+        previous = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - previous)
+            previous = now
+
+    async def run():
+        tick = store.loop.create_task(ticker())
+        await asyncio.sleep(0.01)
+        store.update('sensors.0', value=-1)
+        store.compact_every = 1
+        result = save()
+        if asyncio.iscoroutine(result):
+            await result
+        await asyncio.sleep(0.01)
+        tick.cancel()
+
+    store.loop.run_until_complete(run())
+    return max(gaps)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        store = make_store(directory)
+        store.compact()
+        with open(store.snapshot_path, 'rb') as file:
+            document = file.read()
+
+        print("{:<40}{:>10.1f} ms".format("load, pure Python SafeLoader",
+                                          timed(lambda: yaml.load(document, Loader=yaml.SafeLoader)) * 1000))
+        print("{:<40}{:>10.1f} ms".format("load, {}".format(Loader.__name__),
+                                          timed(lambda: yaml.load(document, Loader=Loader)) * 1000))
+        print("{:<40}{:>10.1f} ms".format("EntityStore.load",
+                                          timed(lambda: EntityStore(directory, store.loop).load()) * 1000))
+
+        def rewrite():
+            with open(store.snapshot_path + '.bench', 'w') as file:
+                yaml.dump([entity.to_dict() for entity in store], file, Dumper=Dumper)
+
+        def change():
+            for number in range(CHANGES):
+                store.update('sensors.{}'.format(number), value=number)
+                store.flush()
+
+        print("{:<40}{:>10.2f} ms".format("save, rewrite the document", timed(rewrite) * 1000))
+        print("{:<40}{:>10.2f} ms".format("save, one change to the journal", timed(change) / CHANGES * 1000))
+        print("{:<40}{:>10.3f} ms".format("find(type=..., room=...)",
+                                          timed(lambda: store.find(type='sensor', room='room 7')) * 1000))
+        print("{:<40}{:>10.1f} ms".format("loop blocked, compact on the loop", blocked(store, store.flush) * 1000))
+        print("{:<40}{:>10.1f} ms".format("loop blocked, compact in the executor",
+                                          blocked(store, store.save) * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
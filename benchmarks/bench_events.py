@@ -0,0 +1,63 @@
+"""
+Compares the memory footprint and construction speed of events with the
+``__dict__`` based events they replaced.
+
+Run from project root:
+
+    python -m benchmarks.bench_events
+"""
+import timeit
+import tracemalloc
+
+from joseph.events import Event, Namespace
+
+EVENTS = 100000
+
+
+class LegacyNamespace(object):
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def __str__(self):
+        return self.namespace
+
+
+class LegacyEvent(object):
+    def __init__(self, namespace, event="", strict=True, **data):
+        self.NAMESPACE = namespace
+        self.EVENT = event
+        self.STRICT = strict
+
+        self.__dict__.update(data)
+
+
+def make_legacy(i):
+    return LegacyEvent(LegacyNamespace("sensors"), "power", watts=i, meter="kitchen")
+
+
+def make_event(i):
+    return Event(Namespace("sensors"), "power", watts=i, meter="kitchen")
+
+
+def bytes_per_event(factory) -> float:
+    tracemalloc.start()
+    events = [factory(i) for i in range(EVENTS)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Subtract the list holding the events
+    return (size - len(events) * 8) / EVENTS
+
+
+def events_per_second(factory) -> float:
+    return EVENTS / min(timeit.repeat(lambda: [factory(i) for i in range(EVENTS)], number=1, repeat=5))
+
+
+def main():
+    print("{:<10}{:>16}{:>18}".format("event", "bytes/event", "events/sec"))
+    for name, factory in (('legacy', make_legacy), ('slots', make_event)):
+        print("{:<10}{:>16,.0f}{:>18,.0f}".format(name, bytes_per_event(factory), events_per_second(factory)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Latency of a light listener (ex: a light switch) while a heavy listener
+misbehaves: every heavy call hangs for a second. Compares the heavy listener
+sharing the queue with the light one, to the heavy listener having a lane
+of its own and a timeout.
+
+Run from project root:
+
+    python -m benchmarks.bench_isolation
+"""
+import asyncio
+import logging
+import statistics
+import time
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+
+WORKERS = 4
+SWITCHES = 200
+HEAVY_EVENTS = 50
+
+
+async def hang(event):
+    await asyncio.sleep(1)
+
+
+def run(isolated: bool) -> list:
+    loop = asyncio.new_event_loop()
+    joseph = Joseph(loop)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+    latencies = []
+
+    @bus.listen('lights:switch')
+    def switch(event):
+        latencies.append(time.perf_counter() - event.sent)
+
+    if isolated:
+        bus.listen('camera:frame', lane='heavy', timeout=0.2)(hang)
+    else:
+        bus.listen('camera:frame')(hang)
+
+    async def main():
+        joseph.resize_workers(WORKERS)
+        for _ in range(HEAVY_EVENTS):
+            bus.dispatch('camera:frame')
+        for _ in range(SWITCHES):
+            bus.dispatch('lights:switch', sent=time.perf_counter())
+            await asyncio.sleep(0.005)
+        await joseph.drain(30)
+        for worker in joseph.workers + joseph.lane_workers:
+            worker.cancel()
+        await asyncio.sleep(0)
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+    return sorted(latencies)
+
+
+def main():
+    # Every timeout is logged
+    logging.disable(logging.WARNING)
+
+    print("{:<28}{:>12}{:>12}".format("light listener latency", "p50", "p99"))
+    for name, isolated in (("shared queue", False), ("heavy lane + timeout", True)):
+        latencies = run(isolated)
+        print("{:<28}{:>9.2f} ms{:>9.2f} ms".format(name, statistics.median(latencies) * 1000,
+                                                    latencies[int(len(latencies) * 0.99) - 1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Listener calls for a noisy namespace: 1000 sensors each reporting 20 times,
+10 ms apart, to a single ``sensors:*`` listener without limits, debounced and
+throttled. Also compares scheduling a timer on the shared timer wheel with a
+``loop.call_later`` handle per timer.
+
+Run from project root:
+
+    python -m benchmarks.bench_limits
+"""
+import asyncio
+import time
+import timeit
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+from joseph.timers import TimerWheel
+
+SENSORS = 1000
+READINGS = 20
+TIMERS = 10000
+
+
+def run(**limit) -> tuple:
+    """ Returns the amount of listener calls and the seconds it took to dispatch and run them """
+    loop = asyncio.new_event_loop()
+    joseph = Joseph(loop)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+    calls = []
+
+    bus.listen('sensors:*', **limit)(calls.append)
+    events = ['sensors:{}'.format(sensor) for sensor in range(SENSORS)]
+
+    async def main():
+        joseph.resize_workers(1)
+        started = time.perf_counter()
+        for reading in range(READINGS):
+            for event in events:
+                bus.dispatch(event, value=reading)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        await joseph.drain(60)
+        elapsed = time.perf_counter() - started
+        for worker in joseph.workers:
+            worker.cancel()
+        await asyncio.sleep(0)
+        return len(calls), elapsed
+
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def timers() -> tuple:
+    """ Returns the nanoseconds it takes to schedule and drop a timer on the wheel and on the event loop """
+    loop = asyncio.new_event_loop()
+    wheel = TimerWheel(loop)
+
+    def schedule_wheel():
+        for _ in range(TIMERS):
+            wheel.call_later(0.05, None)
+        wheel.clear()
+
+    def schedule_loop():
+        handles = [loop.call_later(0.05, None) for _ in range(TIMERS)]
+        for handle in handles:
+            handle.cancel()
+
+    try:
+        return tuple(min(timeit.repeat(schedule, number=1, repeat=5)) / TIMERS * 1e9
+                     for schedule in (schedule_wheel, schedule_loop))
+    finally:
+        loop.close()
+
+
+def main():
+    print("{} events".format(SENSORS * READINGS))
+    for name, limit in (('no limit', {}), ('debounce=0.05', {'debounce': 0.05}), ('throttle=0.05', {'throttle': 0.05}),
+                        ('rate_limit=100', {'rate_limit': 100})):
+        calls, elapsed = run(**limit)
+        print("{:<24}{:>8} calls {:>10.3f} s".format(name, calls, elapsed))
+
+    wheel, loop = timers()
+    print("{:<24}{:>8.0f} ns".format("TimerWheel.call_later", wheel))
+    print("{:<24}{:>8.0f} ns".format("loop.call_later", loop))
+
+
+if __name__ == '__main__':
+    main()
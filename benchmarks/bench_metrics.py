@@ -0,0 +1,67 @@
+"""
+Measures what instrumentation costs: dispatching events to a listener and
+running the listener tasks on a worker, with metrics disabled and enabled.
+Also reports the cost of recording a single histogram value.
+
+Run from project root:
+
+    python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+import timeit
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+from joseph.metrics import Histogram
+
+EVENTS = 100000
+
+
+def listener(event):
+    pass
+
+
+def run(enabled: bool) -> float:
+    """ Returns the nanoseconds per event, from dispatching it until its listener ran """
+    loop = asyncio.new_event_loop()
+    joseph = Joseph(loop)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+    bus.listen('bench:event')(listener)
+    if enabled:
+        joseph.enable_metrics()
+
+    async def main():
+        joseph.resize_workers(1)
+        started = time.perf_counter_ns()
+        for _ in range(EVENTS):
+            bus.dispatch('bench:event')
+        await joseph.drain(60)
+        elapsed = time.perf_counter_ns() - started
+        for worker in joseph.workers:
+            worker.cancel()
+        await asyncio.sleep(0)
+        return elapsed / EVENTS
+
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def main():
+    disabled = min(run(False) for _ in range(5))
+    enabled = min(run(True) for _ in range(5))
+
+    histogram = Histogram()
+    record = min(timeit.repeat(lambda: histogram.record(123456), number=100000, repeat=5)) / 100000 * 1e9
+
+    print("{:<36}{:>10.0f} ns".format("event + listener, metrics disabled", disabled))
+    print("{:<36}{:>10.0f} ns".format("event + listener, metrics enabled", enabled))
+    print("{:<36}{:>10.0f} ns".format("overhead per event", enabled - disabled))
+    print("{:<36}{:>10.0f} ns".format("Histogram.record", record))
+
+
+if __name__ == '__main__':
+    main()
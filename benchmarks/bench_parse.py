@@ -0,0 +1,66 @@
+"""
+Measures turning event strings into events: the previous ``str.split``
+based parser against :func: `parse_event` with its cache, parsing strings
+that miss the cache, and a whole ``bus.dispatch('ns:event')`` to a single
+listener.
+
+Run from project root:
+
+    python -m benchmarks.bench_parse
+"""
+import asyncio
+import timeit
+
+from joseph.events import EventBus, Namespace, make_event_from_string, parse_event
+
+NUMBER = 200000
+
+
+class Counter(object):
+    """ Stands in for Joseph, counts the listener tasks instead of running them """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.tasks = 0
+
+    def add_task_nowait(self, task, *args, **kwargs):
+        self.tasks += 1
+
+
+def legacy(event, **data):
+    namespace, event = event.split(":")
+    namespace = Namespace(namespace)
+
+    return namespace.make_event(event, **data)
+
+
+def listener(event):
+    pass
+
+
+def nanoseconds(func: callable, number: int = NUMBER) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    print("{:<36}{:>8.0f} ns".format("split, without data", nanoseconds(lambda: legacy('lights:on'))))
+    print("{:<36}{:>8.0f} ns".format("parse_event, without data", nanoseconds(lambda: make_event_from_string(
+        'lights:on'))))
+    print("{:<36}{:>8.0f} ns".format("split, with data", nanoseconds(lambda: legacy('lights:on', room='hall'))))
+    print("{:<36}{:>8.0f} ns".format("parse_event, with data", nanoseconds(lambda: make_event_from_string(
+        'lights:on', room='hall'))))
+
+    names = iter(['house.room{}:light.on'.format(number) for number in range(6 * NUMBER)])
+    print("{:<36}{:>8.0f} ns".format("parse_event, cache miss", nanoseconds(lambda: parse_event(next(names)))))
+
+    loop = asyncio.new_event_loop()
+    bus = EventBus(Counter(loop))
+    bus.state.set_state('RUNNING')
+    bus.listen('house.*:light.*')(listener)
+    print("{:<36}{:>8.0f} ns".format("dispatch house.kitchen:light.on", nanoseconds(lambda: bus.dispatch(
+        'house.kitchen:light.on', level=3))))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Measures the cost of running a plugin in a sandbox: the transport of a single
+event through a shared ring, and the round trip of an event to a sandboxed
+plugin dispatching a reply, compared with the same plugin loaded in process.
+
+Run from project root:
+
+    python -m benchmarks.bench_sandbox
+"""
+import asyncio
+import datetime
+import os
+import shutil
+import tempfile
+import time
+import timeit
+
+from joseph.codec import encode_event
+from joseph.core import Joseph
+from joseph.events import Event, EventBus, Namespace
+from joseph.plugins import PluginLoader
+from joseph.sandbox import SharedRing
+
+EVENTS = 20000
+
+PLUGIN = """
+EVENTS = ['ping:*']
+SANDBOX = {sandbox}
+
+
+def setup(bus):
+    @bus.listen('ping:request')
+    def request(event):
+        bus.dispatch('pong:reply', value=event.value)
+"""
+
+
+def transport() -> float:
+    """ Returns the microseconds to encode, write, signal, read and decode an event """
+    ring = SharedRing(size=1024 * 1024)
+    reader, writer = os.pipe()
+
+    event = Event(Namespace("sensors"), "power", watts=1, meter="kitchen")
+    event.dispatched_at = datetime.datetime.now()
+
+    def once():
+        ring.write(encode_event(event))
+        os.write(writer, b'\0')
+        os.read(reader, 4096)
+        for _ in ring.read():
+            pass
+
+    try:
+        return min(timeit.repeat(once, number=EVENTS, repeat=5)) / EVENTS * 1e6
+    finally:
+        os.close(reader)
+        os.close(writer)
+        ring.close(unlink=True)
+
+
+def round_trip(sandbox: bool) -> float:
+    """ Returns the microseconds per request and reply with the plugin in or out of process """
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, 'echo.py'), 'w') as file:
+        file.write(PLUGIN.format(sandbox=sandbox))
+
+    loop = asyncio.new_event_loop()
+    joseph = Joseph(loop)
+    joseph.queue.limit(0)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+    joseph.workers = [loop.create_task(joseph.worker()) for _ in range(2)]
+
+    replies = []
+    done = asyncio.Event()
+
+    @bus.listen('pong:reply')
+    def reply(event):
+        replies.append(event.value)
+        if len(replies) == EVENTS:
+            done.set()
+
+    loader = PluginLoader(bus, directory)
+    loader.scan()
+    loader.load('echo')
+
+    async def run():
+        started = time.perf_counter()
+        for value in range(EVENTS):
+            bus.dispatch('ping:request', value=value)
+            if not value % 100:
+                await asyncio.sleep(0)
+        await asyncio.wait_for(done.wait(), 60)
+        return (time.perf_counter() - started) / EVENTS * 1e6
+
+    try:
+        return loop.run_until_complete(run())
+    finally:
+        loader.unload('echo')
+        for worker in joseph.workers:
+            worker.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        shutil.rmtree(directory)
+
+
+def main():
+    print("{:<24}{:>12,.1f} us".format("transport", transport()))
+    for name, sandbox in (('in process', False), ('sandboxed', True)):
+        print("{:<24}{:>12,.1f} us".format("round trip, " + name, round_trip(sandbox)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares the throughput of Joseph's scheduler with the janus priority queue
+it replaced, with 1, 10 and 100 concurrent producers feeding 4 workers.
+
+Run from project root (janus is only needed for the comparison):
+
+    pip install janus
+    python -m benchmarks.bench_scheduler
+"""
+import asyncio
+import itertools
+import time
+
+from joseph.scheduler import Scheduler
+
+try:
+    import janus
+except ImportError:
+    janus = None
+
+TASKS = 100000
+WORKERS = 4
+PRODUCERS = (1, 10, 100)
+
+
+class SchedulerQueue(object):
+    def __init__(self):
+        self.queue = Scheduler(asyncio.get_event_loop())
+
+    async def put(self, item, priority):
+        self.queue.put_nowait(item, priority)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class JanusQueue(object):
+    def __init__(self):
+        self.queue = janus.PriorityQueue()
+        self.counter = itertools.count()
+
+    async def put(self, item, priority):
+        # The sequence number prevents the items from being compared
+        await self.queue.async_q.put((priority, next(self.counter), item))
+
+    async def get(self):
+        return (await self.queue.async_q.get())[2]
+
+
+async def run(queue_class, producers: int) -> float:
+    queue = queue_class()
+    per_producer = TASKS // producers
+    total = per_producer * producers
+    done = asyncio.get_event_loop().create_future()
+    consumed = 0
+
+    async def producer(offset):
+        for i in range(per_producer):
+            await queue.put(i, (offset + i) % 10)
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+
+    async def worker():
+        nonlocal consumed
+        while True:
+            await queue.get()
+            consumed += 1
+            if consumed == total:
+                done.set_result(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(WORKERS)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[producer(offset) for offset in range(producers)])
+    await done
+    elapsed = time.perf_counter() - start
+
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+    return total / elapsed
+
+
+def main():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    queues = [('scheduler', SchedulerQueue)]
+    if janus is not None:
+        queues.append(('janus', JanusQueue))
+
+    print("{:<12}{:>12}{:>16}".format("queue", "producers", "tasks/sec"))
+    for producers in PRODUCERS:
+        for name, queue_class in queues:
+            rate = loop.run_until_complete(run(queue_class, producers))
+            print("{:<12}{:>12}{:>16,.0f}".format(name, producers, rate))
+
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
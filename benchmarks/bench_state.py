@@ -0,0 +1,90 @@
+"""
+Listener calls for a house of 50 sensors, each reporting its temperature
+400 times with a little noise on a slowly drifting value. The automations
+either listen to the raw sensor events, or to the ``state_changed`` events
+of a :class: `StateCache` with a deadband of 0.5 degrees. Also reports the
+cost of a state read.
+
+Run from project root:
+
+    python -m benchmarks.bench_state
+"""
+import asyncio
+import random
+import time
+import timeit
+
+from joseph.events import EventBus
+from joseph.state import StateCache
+
+SENSORS = 50
+READINGS = 400
+AUTOMATIONS = 5
+
+
+class Counter(object):
+    """ Stands in for Joseph, counts the listener tasks instead of running them """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.tasks = 0
+
+    def add_task_nowait(self, task, *args, **kwargs):
+        self.tasks += 1
+
+
+def automation(event):
+    pass
+
+
+def run(derived: bool) -> tuple:
+    """ Returns the amount of listener calls and the microseconds per dispatch """
+    loop = asyncio.new_event_loop()
+    joseph = Counter(loop)
+    bus = EventBus(joseph)
+    bus.state.set_state('RUNNING')
+
+    if derived:
+        state = StateCache(bus)
+        state.track('sensors', deadband=0.5)
+        event = 'sensors:state_changed'
+    else:
+        event = 'sensors:*'
+    for _ in range(AUTOMATIONS):
+        bus.listen(event)(automation)
+
+    generator = random.Random(42)
+    readings = [('sensors:{}'.format(sensor), round(20 + reading / 100 + generator.uniform(-0.3, 0.3), 1))
+                for reading in range(READINGS) for sensor in range(SENSORS)]
+
+    started = time.perf_counter()
+    for name, temperature in readings:
+        bus.dispatch(name, temperature=temperature)
+    elapsed = time.perf_counter() - started
+
+    loop.close()
+    return joseph.tasks, elapsed / len(readings) * 1e6
+
+
+def main():
+    raw, raw_elapsed = run(False)
+    derived, derived_elapsed = run(True)
+
+    print("{} events, {} automations".format(SENSORS * READINGS, AUTOMATIONS))
+    print("{:<28}{:>8} calls {:>8.2f} us per event".format("raw events", raw, raw_elapsed))
+    print("{:<28}{:>8} calls {:>8.2f} us per event".format("state_changed, deadband 0.5", derived, derived_elapsed))
+    print("{:<28}{:>8.0%}".format("calls saved", 1 - derived / raw))
+
+    loop = asyncio.new_event_loop()
+    bus = EventBus(Counter(loop))
+    bus.state.set_state('RUNNING')
+    state = StateCache(bus)
+    state.track('sensors')
+    bus.dispatch('sensors:kitchen', temperature=20)
+    read = min(timeit.repeat(lambda: state.get('sensors', 'kitchen', 'temperature'), number=100000, repeat=5))
+    print("{:<28}{:>8.0f} ns".format("StateCache.get", read / 100000 * 1e9))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,17 @@ import os
 DEBUG = True
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 WORKER_COUNT = 2
+CONFIG_WATCH = True
+METRICS = False
+THREAD_POOL_SIZE = 4
+PROCESS_POOL_SIZE = None
+QUEUE_MAX_SIZE = 10000
+QUEUE_POLICY = 'drop_lowest'
+ENTITY_PATH = os.path.join(APP_ROOT, 'entities')
+ENTITY_WRITE_DELAY = 1.0
+SHUTDOWN_TIMEOUT = 10.0
+LISTENER_TIMEOUT = 30.0
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+LANES = {}
+PENDING_TASKS_PATH = os.path.join(APP_ROOT, 'pending_tasks.pickle')
@@ -0,0 +1,439 @@
+"""
+HTTP API running on the event loop of Joseph, so external tools can reach the
+event bus without importing Joseph.
+
+    POST /events/<namespace>:<event>    dispatches the event, the body is an optional JSON object of data
+    GET  /metrics                       the metrics of Joseph in the Prometheus text format, when enabled
+    GET  /events?event=<pattern>        streams events as server-sent events, or over a WebSocket when
+                                        the request asks for an upgrade. Patterns are the ones accepted by
+                                        :meth: `EventBus.listen`, ``event`` can be repeated, all events are
+                                        streamed when it's left out.
+
+Connections are kept alive unless the client asks otherwise. Every streaming
+client has a bounded queue of pending events, a client that doesn't keep up
+is either disconnected or loses its oldest pending events, see
+:class: `Subscriber`.
+"""
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import logging
+import struct
+import urllib.parse
+
+from .events import parse_event
+from .exceptions import HttpError, InvalidEvent, JosephException
+from .listeners import Listener, ListenerIndex, WILDCARD
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT = 'disconnect'
+DROP = 'drop'
+POLICIES = (DISCONNECT, DROP)
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+STATUS = {
+    101: 'Switching Protocols',
+    200: 'OK',
+    202: 'Accepted',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    501: 'Not Implemented',
+    503: 'Service Unavailable',
+}
+
+
+class Request(object):
+    __slots__ = ('method', 'path', 'query', 'version', 'headers')
+
+    def __init__(self, method: str, path: str, query: dict, version: str, headers: dict):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = headers
+
+    @classmethod
+    def parse(cls, head: bytes) -> 'Request':
+        """ Parses the request line and headers, header names are lower cased """
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ')
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            raise HttpError(400)
+
+        if not version.startswith('HTTP/1.'):
+            raise HttpError(400, "Unsupported protocol {}".format(version))
+
+        url = urllib.parse.urlsplit(target)
+        return cls(method, urllib.parse.unquote(url.path), urllib.parse.parse_qs(url.query), version, headers)
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    @property
+    def websocket(self) -> bool:
+        return self.headers.get('upgrade', '').lower() == 'websocket'
+
+
+class Message(object):
+    """ An event encoded once for every subscriber, the frames of each protocol are built on first use """
+    __slots__ = ('name', 'text', '_sse', '_websocket')
+
+    def __init__(self, event):
+        self.name = str(event)
+        self.text = json.dumps({
+            'namespace': str(event.NAMESPACE),
+            'event': event.EVENT,
+            'data': dict(event.data),
+            'dispatched_at': event.dispatched_at.isoformat() if event.dispatched_at is not None else None,
+        }, separators=(',', ':'), default=str)
+
+    def sse(self) -> bytes:
+        try:
+            return self._sse
+        except AttributeError:
+            self._sse = 'event: {}\ndata: {}\n\n'.format(self.name, self.text).encode('utf-8')
+            return self._sse
+
+    def websocket(self) -> bytes:
+        try:
+            return self._websocket
+        except AttributeError:
+            self._websocket = websocket_frame(self.text.encode('utf-8'))
+            return self._websocket
+
+
+def websocket_frame(payload: bytes, opcode: int = OPCODE_TEXT) -> bytes:
+    """ Returns an unmasked, final server frame """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+    return header + payload
+
+
+async def read_websocket_frame(reader: asyncio.StreamReader, max_size: int) -> tuple:
+    """ Reads a single client frame, returns its opcode and unmasked payload """
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+
+    if length > max_size:
+        raise HttpError(413)
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+    return opcode, payload
+
+
+class Subscriber(object):
+    """
+    The pending events of a single streaming client.
+
+    At most :param limit: events are kept. When a new event doesn't fit, the
+    DISCONNECT policy closes the subscription and the DROP policy drops the
+    oldest pending event.
+    """
+
+    def __init__(self, limit: int = 1000, policy: str = DISCONNECT):
+        self.limit = limit
+        self.policy = policy
+
+        self.pending = collections.deque()
+        self.waiter = None
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, message: Message) -> None:
+        if self.closed:
+            return
+
+        if len(self.pending) >= self.limit:
+            self.dropped += 1
+            if self.policy == DISCONNECT:
+                self.close()
+                return
+            self.pending.popleft()
+
+        self.pending.append(message)
+        self._wakeup()
+
+    async def get(self) -> list:
+        """ Waits for events and returns all pending ones, an empty list once closed """
+        while not self.pending and not self.closed:
+            self.waiter = asyncio.get_event_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+
+        if self.closed:
+            return []
+
+        messages = list(self.pending)
+        self.pending.clear()
+        return messages
+
+    def close(self) -> None:
+        self.closed = True
+        self.pending.clear()
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+class ApiServer(object):
+    """
+    Serves the HTTP API for :param bus: on :param host: and :param port:.
+
+    Dispatched events reach streaming clients through a single sink on the
+    event bus, every event is encoded once no matter the amount of clients.
+    See :class: `Subscriber` for :param max_pending: and :param policy:.
+    """
+
+    def __init__(self, bus, host: str = '127.0.0.1', port: int = 8080, max_pending: int = 1000,
+                 policy: str = DISCONNECT, max_body: int = 1024 * 1024):
+        if policy not in POLICIES:
+            raise ValueError("Policy should be one of {}, got '{}' instead".format(POLICIES, policy))
+
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.policy = policy
+        self.max_body = max_body
+
+        self.server = None
+        self.subscriptions = ListenerIndex()
+        self.connections = set()
+
+        bus.add_sink(self.publish)
+
+    async def start(self) -> None:
+        """ Starts listening on the event loop of Joseph """
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=64 * 1024)
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """ Stops listening and closes every open connection """
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.connections):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def publish(self, event) -> None:
+        """ The event bus sink, hands the event to every client streaming it """
+        listeners = self.subscriptions.get(str(event.NAMESPACE), event.EVENT)
+        if not listeners:
+            return
+
+        # Every client has a single listener, the index returns it once for an event matching several patterns
+        message = Message(event)
+        for listener in listeners:
+            listener.func(message)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Serves the requests on a single connection """
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {'error': STATUS[413]}, False)
+                    return
+
+                try:
+                    request = Request.parse(head)
+                    if request.method == 'GET' and request.path == '/events':
+                        await self._stream(request, reader, writer)
+                        return
+                    status, body = await self._route(request, reader)
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e) or STATUS[e.status]}, False)
+                    return
+
+                await self._respond(writer, status, body, request.keep_alive)
+                if not request.keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _route(self, request: Request, reader: asyncio.StreamReader) -> tuple:
+        """ Handles a regular request, returns the status and the body of the response """
+        if 'transfer-encoding' in request.headers:
+            raise HttpError(501, "Chunked request bodies are not supported")
+
+        try:
+            length = int(request.headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HttpError(413)
+        body = await reader.readexactly(length) if length else b''
+
+        if request.path == '/metrics':
+            if request.method != 'GET':
+                raise HttpError(405)
+            metrics = getattr(self.bus.joseph, 'metrics', None)
+            if metrics is None:
+                raise HttpError(404, "Metrics are disabled")
+            return 200, metrics.prometheus()
+
+        if not request.path.startswith('/events/'):
+            raise HttpError(404)
+        if request.method != 'POST':
+            raise HttpError(405)
+
+        return self._dispatch(request.path[len('/events/'):], body)
+
+    def _dispatch(self, name: str, body: bytes) -> tuple:
+        """ Dispatches event :param name: with the JSON object in :param body: as data """
+        if name.count(':') != 1:
+            return 400, {'error': "Events are named '<namespace>:<event>'"}
+
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            return 400, {'error': "The body should be a JSON object"}
+        if not isinstance(data, dict):
+            return 400, {'error': "The body should be a JSON object"}
+
+        try:
+            self.bus.dispatch(name, **data)
+        except InvalidEvent as e:
+            return 400, {'error': str(e)}
+        except JosephException as e:
+            return 503, {'error': str(e)}
+
+        return 202, {'dispatched': name}
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body, keep_alive: bool) -> None:
+        """ Writes a response, :param body: is either a dict sent as JSON or plain text """
+        if isinstance(body, str):
+            payload, content_type = body.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            payload, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n'
+                     'Connection: {}\r\n\r\n'.format(status, STATUS[status], content_type, len(payload),
+                                                     'keep-alive' if keep_alive else 'close').encode('latin-1'))
+        writer.write(payload)
+        await writer.drain()
+
+    @staticmethod
+    def _patterns(request: Request) -> list:
+        """ Returns the ``(namespace, event)`` patterns to stream, validated the way :meth: `EventBus.listen` does """
+        patterns = []
+        for pattern in request.query.get('event') or (WILDCARD,):
+            try:
+                namespace, event, _, _ = parse_event(pattern)
+            except InvalidEvent as e:
+                raise HttpError(400, str(e))
+            patterns.append((str(namespace), event or WILDCARD))
+
+        return patterns
+
+    async def _stream(self, request: Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Streams events to the client until it disconnects or falls behind """
+        patterns = self._patterns(request)
+        websocket = request.websocket
+        if websocket:
+            key = request.headers.get('sec-websocket-key')
+            if not key or request.headers.get('sec-websocket-version') != '13':
+                raise HttpError(400, "Invalid WebSocket handshake")
+
+            accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + WEBSOCKET_GUID).digest())
+            writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                         b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        else:
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                         b'Connection: close\r\n\r\n')
+
+        subscriber = Subscriber(self.max_pending, self.policy)
+        listener = Listener(subscriber.push, owner=subscriber)
+        for namespace, event in patterns:
+            self.subscriptions.add(namespace, event, listener)
+
+        client = asyncio.ensure_future(self._read_client(reader, writer, subscriber, websocket))
+        try:
+            while True:
+                messages = await subscriber.get()
+                if not messages:
+                    break
+
+                if websocket:
+                    writer.write(b''.join(message.websocket() for message in messages))
+                else:
+                    writer.write(b''.join(message.sse() for message in messages))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscriptions.remove(owner=subscriber)
+            client.cancel()
+
+        if subscriber.dropped:
+            logger.info("Streaming client %s fell behind, dropped %d events",
+                        writer.get_extra_info('peername'), subscriber.dropped)
+
+    async def _read_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           subscriber: Subscriber, websocket: bool) -> None:
+        """ Answers the control frames of the client and ends the stream once the client is gone """
+        try:
+            if not websocket:
+                while await reader.read(4096):
+                    pass
+                return
+
+            while True:
+                opcode, payload = await read_websocket_frame(reader, self.max_body)
+                if opcode == OPCODE_CLOSE:
+                    writer.write(websocket_frame(payload[:2], OPCODE_CLOSE))
+                    return
+                if opcode == OPCODE_PING:
+                    writer.write(websocket_frame(payload, OPCODE_PONG))
+        except (asyncio.IncompleteReadError, ConnectionError, HttpError):
+            pass
+        finally:
+            subscriber.close()
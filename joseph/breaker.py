@@ -0,0 +1,49 @@
+import time
+
+
+class CircuitBreaker(object):
+    """
+    Takes a listener out of rotation after :param threshold: timeouts in a
+    row. While open, its tasks are skipped for :param cooldown: seconds.
+    After that a single task is let through as a trial: when it finishes in
+    time the breaker closes, when it times out the breaker opens again.
+    """
+    __slots__ = ('threshold', 'cooldown', 'failures', 'opened_at', 'trial_at', 'skipped')
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+        self.skipped = 0
+
+    @property
+    def open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self, now: float = None) -> bool:
+        """ Returns whether a task may run, counts the ones that may not """
+        if self.opened_at is None:
+            return True
+
+        now = time.monotonic() if now is None else now
+        # A trial that never reported back (ex: it was dropped from the queue) expires with the cooldown
+        if now - self.opened_at >= self.cooldown and (self.trial_at is None or now - self.trial_at >= self.cooldown):
+            self.trial_at = now
+            return True
+
+        self.skipped += 1
+        return False
+
+    def failure(self, now: float = None) -> bool:
+        """ Records a timeout, returns whether the breaker (re)opened because of it """
+        self.failures += 1
+        trial, self.trial_at = self.trial_at, None
+        if self.failures < self.threshold:
+            return False
+
+        # Tasks queued before the breaker opened can still time out, they only extend the cooldown
+        opened = self.opened_at is None or trial is not None
+        self.opened_at = time.monotonic() if now is None else now
+        return opened
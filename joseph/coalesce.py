@@ -0,0 +1,83 @@
+import datetime
+
+LAST = 'last'
+MERGE = 'merge'
+COLLECT = 'collect'
+
+MODES = (LAST, MERGE, COLLECT)
+
+
+class Coalescer(object):
+    """
+    Collapses all events of a single event type dispatched within a time
+    window into one batched event, so listeners of noisy event sources are
+    scheduled once per window instead of once per event.
+
+    The first event of a window opens it, when the window closes the
+    collected events are dispatched as a single event. The ``COALESCED``
+    attribute of that event holds the amount of events it represents.
+
+    Modes:
+        LAST: only the data of the last event is kept
+        MERGE: the data of all events is merged, later values win
+        COLLECT: the data of every event is collected in the ``events`` list
+
+    When a :param key: is provided, events are grouped by the value of that
+    data key, ex: ``key='sensor'`` keeps one batch per sensor.
+    """
+
+    def __init__(self, bus, event, mode: str = LAST, window: float = 0.1, key: str = None):
+        if mode not in MODES:
+            raise ValueError("Coalesce mode should be one of {}, got '{}' instead".format(MODES, mode))
+
+        self.bus = bus
+        self.event = event
+        self.mode = mode
+        self.window = window
+        self.key = key
+
+        self.batches = {}
+        self.handle = None
+
+    def add(self, data: dict) -> None:
+        """ Adds the data of a single dispatch to its batch """
+        batch_key = data.get(self.key) if self.key else None
+
+        try:
+            batch = self.batches[batch_key]
+        except KeyError:
+            batch = self.batches[batch_key] = [0, [] if self.mode == COLLECT else {}]
+
+        batch[0] += 1
+        if self.mode == LAST:
+            batch[1] = data
+        elif self.mode == MERGE:
+            batch[1].update(data)
+        else:
+            batch[1].append(data)
+
+        if self.handle is None:
+            self.handle = self.bus.joseph.loop.call_later(self.window, self.flush)
+
+    def flush(self) -> None:
+        """ Dispatches every pending batch and closes the current window """
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        batches, self.batches = self.batches, {}
+        dispatched_at = datetime.datetime.now()
+
+        for count, data in batches.values():
+            if self.mode == COLLECT:
+                data = {'events': data}
+
+            event = type(self.event).from_data(self.event.NAMESPACE, self.event.EVENT, data)
+            event.COALESCED = count
+            event.dispatched_at = dispatched_at
+
+            self.bus._dispatch(event)
+
+    def __len__(self) -> int:
+        """ Returns the amount of events waiting to be dispatched """
+        return sum(count for count, _ in self.batches.values())
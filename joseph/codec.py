@@ -0,0 +1,145 @@
+"""
+Compact binary representation of events, shared by everything that moves
+events out of the process (ex: the event log).
+
+Every record is laid out as:
+
+    length    uint32   length of the body
+    checksum  uint32   CRC32 of the body
+    body:
+        timestamp         float64  POSIX timestamp of ``dispatched_at``, NaN if not dispatched
+        namespace length  uint16
+        event length      uint16
+        namespace         utf-8
+        event             utf-8
+        data              utf-8 JSON
+
+Values JSON has no type for are stored as an object with a single tag key
+(ex: ``{"__datetime__": "2017-01-01T00:00:00"}``) and come back as the type
+they were: tuples, sets, frozensets, bytes, datetimes, dates and times. Any
+other value JSON cannot represent is stored as its string representation, and
+a dict holding nothing but one of the tag keys comes back as the tagged type.
+"""
+import base64
+import datetime
+import json
+import math
+import struct
+import zlib
+
+from .events import Event, Namespace
+
+HEADER = struct.Struct('<II')
+BODY = struct.Struct('<dHH')
+
+TUPLE = '__tuple__'
+SET = '__set__'
+FROZENSET = '__frozenset__'
+BYTES = '__bytes__'
+DATETIME = '__datetime__'
+DATE = '__date__'
+TIME = '__time__'
+
+_CONTAINERS = frozenset((tuple, list, dict))
+
+_DECODERS = {
+    TUPLE: tuple,
+    SET: set,
+    FROZENSET: frozenset,
+    BYTES: base64.b64decode,
+    DATETIME: datetime.datetime.fromisoformat,
+    DATE: datetime.date.fromisoformat,
+    TIME: datetime.time.fromisoformat,
+}
+
+
+def _tag(value):
+    """ The tagged form of the values JSON has no type for, called by ``json.dumps`` """
+    # Checked before date, a datetime is a date
+    if isinstance(value, datetime.datetime):
+        return {DATETIME: value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {DATE: value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {TIME: value.isoformat()}
+    if isinstance(value, frozenset):
+        return {FROZENSET: [_tag_tuples(item) for item in value]}
+    if isinstance(value, set):
+        return {SET: [_tag_tuples(item) for item in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {BYTES: base64.b64encode(value).decode('ascii')}
+    return str(value)
+
+
+def _tag_tuples(value):
+    """ Tags the tuples within :param value:, ``json.dumps`` writes them as lists otherwise """
+    kind = type(value)
+    if kind is tuple:
+        return {TUPLE: [_tag_tuples(item) for item in value]}
+    if kind is list:
+        return [_tag_tuples(item) for item in value]
+    if kind is dict:
+        return {key: _tag_tuples(item) for key, item in value.items()}
+    return value
+
+
+def _untag(value: dict):
+    """ Turns tagged objects back into their type, called by ``json.loads`` for every object """
+    if len(value) == 1:
+        for key, item in value.items():
+            decoder = _DECODERS.get(key)
+            if decoder is not None:
+                return decoder(item)
+    return value
+
+
+def encode_event(event: Event) -> bytes:
+    """ Returns the record for :param event: """
+    namespace = str(event.NAMESPACE).encode('utf-8')
+    name = event.EVENT.encode('utf-8')
+    data = b''
+    if event.data:
+        values = dict(event.data)
+        # Only data holding containers can hold tuples
+        if not _CONTAINERS.isdisjoint(map(type, values.values())):
+            values = _tag_tuples(values)
+        data = json.dumps(values, separators=(',', ':'), default=_tag).encode('utf-8')
+    timestamp = event.dispatched_at.timestamp() if event.dispatched_at is not None else math.nan
+
+    body = b''.join((BODY.pack(timestamp, len(namespace), len(name)), namespace, name, data))
+    return HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_event(buffer, offset: int = 0) -> tuple:
+    """
+    Decodes the record starting at :param offset: of :param buffer:, returns the
+    event and the offset of the next record. Returns ``(None, offset)`` when the
+    record is incomplete or corrupt, which is what a torn write looks like.
+    """
+    end = offset + HEADER.size
+    if end > len(buffer):
+        return None, offset
+
+    length, checksum = HEADER.unpack_from(buffer, offset)
+    if length < BODY.size or end + length > len(buffer):
+        return None, offset
+
+    body = buffer[end:end + length]
+    if zlib.crc32(body) != checksum:
+        return None, offset
+
+    timestamp, namespace_length, name_length = BODY.unpack_from(body)
+    position = BODY.size
+    namespace = bytes(body[position:position + namespace_length]).decode('utf-8')
+    position += namespace_length
+    name = bytes(body[position:position + name_length]).decode('utf-8')
+    position += name_length
+    data = bytes(body[position:]).decode('utf-8')
+    # Only data holding tagged values needs every object looked at
+    data = json.loads(data, object_hook=_untag if '"__' in data else None) if data else {}
+
+    event = Event.from_data(Namespace(namespace), name, data)
+    if not math.isnan(timestamp):
+        event.dispatched_at = datetime.datetime.fromtimestamp(timestamp)
+
+    return event, end + length
@@ -1,9 +1,32 @@
+import ast
+import collections.abc
+import functools
 import os
 import types
 
 from config import APP_ROOT
 from .exceptions import ConfigException
 
+DEFAULTS = 'defaults'
+FILE = 'file'
+ENV = 'env'
+CLI = 'cli'
+OVERRIDE = 'override'
+
+# From the lowest to the highest precedence
+LAYERS = (DEFAULTS, FILE, ENV, CLI, OVERRIDE)
+
+# The classes of the snapshots of this many different key sets are kept
+FROZEN_CLASSES = 32
+
+
+def coerce(value: str):
+    """ Returns the Python literal :param value: spells (ex: '4', 'True' or '[1, 2]'), otherwise the string itself """
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return value
+
 
 class Config(dict, object):
     """
@@ -20,7 +43,11 @@ class Config(dict, object):
         print(config[KEY])
         print(config.KEY)
 
-
+    Values come from layers, from the lowest to the highest precedence:
+    defaults, the config file, environment variables, command line arguments
+    and runtime overrides. The config itself is the merged view, so a lookup
+    is a plain dictionary lookup. Replacing a layer only merges the keys it
+    had or has again, :meth: `origin` tells which layer a value came from.
     """
     DEFAULT_CONFIG = {
 
@@ -30,30 +57,109 @@ class Config(dict, object):
         """
         Initializes the config object. The :param kwargs: can be used to pass
         default values as a `dictionary`, if no values are provided, the
-        object's default values are used.
+        object's default values are used. The layers of a :class: `Config`
+        passed in :param args: are copied.
 
         :param args: Default values as dict
         :param kwargs: Default values
         """
         super(Config, self).__init__()
+        object.__setattr__(self, '_layers', {layer: {} for layer in LAYERS})
+        object.__setattr__(self, '_origins', {})
 
         for arg in args:
-            if isinstance(arg, dict):
-                self.update(arg)
+            if isinstance(arg, Config):
+                for layer, values in arg._layers.items():
+                    self._layers[layer].update(values)
+            elif isinstance(arg, collections.abc.Mapping):
+                self._layers[DEFAULTS].update(arg)
+
+        self._layers[DEFAULTS].update(**kwargs or self.DEFAULT_CONFIG)
+        self._merge([key for values in self._layers.values() for key in values])
+
+    @staticmethod
+    def _check(key: str) -> None:
+        if not key.isupper():
+            raise ConfigException("Config keys should be uppercase, got '{}' instead".format(key))
 
-        self.update(**kwargs or self.DEFAULT_CONFIG)
+    def _merge(self, keys: iter) -> None:
+        """ Resolves :param keys: again, the merged value of every other key is still valid """
+        for key in keys:
+            for layer in reversed(LAYERS):
+                values = self._layers[layer]
+                if key in values:
+                    dict.__setitem__(self, key, values[key])
+                    self._origins[key] = layer
+                    break
+            else:
+                dict.pop(self, key, None)
+                self._origins.pop(key, None)
 
     def __setitem__(self, key: str, value) -> None:
         """
+        Sets a value, which takes effect right away. It's a default value
+        unless a file, environment, command line or overridden value is set
+        for the key, then it's a runtime override, see :meth: `override`.
 
         :param key: Config key
         :param value: Config value to be set
         :raise ConfigException: If provided key is lowercase
         """
-        if not key.isupper():
-            raise ConfigException("Config keys should be uppercase, got '{}' instead".format(key))
-        else:
-            dict.__setitem__(self, key, value)
+        self._check(key)
+        layer = DEFAULTS if self._origins.get(key, DEFAULTS) == DEFAULTS else OVERRIDE
+        self._layers[layer][key] = value
+        self._merge((key,))
+
+    def __delitem__(self, key: str) -> None:
+        """ Removes :param key: from every layer """
+        if key not in self:
+            raise KeyError(key)
+
+        for values in self._layers.values():
+            values.pop(key, None)
+        self._merge((key,))
+
+    def update(self, *args, **kwargs) -> None:
+        """ Sets values, like :meth: `__setitem__` """
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def override(self, key: str, value) -> None:
+        """
+        Sets a runtime override, which takes precedence over every other layer
+
+        :raise ConfigException: If provided key is lowercase
+        """
+        self._check(key)
+        self._layers[OVERRIDE][key] = value
+        self._merge((key,))
+
+    def origin(self, key: str) -> str:
+        """
+        Returns the layer the value of :param key: came from
+
+        :raise KeyError: If there's no value for :param key:
+        """
+        return self._origins[key]
+
+    def layer(self, layer: str) -> types.MappingProxyType:
+        """ Returns a readonly view of the values of :param layer: """
+        return types.MappingProxyType(self._layers[layer])
+
+    def set_layer(self, layer: str, values: collections.abc.Mapping) -> types.MappingProxyType:
+        """
+        Replaces the values of :param layer:
+
+        :raise ConfigException: If :param layer: doesn't exist or a key is lowercase
+        """
+        if layer not in self._layers:
+            raise ConfigException("Config layer should be one of {}, got '{}' instead".format(LAYERS, layer))
+        for key in values:
+            self._check(key)
+
+        previous, self._layers[layer] = self._layers[layer], dict(values)
+        self._merge(list(dict.fromkeys([*previous, *values])))
+        return self.proxy
 
     def __setattr__(self, key: str, value) -> None:
         """
@@ -110,8 +216,8 @@ class Config(dict, object):
 
     async def from_file(self, filename: str = 'config.py', silent: bool = False) -> types.MappingProxyType:
         """
-        This method imports a file as if it was a 'normal' module and updates
-        itself with the variables
+        This method imports a file as if it was a 'normal' module and replaces
+        the file layer with the variables
 
         This method is inspired by Flask which handles it config the same way
 
@@ -130,25 +236,143 @@ class Config(dict, object):
         except IOError as e:
             if not silent:
                 raise ConfigException(e.strerror)
+            return self.proxy
 
-        for key in dir(config):
-            if key.isupper():
-                self[key] = getattr(config, key)
+        return self.set_layer(FILE, {key: getattr(config, key) for key in dir(config) if key.isupper()})
 
-        return self.proxy
+    async def from_env_vars(self, prefix: str = "JOSEPH_", keys: iter = None) -> types.MappingProxyType:
+        """
+        Replaces the environment layer with the environment variables matching
+        the specified prefix. Values are coerced once, see :func: `coerce`.
 
-    async def from_env_vars(self, prefix: str = "JOSEPH_") -> types.MappingProxyType:
+        When :param keys: is given only the variables of those config keys are
+        looked up, instead of scanning the whole environment.
         """
-        Loops over environment variables and updates ``self`` with any values matching the
-        specified prefix
+        if keys is None:
+            names = [name for name in os.environ if name.startswith(prefix)]
+        else:
+            names = [prefix + key for key in keys if prefix + key in os.environ]
+
+        return self.set_layer(ENV, {name[len(prefix):]: coerce(os.environ[name]) for name in names})
+
+    async def from_args(self, args: list) -> types.MappingProxyType:
         """
-        for key, value in os.environ.items():
-            if key.startswith(prefix):
-                key = key.replace(prefix, '')
+        Replaces the command line layer with ``KEY=VALUE`` arguments (ex:
+        ``sys.argv[1:]``). Values are coerced once, see :func: `coerce`.
 
-                self[key] = value
+        :raise ConfigException: If an argument isn't a ``KEY=VALUE`` pair
+        """
+        values = {}
+        for arg in args:
+            key, separator, value = arg.partition('=')
+            if not separator:
+                raise ConfigException("Config arguments should look like KEY=VALUE, got '{}' instead".format(arg))
+            values[key] = coerce(value)
 
-        return self.proxy
+        return self.set_layer(CLI, values)
+
+    def freeze(self, schema: dict = None) -> 'FrozenConfig':
+        """
+        Returns an immutable snapshot of the config, see :class: `FrozenConfig`.
+
+        The :param schema: maps config keys to the type, or tuple of types, their
+        value should have. Keys are required unless ``type(None)`` is one of
+        their types, missing optional keys are set to None.
+
+        :raise ConfigException: If the config doesn't match :param schema:
+        """
+        items = self.items()
+
+        for key, expected in (schema or {}).items():
+            if key not in items:
+                if not isinstance(None, expected):
+                    raise ConfigException("Config key '{}' is required".format(key))
+                items[key] = None
+            elif not isinstance(items[key], expected):
+                raise ConfigException("Config key '{}' should be of type {}, got {!r} instead".format(
+                    key, expected, items[key]))
+
+        return FrozenConfig(items)
+
+    def __reduce__(self) -> tuple:
+        return _restore, (type(self), self._layers)
 
     def __repr__(self) -> str:
         return str(self.items())
+
+
+def _restore(cls: type, layers: dict) -> Config:
+    config = cls()
+    for layer, values in layers.items():
+        config._layers[layer].update(values)
+    config._merge([key for values in layers.values() for key in values])
+    return config
+
+
+class FrozenConfig(dict):
+    """
+    Immutable snapshot of a :class: `Config`, created by :meth: `Config.freeze`.
+
+    The snapshot is a dictionary, so ``config['KEY']`` and ``config.get(KEY)``
+    are plain dictionary lookups, the methods changing it raise instead.
+    Every config key is a slot of the snapshot as well, so ``config.KEY`` is
+    a plain attribute lookup. The views returned by :meth: `keys`,
+    :meth: `values`, :meth: `items` and :attr: `proxy` are built once.
+    """
+    __slots__ = ('_items', '_keys', '_values')
+
+    def __new__(cls, items: dict):
+        keys = tuple(sorted(items))
+        instance = dict.__new__(_snapshot_class(cls, tuple(key for key in keys if key.isidentifier())))
+        dict.update(instance, ((key, items[key]) for key in keys))
+
+        for key in type(instance).__slots__:
+            object.__setattr__(instance, key, items[key])
+        object.__setattr__(instance, '_items', types.MappingProxyType(instance))
+        object.__setattr__(instance, '_keys', keys)
+        object.__setattr__(instance, '_values', tuple(items[key] for key in keys))
+        return instance
+
+    def __init__(self, items: dict):
+        # Filled by __new__, dict.__init__ would update the snapshot again
+        pass
+
+    def _frozen(self, *args, **kwargs):
+        raise ConfigException("The config is frozen, it can't be changed")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _frozen
+
+    def __setattr__(self, key: str, value) -> None:
+        raise ConfigException("The config is frozen, could not set '{}'".format(key))
+
+    def __delattr__(self, key: str) -> None:
+        raise ConfigException("The config is frozen, could not delete '{}'".format(key))
+
+    def keys(self) -> tuple:
+        return self._keys
+
+    def values(self) -> tuple:
+        return self._values
+
+    def items(self) -> types.MappingProxyType:
+        return self._items
+
+    @property
+    def proxy(self) -> types.MappingProxyType:
+        return self._items
+
+    def thaw(self) -> Config:
+        """ Returns a mutable copy """
+        return Config(self._items)
+
+    def __reduce__(self) -> tuple:
+        return FrozenConfig, (dict(self._items),)
+
+    def __repr__(self) -> str:
+        return 'FrozenConfig({!r})'.format(dict(self._items))
+
+
+@functools.lru_cache(maxsize=FROZEN_CLASSES)
+def _snapshot_class(cls: type, slots: tuple) -> type:
+    """ Returns the subclass of :param cls: with a slot per key, the most recently used key sets are kept """
+    return type(cls.__name__, (cls,), {'__slots__': slots, '__module__': cls.__module__})
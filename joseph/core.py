@@ -1,10 +1,77 @@
 import asyncio
+import concurrent.futures
+import functools
+import logging
 import multiprocessing
+import os
+import pickle
+import time
 
-import janus
+from .breaker import CircuitBreaker
+from .config import APP_ROOT, Config
+from .entities import EntityStore
+from .exceptions import InvalidState, JosephException
+from .metrics import Metrics
+from .scheduler import BLOCK, DROP_OLDEST, Scheduler
+from .utils.states import StateMachine
+from .utils.watcher import Watcher
 
-from .config import Config
-from .utils.states import State
+logger = logging.getLogger(__name__)
+
+ASYNC = 'async'
+THREAD = 'thread'
+PROCESS = 'process'
+
+EXECUTORS = (ASYNC, THREAD, PROCESS)
+
+CONFIG_FILE = 'config.py'
+
+# Options of a lane missing from the LANES config
+LANE_WORKERS = 1
+LANE_MAX_SIZE = 100
+
+# Checked once when the config is frozen at start up
+CONFIG_SCHEMA = {
+    'DEBUG': (bool, type(None)),
+    'CONFIG_WATCH': (bool, type(None)),
+    'METRICS': (bool, type(None)),
+    'WORKER_COUNT': (int, type(None)),
+    'THREAD_POOL_SIZE': (int, type(None)),
+    'PROCESS_POOL_SIZE': (int, type(None)),
+    'QUEUE_MAX_SIZE': (int, type(None)),
+    'QUEUE_POLICY': (str, type(None)),
+    'ENTITY_PATH': (str, type(None)),
+    'ENTITY_WRITE_DELAY': (int, float, type(None)),
+    'SHUTDOWN_TIMEOUT': (int, float, type(None)),
+    'PENDING_TASKS_PATH': (str, type(None)),
+    'LISTENER_TIMEOUT': (int, float, type(None)),
+    'BREAKER_THRESHOLD': (int, type(None)),
+    'BREAKER_COOLDOWN': (int, float, type(None)),
+    'LANES': (dict, type(None)),
+}
+
+
+class Task(object):
+    """
+    A deferred call to a task, nothing is invoked until a worker takes the
+    task off the queue. This keeps queued tasks cheap and makes dropping them
+    free of side effects.
+    """
+    __slots__ = ('func', 'args', 'kwargs', 'executor', 'timeout', 'lane', 'queued_at')
+
+    def __init__(self, func: callable, args: tuple = (), kwargs: dict = None, executor: str = ASYNC,
+                 timeout: float = None, lane: str = None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.executor = executor
+        self.timeout = timeout
+        self.lane = lane
+        # Only set while metrics are enabled, in perf_counter_ns() nanoseconds
+        self.queued_at = None
+
+    def __repr__(self) -> str:
+        return 'Task({!r}, executor={!r})'.format(self.func, self.executor)
 
 
 class Joseph(object):
@@ -14,15 +81,36 @@ class Joseph(object):
         super(Joseph, self).__init__()
 
         self.config = Config()
+        self.config_sources = None
         self.loop = loop or asyncio.get_event_loop()
-        self.state = State('STOPPED')
+        self.state = StateMachine('STOPPED', loop=self.loop)
+        self.state.on_transition(self._state_changed)
         self.workers = []
+        self.idle = set()
+        self.running = {}
+        self.lanes = {}
+        # lane -> amount of workers
+        self.lane_sizes = {}
+        self.lane_workers = []
+        self.breakers = {}
+        self.deadlines = {}
+        self.expired = set()
+        self.watchdog = None
+        self.retiring = 0
+        self.drained = None
+        self.executors = {}
+        self.entities = None
+        # plugin -> [(priority, listener qualname, pickled task)], saved tasks waiting for their plugin
+        self.unresolved = {}
+        self.bus = None
+        self.metrics = None
+        self.config_watcher = None
 
-        self.queue = janus.PriorityQueue(loop=self.loop)
+        self.queue = Scheduler(self.loop)
 
     def start(self) -> None:
-        """ Starts up the application by registering the async start procedure """
-        self.add_task(self._stop_procedure)
+        """ Starts up the application by running the async start procedure """
+        self.loop.run_until_complete(self._start_procedure())
 
         try:
             self.loop.run_forever()
@@ -30,43 +118,659 @@ class Joseph(object):
             self.stop()
 
     def stop(self) -> None:
-        """ Add stop task to queue """
-        self.add_task(self._stop_procedure)
+        """ Runs the stop procedure, schedules it when called from within the running loop """
+        if self.loop.is_running():
+            self.loop.create_task(self._stop_procedure())
+        else:
+            self.loop.run_until_complete(self._stop_procedure())
 
     async def _start_procedure(self) -> None:
         """ Performs the actual start up procedure """
+        # Opened first, so the lifecycle events are delivered
+        if self.bus is not None:
+            self.bus.open()
         self.state.set_state('STARTING')
 
-        self.add_task(self.config.from_file, 'config.py')
-        for _ in self.config['WORKER_COUNT'] or multiprocessing.cpu_count():
-            worker = self.loop.run_in_executor(None, self.worker, self.queue)
-            self.workers.append(worker)
+        # Values set before starting are kept, the snapshot of a previous start is thawed
+        config = Config(self.config)
+        await config.from_file(CONFIG_FILE)
+        # Only known keys can be set from the environment, so it isn't scanned as a whole
+        await config.from_env_vars(keys=[*CONFIG_SCHEMA, *config.keys()])
+        self.config = config.freeze(CONFIG_SCHEMA)
+        self.config_sources = config
+
+        self._configure_metrics()
+        self._configure_threads()
+        self._configure_processes()
+        self._configure_queue()
+
+        self.entities = EntityStore(self.config.ENTITY_PATH or 'entities', self.loop,
+                                    self.config.ENTITY_WRITE_DELAY or 1.0, executor=self.executors[THREAD])
+        await self.loop.run_in_executor(self.executors[THREAD], self.entities.load)
+
+        self.resume_tasks(self.config.PENDING_TASKS_PATH or 'pending_tasks.pickle')
+        self._configure_workers()
+
+        self._configure_watch()
 
         self.state.set_state('RUNNING')
 
     async def _stop_procedure(self) -> None:
-        """ Performs the stopping procedure """
+        """
+        Performs the stopping procedure. The event bus is closed for new
+        events and the queued tasks are drained for at most SHUTDOWN_TIMEOUT
+        seconds. Tasks that didn't get to run are saved and resumed on the
+        next start, tasks that are still running are logged and cancelled.
+
+        Stopping a stopped Joseph does nothing, a Joseph that is still starting
+        is stopped once it's running and a second stop waits for the first one.
+        """
+        if self.state == 'STOPPED':
+            return
+        if self.state == 'STOPPING':
+            await self.state.wait_for('STOPPED')
+            return
+        if self.state == 'STARTING':
+            await self.state.wait_for('RUNNING')
+
         self.state.set_state('STOPPING')
 
-        for worker in self.workers:
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+
+        if self.bus is not None:
+            self.bus.stop_soon()
+
+        timeout = self.config.get('SHUTDOWN_TIMEOUT')
+        pending = await self.drain(10.0 if timeout is None else timeout)
+        if self.running:
+            logger.warning("Cancelling %d tasks still running: %s", len(self.running),
+                           ', '.join(map(repr, self.running.values())))
+        if pending or self.unresolved:
+            self.save_tasks(pending, self.config.get('PENDING_TASKS_PATH') or 'pending_tasks.pickle')
+
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+            self.watchdog = None
+        self.deadlines = {}
+
+        workers = self.workers + self.lane_workers
+        for worker in workers:
             worker.cancel()
+        # Awaited, a worker still pending when the loop stops would be destroyed mid cancellation
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.workers = []
+        self.lane_workers = []
+        self.lanes = {}
+        self.lane_sizes = {}
+        self.retiring = 0
+
+        if self.entities is not None:
+            await self.entities.close()
+
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        self.executors = {}
 
         self.loop.stop()
         self.state.set_state('STOPPED')
 
-    async def add_task(self, task: callable, *args, **kwargs) -> None:
-        """ Add any coroutine to the queue to be executed later """
+    def _state_changed(self, previous: str, state: str) -> None:
+        """ Dispatches the transition as a lifecycle event (ex: ``joseph:running``) """
+        if self.bus is not None:
+            try:
+                self.bus.dispatch('joseph:{}'.format(state.lower()), previous=previous)
+            except JosephException:
+                # The bus is closed, or not open yet
+                pass
+
+    # The settings every config key affects, only those of changed keys are applied again on reload
+    RECONFIGURE = {
+        'METRICS': ('_configure_metrics',),
+        'WORKER_COUNT': ('_configure_workers', '_configure_threads'),
+        'THREAD_POOL_SIZE': ('_configure_threads',),
+        'PROCESS_POOL_SIZE': ('_configure_processes',),
+        'QUEUE_MAX_SIZE': ('_configure_queue',),
+        'QUEUE_POLICY': ('_configure_queue',),
+        'ENTITY_WRITE_DELAY': ('_configure_entities',),
+        'BREAKER_THRESHOLD': ('_configure_breakers',),
+        'BREAKER_COOLDOWN': ('_configure_breakers',),
+        'LANES': ('_configure_lanes',),
+        'CONFIG_WATCH': ('_configure_watch',),
+    }
+    # Keys that are only read at start, a change is logged and applied on the next start
+    RESTART = ('ENTITY_PATH',)
+
+    def _configure_metrics(self) -> None:
+        if self.config.METRICS:
+            self.enable_metrics()
+        else:
+            self.disable_metrics()
+
+    def _configure_workers(self) -> None:
+        self.resize_workers(self.config.WORKER_COUNT or multiprocessing.cpu_count())
+
+    def _configure_threads(self) -> None:
+        self.resize_executor(THREAD, self.config.THREAD_POOL_SIZE or self.config.WORKER_COUNT or
+                             multiprocessing.cpu_count())
+        if self.entities is not None:
+            self.entities.executor = self.executors[THREAD]
+
+    def _configure_processes(self) -> None:
+        self.resize_executor(PROCESS, self.config.PROCESS_POOL_SIZE or multiprocessing.cpu_count())
+
+    def _configure_queue(self) -> None:
+        self.queue.limit(self.config.QUEUE_MAX_SIZE or 0, self.config.QUEUE_POLICY or BLOCK)
+
+    def _configure_entities(self) -> None:
+        if self.entities is not None:
+            self.entities.delay = self.config.ENTITY_WRITE_DELAY or 1.0
+
+    def _configure_breakers(self) -> None:
+        for breaker in self.breakers.values():
+            breaker.threshold = self.config.BREAKER_THRESHOLD or 3
+            breaker.cooldown = self.config.BREAKER_COOLDOWN or 30.0
+
+    def _configure_lanes(self) -> None:
+        """ Applies the LANES options to the lanes in use, lanes added later read them when they're added """
+        options = self.config.LANES or {}
+        for name, lane in self.lanes.items():
+            lane_options = options.get(name, {})
+            lane.limit(lane_options.get('maxsize', LANE_MAX_SIZE), lane_options.get('policy', DROP_OLDEST))
+
+            workers = lane_options.get('workers', LANE_WORKERS)
+            if workers > self.lane_sizes[name]:
+                self._add_lane_workers(name, workers - self.lane_sizes[name])
+            elif workers < self.lane_sizes[name]:
+                logger.warning("Lane '%s' keeps its %d workers until Joseph is restarted", name,
+                               self.lane_sizes[name])
+
+    def _configure_watch(self) -> None:
+        if self.config.CONFIG_WATCH and self.config_watcher is None and self.state != 'STOPPED':
+            self.watch_config()
+        elif not self.config.CONFIG_WATCH and self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+
+    def enable_metrics(self) -> Metrics:
+        """ Starts recording the metrics of listeners, events and the queue, see :mod: `joseph.metrics` """
+        if self.metrics is None:
+            self.metrics = Metrics(self)
+            if self.bus is not None:
+                self.bus.add_sink(self.metrics.dispatched)
+        return self.metrics
+
+    def disable_metrics(self) -> None:
+        """ Stops recording metrics, the ones recorded so far are gone """
+        if self.metrics is not None and self.bus is not None:
+            self.bus.remove_sink(self.metrics.dispatched)
+        self.metrics = None
+
+    def resize_workers(self, count: int) -> None:
+        """
+        Starts or retires workers until :param count: are left. Idle workers
+        retire right away, busy workers once they finished their current task.
+        """
+        active = len(self.workers) - self.retiring
+        if count >= active:
+            revoked = min(self.retiring, count - active)
+            self.retiring -= revoked
+            for _ in range(count - active - revoked):
+                self.workers.append(self.loop.create_task(self.worker()))
+            return
+
+        surplus = active - count
+        for worker in list(self.idle)[:surplus]:
+            self.idle.discard(worker)
+            self._forget_worker(worker)
+            worker.cancel()
+            surplus -= 1
+        self.retiring += surplus
+
+    def _forget_worker(self, worker: asyncio.Task) -> None:
+        try:
+            self.workers.remove(worker)
+        except ValueError:
+            pass
+
+    def resize_executor(self, executor: str, size: int) -> None:
+        """ Replaces the pool of :param executor: by one of :param size:, tasks already submitted finish first """
+        if executor == THREAD:
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=size)
+        elif executor == PROCESS:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=size)
+        else:
+            raise ValueError("Only the '{}' and '{}' executors have a pool, got '{}'".format(THREAD, PROCESS, executor))
+
+        previous, self.executors[executor] = self.executors.get(executor), pool
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def watch_config(self, interval: float = 1.0) -> Watcher:
+        """ Reloads the config whenever the config file changes """
+        config_file = os.path.join(APP_ROOT, CONFIG_FILE)
+
+        def changed(paths: set) -> None:
+            if config_file in paths:
+                self.loop.create_task(self.reload_config())
+
+        self.config_watcher = Watcher(APP_ROOT, changed, self.loop, interval, recursive=False)
+        self.config_watcher.start()
+        return self.config_watcher
+
+    async def reload_config(self, filename: str = CONFIG_FILE) -> dict:
+        """
+        Reads the config file again and applies the settings of the keys that
+        changed. A ``config:changed`` event with the changes is dispatched on
+        the event bus. Returns the changes as ``{key: (old, new)}``.
+
+        The current config is kept when the file can't be loaded or doesn't
+        match the schema, so a half saved file does no harm.
+        """
+        config = self._copy_config()
+        try:
+            await config.from_file(filename)
+        except Exception:
+            logger.exception("Could not reload the config, keeping the current one")
+            return {}
+
+        return self._apply_config(config)
+
+    def override_config(self, **values) -> dict:
+        """
+        Overrides config values at runtime, like :meth: `reload_config` only
+        the settings of the keys that changed are applied again
+        """
+        config = self._copy_config()
+        for key, value in values.items():
+            config.override(key, value)
+
+        return self._apply_config(config)
+
+    def _copy_config(self) -> Config:
+        return Config(self.config if self.config_sources is None else self.config_sources)
+
+    def _apply_config(self, config: Config) -> dict:
         try:
-            priority = kwargs.pop('priority')
+            snapshot = config.freeze(CONFIG_SCHEMA)
+        except JosephException:
+            logger.exception("Could not apply the config, keeping the current one")
+            return {}
+
+        missing = object()
+        changed = {key: (self.config.get(key), snapshot.get(key)) for key in {*self.config, *snapshot}
+                   if self.config.get(key, missing) != snapshot.get(key, missing)}
+        self.config_sources = config
+        if not changed:
+            return changed
+
+        self.config = snapshot
+        logger.info("Config changed: %s", ', '.join(sorted(changed)))
+
+        applied = set()
+        for key in sorted(changed):
+            if key in self.RESTART and self.state != 'STOPPED':
+                logger.warning("%s changed, the change applies once Joseph is restarted", key)
+            for name in self.RECONFIGURE.get(key, ()):
+                if name not in applied:
+                    applied.add(name)
+                    getattr(self, name)()
+
+        if self.bus is not None:
+            try:
+                self.bus.dispatch('config:changed', changed=changed)
+            except JosephException:
+                logger.exception("Could not dispatch the config changes")
+
+        return changed
+
+    async def drain(self, timeout: float) -> list:
+        """
+        Lets the workers run the queued tasks, highest priority first, until
+        the queue is empty and no task is running or :param timeout: seconds
+        passed. The tasks left in the queue are taken off and returned as
+        (priority, task) pairs.
+        """
+        if (self.workers or self.lane_workers) and (self.queued() or self.running):
+            self.drained = self.loop.create_future()
+            try:
+                await asyncio.wait_for(self.drained, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.drained = None
+
+        pending = self.queue.drain_nowait()
+        for lane in self.lanes.values():
+            pending.extend(lane.drain_nowait())
+        return pending
+
+    def queued(self) -> int:
+        """ Returns the amount of tasks waiting in the shared queue and the lanes """
+        return len(self.queue) + sum(map(len, self.lanes.values()))
+
+    def save_tasks(self, tasks: list, path: str) -> int:
+        """
+        Saves (priority, task) pairs to be resumed by :meth: `resume_tasks`,
+        returns the amount saved. Tasks that can't be pickled (ex: a lambda)
+        are logged and skipped, nothing is written when no task is left.
+
+        Listeners of plugins are saved by reference, the plugin name and the
+        qualified name of the listener, as plugins aren't importable before
+        they're loaded and their listeners are often defined within ``setup``.
+        Saved tasks of plugins that weren't loaded since resuming are saved again.
+        """
+        from .plugins import PLUGIN_PACKAGE
+
+        saved = []
+        for priority, task in tasks:
+            module = getattr(task.func, '__module__', None) or ''
+            try:
+                if module.startswith(PLUGIN_PACKAGE + '.'):
+                    reference = (module.split('.')[1], task.func.__qualname__)
+                    task = Task(None, task.args, task.kwargs, task.executor, task.timeout, task.lane)
+                else:
+                    reference = None
+                saved.append((priority, reference, pickle.dumps(task)))
+            except Exception:
+                logger.warning("Could not save %r, it is lost", task)
+
+        for plugin, unresolved in self.unresolved.items():
+            saved.extend((priority, (plugin, qualname), data) for priority, qualname, data in unresolved)
+        self.unresolved = {}
+
+        if not saved:
+            return 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(saved, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + '.tmp', path)
+
+        logger.info("Saved %d unfinished tasks to '%s'", len(saved), path)
+        return len(saved)
+
+    def resume_tasks(self, path: str) -> int:
+        """
+        Queues the tasks saved by :meth: `save_tasks` again, returns the amount
+        queued. Tasks of plugin listeners are held until the plugin is loaded,
+        see :meth: `resume_plugin_tasks`.
+        """
+        try:
+            with open(path, 'rb') as file:
+                saved = pickle.load(file)
+        except FileNotFoundError:
+            return 0
+
+        # Each task is unpickled on its own, one that can't be doesn't take the others with it
+        resumed = 0
+        for priority, reference, data in saved:
+            if reference is not None:
+                plugin, qualname = reference
+                self.unresolved.setdefault(plugin, []).append((priority, qualname, data))
+                continue
+
+            try:
+                self._requeue(pickle.loads(data), priority)
+                resumed += 1
+            except Exception:
+                logger.exception("Could not resume a saved task")
+
+        os.remove(path)
+        logger.info("Resumed %d unfinished tasks from '%s'", resumed, path)
+        return resumed
+
+    def resume_plugin_tasks(self, plugin: str, funcs: iter) -> int:
+        """
+        Queues the saved tasks of :param plugin: again, now that it's loaded and
+        its listeners :param funcs: are registered. Returns the amount queued.
+        """
+        unresolved = self.unresolved.pop(plugin, None)
+        if not unresolved:
+            return 0
+
+        funcs = {func.__qualname__: func for func in funcs}
+        resumed = 0
+        for priority, qualname, data in unresolved:
+            func = funcs.get(qualname)
+            if func is None:
+                logger.warning("Plugin '%s' has no listener %s anymore, its saved task is lost", plugin, qualname)
+                continue
+
+            try:
+                task = pickle.loads(data)
+                task.func = func
+                self._requeue(task, priority)
+                resumed += 1
+            except Exception:
+                logger.exception("Could not resume a saved task of plugin '%s'", plugin)
+
+        logger.info("Resumed %d unfinished tasks of plugin '%s'", resumed, plugin)
+        return resumed
+
+    def _requeue(self, task: Task, priority: int) -> None:
+        # Queued in another process, its wait time would be meaningless
+        task.queued_at = time.perf_counter_ns() if self.metrics is not None else None
+        self.lane(task.lane).put_nowait(task, priority)
+
+    async def add_task(self, task: callable, *args, priority: int = 9, executor: str = ASYNC, timeout: float = None,
+                       lane: str = None, **kwargs) -> None:
+        """
+        Add any coroutine function or function to the queue to be called later by a worker,
+        waits for a free slot when the queue is full and its policy is BLOCK.
+
+        A task running longer than :param timeout: seconds, LISTENER_TIMEOUT by default, is
+        cancelled. Tasks of a function that keeps timing out are skipped for a while, see
+        :class: `CircuitBreaker`. Tasks for :param lane: go to that lane instead of the
+        shared queue, see :meth: `add_lane`.
+        """
+        task = self._task(task, args, kwargs, executor, timeout, lane)
+        if task is not None:
+            await self.lane(lane).put(task, priority)
+
+    def add_task_nowait(self, task: callable, *args, priority: int = 9, executor: str = ASYNC, timeout: float = None,
+                        lane: str = None, **kwargs) -> None:
+        """
+        Like :meth: `add_task`, but usable from synchronous code.
+
+        :raise QueueFull: If the queue is full and its policy is BLOCK or REJECT
+        """
+        task = self._task(task, args, kwargs, executor, timeout, lane)
+        if task is not None:
+            self.lane(lane).put_nowait(task, priority)
+
+    def add_tasks_nowait(self, calls: iter) -> None:
+        """
+        Adds a batch of ``(func, args, priority, executor, timeout, lane)`` calls, with a
+        single :meth: `Scheduler.put_many_nowait` per queue. See :meth: `add_task`.
+
+        :raise QueueFull: If the batch doesn't fit a queue with policy BLOCK or REJECT
+        """
+        queued_at = time.perf_counter_ns() if self.metrics is not None else None
+        lanes = {}
+        for func, args, priority, executor, timeout, lane in calls:
+            task = self._task(func, args, {}, executor, timeout, lane, queued_at)
+            if task is not None:
+                lanes.setdefault(lane, []).append((task, priority))
+
+        for lane, tasks in lanes.items():
+            self.lane(lane).put_many_nowait(tasks)
+
+    def _task(self, func: callable, args: tuple, kwargs: dict, executor: str, timeout: float, lane: str,
+              queued_at: int = None) -> Task:
+        """ Returns the task to queue, None when the circuit breaker of :param func: is open """
+        if self.breakers:
+            breaker = self.breakers.get(func)
+            if breaker is not None and not breaker.allow():
+                return None
+
+        task = Task(func, args, kwargs, executor, timeout, lane)
+        if self.metrics is not None:
+            task.queued_at = queued_at or time.perf_counter_ns()
+        return task
+
+    def lane(self, name: str = None) -> Scheduler:
+        """ Returns the queue of lane :param name:, the shared queue for None, see :meth: `add_lane` """
+        if name is None:
+            return self.queue
+
+        try:
+            return self.lanes[name]
         except KeyError:
-            priority = 9
+            return self.add_lane(name, **(self.config.get('LANES') or {}).get(name, {}))
+
+    def add_lane(self, name: str, workers: int = LANE_WORKERS, maxsize: int = LANE_MAX_SIZE,
+                 policy: str = DROP_OLDEST) -> Scheduler:
+        """
+        Adds a lane: a bounded queue with its own workers. Listeners that are
+        slow or come in bursts (ex: a plugin crunching camera images) get a
+        lane of their own, so they can't fill up the shared queue or keep its
+        workers busy. Lanes are added on first use, with the options for the
+        lane in the LANES config (ex: ``{'heavy': {'workers': 2}}``).
+        """
+        if name in self.lanes:
+            return self.lanes[name]
 
-        future = asyncio.ensure_future(task(*args, **kwargs))
-        await self.queue.put((priority, future))
+        lane = self.lanes[name] = Scheduler(self.loop, maxsize, policy)
+        self.lane_sizes[name] = 0
+        self._add_lane_workers(name, workers)
+        return lane
 
-    async def worker(self) -> None:
-        """ Worker to pull futures from the queue and run them """
+    def _add_lane_workers(self, name: str, count: int) -> None:
+        self.lane_sizes[name] += count
+        for _ in range(count):
+            self.lane_workers.append(self.loop.create_task(self.worker(name)))
+
+    async def run(self, task: callable, args: tuple = (), kwargs: dict = None, executor: str = ASYNC):
+        """
+        Runs a single task on the requested executor.
+
+        ASYNC tasks run on the event loop, coroutines are awaited. THREAD tasks run
+        in the bounded thread pool and are meant for blocking I/O. PROCESS tasks run in
+        the process pool and are meant for CPU heavy work, the task and its arguments
+        have to be picklable. Coroutine functions can only run on the event loop.
+        """
+        kwargs = kwargs or {}
+
+        if executor == ASYNC:
+            result = task(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+
+        if asyncio.iscoroutinefunction(task):
+            raise ValueError("Coroutine function {!r} can only run on the {} executor".format(task, ASYNC))
+
+        try:
+            pool = self.executors[executor]
+        except KeyError:
+            raise InvalidState("No '{}' executor available, Joseph is in state {}".format(executor, self.state))
+
+        return await self.loop.run_in_executor(pool, functools.partial(task, *args, **kwargs))
+
+    async def worker(self, lane: str = None) -> None:
+        """
+        Worker to pull tasks from the shared queue, or the queue of :param lane:, and run them.
+        Workers of the shared queue run until they're retired by :meth: `resize_workers`.
+        """
+        current = asyncio.current_task()
+        queue = self.lane(lane)
         while True:
-            future = await self.queue.get()
-            result = await future
-            future.set_result(result)
+            if lane is None:
+                if self.retiring:
+                    self.retiring -= 1
+                    self._forget_worker(current)
+                    return
+                self.idle.add(current)
+
+            try:
+                task = await queue.get()
+            finally:
+                self.idle.discard(current)
+
+            await self._execute(current, task)
+
+    async def _execute(self, worker: asyncio.Task, task: Task) -> None:
+        """ Runs a task taken off a queue by :param worker:, within its time limit """
+        self.running[worker] = task
+        metrics = self.metrics
+        timeout = task.timeout if task.timeout is not None else self.config.get('LISTENER_TIMEOUT')
+        if metrics is not None or timeout is not None:
+            started = time.perf_counter_ns()
+
+        if timeout is not None:
+            self._watch(worker, self.loop.time() + timeout)
+        failed = timed_out = False
+        try:
+            await self.run(task.func, task.args, task.kwargs, task.executor)
+        except asyncio.CancelledError:
+            if worker not in self.expired:
+                raise
+            failed = timed_out = True
+            logger.warning("%r took longer than %s seconds and was cancelled", task, timeout)
+        except Exception:
+            failed = True
+            logger.exception("%r failed", task)
+        finally:
+            # Also when the task swallowed the cancellation, a later cancellation of the worker is a real one
+            if worker in self.expired:
+                self.expired.discard(worker)
+                if hasattr(worker, 'uncancel'):
+                    worker.uncancel()
+                timed_out = True
+            self.deadlines.pop(worker, None)
+            del self.running[worker]
+            if metrics is not None:
+                metrics.record(task, started, time.perf_counter_ns(), failed)
+            if self.drained is not None and not self.running and not self.queued() and not self.drained.done():
+                self.drained.set_result(None)
+
+        # A task that blocked the loop can't be cancelled, it still counts as a timeout
+        if timeout is not None:
+            self._settle(task.func, timed_out or time.perf_counter_ns() - started > timeout * 1e9)
+
+    def _watch(self, worker: asyncio.Task, deadline: float) -> None:
+        """
+        Cancels :param worker: when it's still running its task at :param deadline:. A single
+        watchdog timer serves every worker, a timer or ``asyncio.wait_for`` per task would cost
+        more than running most listeners.
+        """
+        self.deadlines[worker] = deadline
+        if self.watchdog is None or deadline < self.watchdog.when():
+            if self.watchdog is not None:
+                self.watchdog.cancel()
+            self.watchdog = self.loop.call_at(deadline, self._expire)
+
+    def _expire(self) -> None:
+        """ The watchdog, cancels the workers past their deadline """
+        self.watchdog = None
+        now = self.loop.time()
+        for worker, deadline in list(self.deadlines.items()):
+            if deadline <= now:
+                del self.deadlines[worker]
+                self.expired.add(worker)
+                worker.cancel()
+
+        if self.deadlines:
+            self.watchdog = self.loop.call_at(min(self.deadlines.values()), self._expire)
+
+    def _settle(self, func: callable, timed_out: bool) -> None:
+        """ Updates the circuit breaker of :param func: """
+        breaker = self.breakers.get(func)
+        if not timed_out:
+            # Only functions that are timing out have a breaker, so the check when queueing stays cheap
+            if breaker is not None:
+                del self.breakers[func]
+            return
+
+        if breaker is None:
+            breaker = self.breakers[func] = CircuitBreaker(self.config.get('BREAKER_THRESHOLD') or 3,
+                                                           self.config.get('BREAKER_COOLDOWN') or 30.0)
+        if breaker.failure():
+            logger.warning("%r timed out %d times in a row, its tasks are skipped for %s seconds", func,
+                           breaker.failures, breaker.cooldown)
@@ -0,0 +1,384 @@
+import asyncio
+import logging
+import os
+import re
+import types
+
+import yaml
+
+from .exceptions import EntityNotFound
+
+logger = logging.getLogger(__name__)
+
+# The C implementations are an order of magnitude faster, they're only missing when PyYAML was built without libyaml
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+SNAPSHOT = 'entities.yaml'
+JOURNAL = 'journal.yaml'
+
+# Every journal document starts on a line of its own, continuation lines of a document are indented
+_DOCUMENT_START = re.compile(rb'^---', re.MULTILINE)
+
+
+class Entity(object):
+    """
+    A thing in the house (ex: a light, a sensor or a room) with its attributes.
+
+    Attributes are read only, changes go through :meth: `EntityStore.update`
+    so the indexes of the store stay up to date.
+    """
+    __slots__ = ('id', 'type', 'namespace', '_attributes')
+
+    def __init__(self, id: str, type: str, namespace: str = None, attributes: dict = None):
+        self.id = id
+        self.type = type
+        self.namespace = namespace
+        self._attributes = dict(attributes or {})
+
+    @property
+    def attributes(self) -> types.MappingProxyType:
+        return types.MappingProxyType(self._attributes)
+
+    def to_dict(self) -> dict:
+        return {'id': self.id, 'type': self.type, 'namespace': self.namespace, 'attributes': self._attributes}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Entity':
+        return cls(data['id'], data['type'], data.get('namespace'), data.get('attributes'))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Entity) and self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'Entity({!r}, type={!r})'.format(self.id, self.type)
+
+
+def _indexable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class EntityStore(object):
+    """
+    Keeps every entity in memory, indexed on type, namespace and the value of
+    every (hashable) attribute, and persists them as YAML in :param directory:.
+
+    Changes are not written right away. Changed entities are collected for
+    :param delay: seconds and appended to a journal as a single batch of YAML
+    documents, so a change never rewrites the whole database. Once the
+    journal holds more than :param compact_every: documents it's folded into
+    the snapshot, the one file holding every entity. The YAML is dumped and
+    synced in :param executor: (the default executor of the loop by default),
+    so writing never blocks the event loop.
+
+        store = EntityStore('/var/lib/joseph/entities')
+        store.load()
+        store.put(Entity('lights.kitchen', 'light', 'lights', {'on': False, 'room': 'kitchen'}))
+        store.update('lights.kitchen', on=True)
+        store.find(type='light', on=True)
+    """
+
+    def __init__(self, directory: str, loop=None, delay: float = 1.0, compact_every: int = 5000, executor=None):
+        self.directory = directory
+        self.loop = loop or asyncio.get_event_loop()
+        self.delay = delay
+        self.compact_every = compact_every
+        self.executor = executor
+
+        self.entities = {}
+        self.types = {}
+        self.namespaces = {}
+        self.attributes = {}
+
+        self.dirty = set()
+        self.handle = None
+        self.saving = None
+        self.journaled = 0
+        self._lock = None
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT)
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL)
+
+    def load(self) -> int:
+        """ Loads the snapshot and applies the journal on top of it, returns the amount of entities """
+        self.entities.clear()
+        self.types.clear()
+        self.namespaces.clear()
+        self.attributes.clear()
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as file:
+                for data in yaml.load(file, Loader=Loader) or ():
+                    self._index(Entity.from_dict(data))
+
+        self.journaled = 0
+        if os.path.exists(self.journal_path):
+            self._replay_journal()
+
+        return len(self.entities)
+
+    def _replay_journal(self) -> None:
+        """
+        Applies the journal document by document. A crash while appending leaves a torn last
+        document, everything before it still counts. The torn tail is cut off, so the next
+        batch isn't appended to it.
+        """
+        with open(self.journal_path, 'rb') as file:
+            content = file.read()
+
+        starts = [match.start() for match in _DOCUMENT_START.finditer(content)]
+        good = 0 if not starts else starts[0]
+        for start, end in zip(starts, starts[1:] + [len(content)]):
+            if not content.endswith(b'\n', start, end):
+                break
+            try:
+                data = yaml.load(content[start:end], Loader=Loader)
+            except yaml.YAMLError:
+                break
+            if not isinstance(data, dict) or 'id' not in data:
+                break
+
+            self._replay(data)
+            self.journaled += 1
+            good = end
+
+        if good < len(content):
+            logger.warning("Cutting off the unreadable end of journal '%s' at byte %d", self.journal_path, good)
+            os.truncate(self.journal_path, good)
+
+    def _replay(self, data: dict) -> None:
+        if data.get('deleted'):
+            entity = self.entities.get(data['id'])
+            if entity is not None:
+                self._unindex(entity)
+        else:
+            entity = Entity.from_dict(data)
+            if entity.id in self.entities:
+                self._unindex(self.entities[entity.id])
+            self._index(entity)
+
+    def _index(self, entity: Entity) -> None:
+        self.entities[entity.id] = entity
+        self.types.setdefault(entity.type, set()).add(entity.id)
+        self.namespaces.setdefault(entity.namespace, set()).add(entity.id)
+        for key, value in entity._attributes.items():
+            self._index_attribute(entity.id, key, value)
+
+    def _unindex(self, entity: Entity) -> None:
+        del self.entities[entity.id]
+        self._discard(self.types, entity.type, entity.id)
+        self._discard(self.namespaces, entity.namespace, entity.id)
+        for key, value in entity._attributes.items():
+            self._unindex_attribute(entity.id, key, value)
+
+    def _index_attribute(self, id: str, key: str, value) -> None:
+        if _indexable(value):
+            self.attributes.setdefault((key, value), set()).add(id)
+
+    def _unindex_attribute(self, id: str, key: str, value) -> None:
+        if _indexable(value):
+            self._discard(self.attributes, (key, value), id)
+
+    @staticmethod
+    def _discard(index: dict, key, id: str) -> None:
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(id)
+            if not ids:
+                del index[key]
+
+    def get(self, id: str, default=None) -> Entity:
+        return self.entities.get(id, default)
+
+    def __getitem__(self, id: str) -> Entity:
+        try:
+            return self.entities[id]
+        except KeyError:
+            raise EntityNotFound("No entity with id '{}'".format(id))
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.entities
+
+    def __iter__(self) -> iter:
+        return iter(self.entities.values())
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def find(self, type: str = None, namespace: str = None, **attributes) -> list:
+        """ Returns the entities matching all of the given criteria, every criterion is an index lookup """
+        sets = []
+        if type is not None:
+            sets.append(self.types.get(type, ()))
+        if namespace is not None:
+            sets.append(self.namespaces.get(namespace, ()))
+        for key, value in attributes.items():
+            if not _indexable(value):
+                raise ValueError("Attribute '{}' can only be searched on by a hashable value".format(key))
+            sets.append(self.attributes.get((key, value), ()))
+
+        if not sets:
+            return list(self.entities.values())
+
+        sets.sort(key=len)
+        ids = set(sets[0]).intersection(*sets[1:])
+        return [self.entities[id] for id in sorted(ids)]
+
+    def put(self, entity: Entity) -> Entity:
+        """ Adds or replaces an entity """
+        previous = self.entities.get(entity.id)
+        if previous is not None:
+            self._unindex(previous)
+        self._index(entity)
+
+        self._changed(entity.id)
+        return entity
+
+    def update(self, id: str, **attributes) -> Entity:
+        """
+        Changes attributes of an entity, an attribute set to None is removed
+
+        :raise EntityNotFound: If there's no entity with :param id:
+        """
+        entity = self[id]
+        for key, value in attributes.items():
+            if key in entity._attributes:
+                self._unindex_attribute(id, key, entity._attributes.pop(key))
+            if value is not None:
+                entity._attributes[key] = value
+                self._index_attribute(id, key, value)
+
+        self._changed(id)
+        return entity
+
+    def remove(self, id: str) -> Entity:
+        """
+        Removes an entity
+
+        :raise EntityNotFound: If there's no entity with :param id:
+        """
+        entity = self[id]
+        self._unindex(entity)
+
+        self._changed(id)
+        return entity
+
+    def _changed(self, id: str) -> None:
+        self.dirty.add(id)
+        if self.handle is None:
+            self.handle = self.loop.call_later(self.delay, self._save_later)
+
+    def _save_later(self) -> None:
+        self.handle = None
+        self.saving = self.loop.create_task(self.save())
+
+    def _collect(self) -> tuple:
+        """ Takes the changed entities, returns their ids and the documents to append """
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        dirty, self.dirty = sorted(self.dirty), set()
+        # Copies, the entities can change while the documents are written in the executor
+        documents = [self.entities[id].to_dict() if id in self.entities else {'id': id, 'deleted': True}
+                     for id in dirty]
+        for document in documents:
+            if 'attributes' in document:
+                document['attributes'] = dict(document['attributes'])
+
+        return dirty, documents
+
+    def _snapshot(self) -> list:
+        return [dict(entity.to_dict(), attributes=dict(entity._attributes)) for entity in self.entities.values()]
+
+    async def save(self) -> int:
+        """
+        Appends the changed entities to the journal without blocking the loop, returns the
+        amount of entities written. Saves are written one after the other.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            dirty, documents = self._collect()
+            if not documents:
+                return 0
+
+            try:
+                await self.loop.run_in_executor(self.executor, self._append, documents)
+            except Exception:
+                # Written with the next batch
+                self.dirty.update(dirty)
+                raise
+            self.journaled += len(documents)
+
+            if self.journaled >= self.compact_every:
+                await self.loop.run_in_executor(self.executor, self._write_snapshot, self._snapshot())
+                self.journaled = 0
+
+            return len(documents)
+
+    def flush(self) -> int:
+        """
+        Appends the changed entities to the journal right away, returns the amount of entities
+        written. Blocks until the journal is synced, code on the loop uses :meth: `save`.
+        """
+        dirty, documents = self._collect()
+        if not documents:
+            return 0
+
+        try:
+            self._append(documents)
+        except Exception:
+            self.dirty.update(dirty)
+            raise
+        self.journaled += len(documents)
+
+        if self.journaled >= self.compact_every:
+            self.compact()
+
+        return len(documents)
+
+    def _append(self, documents: list) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.journal_path, 'a') as file:
+            yaml.dump_all(documents, file, Dumper=Dumper, explicit_start=True, default_flow_style=True)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def compact(self) -> None:
+        """ Writes every entity to a new snapshot and empties the journal, blocks like :meth: `flush` """
+        self._write_snapshot(self._snapshot())
+        self.journaled = 0
+
+    def _write_snapshot(self, documents: list) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self.snapshot_path + '.tmp'
+        with open(path, 'w') as file:
+            yaml.dump(documents, file, Dumper=Dumper, default_flow_style=False, sort_keys=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path, self.snapshot_path)
+
+        # The snapshot holds every change now, a crash before this only means replaying the journal once more
+        with open(self.journal_path, 'w'):
+            pass
+
+    async def close(self) -> None:
+        """ Writes pending changes, after the save in progress """
+        if self.saving is not None and not self.saving.done():
+            await asyncio.wait([self.saving])
+        self.saving = None
+        await self.save()
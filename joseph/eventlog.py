@@ -0,0 +1,142 @@
+import asyncio
+import datetime
+import mmap
+import os
+
+from .codec import decode_event, encode_event
+
+SEGMENT_SUFFIX = '.log'
+
+
+class EventLog(object):
+    """
+    Durable, append-only record of dispatched events.
+
+    Events are written as length-prefixed binary records (see :mod: `joseph.codec`)
+    to numbered segment files in :param directory:. A new segment is started
+    once the current one exceeds :param segment_size: bytes. Writes are fsynced
+    in batches, after :param fsync_every: events or :param fsync_interval:
+    seconds after the first unsynced event, whichever comes first. The interval
+    is a timer on :param loop:, so the last events of a burst don't wait for
+    the next event to reach the disk.
+
+    The log is fed by the event bus by adding it as a sink:
+
+        log = EventLog('/var/lib/joseph/events')
+        bus.add_sink(log.append)
+
+    Replaying reads the segments through ``mmap``.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024, fsync_every: int = 1000,
+                 fsync_interval: float = 1.0, loop=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.loop = loop or asyncio.get_event_loop()
+
+        self.file = None
+        self.pending = 0
+        self.handle = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def segments(self) -> list:
+        """ Returns the paths of all segments, oldest first """
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open(self) -> None:
+        """ Opens the last segment for appending, after cutting off a torn last record """
+        segments = self.segments()
+        if not segments:
+            self._create(0)
+            return
+
+        path = segments[-1]
+        end = 0
+        for _, end in self._records(path):
+            pass
+
+        if end < os.path.getsize(path):
+            os.truncate(path, end)
+
+        self.file = open(path, 'ab')
+
+    def _create(self, number: int) -> None:
+        """ Starts a new segment """
+        path = os.path.join(self.directory, '{:020d}{}'.format(number, SEGMENT_SUFFIX))
+        self.file = open(path, 'ab')
+
+    def append(self, event) -> None:
+        """ Writes :param event: to the current segment """
+        self.file.write(encode_event(event))
+        self.pending += 1
+
+        if self.pending >= self.fsync_every:
+            self.flush()
+        elif self.handle is None:
+            self.handle = self.loop.call_later(self.fsync_interval, self.flush)
+
+        if self.file.tell() >= self.segment_size:
+            self.rotate()
+
+    def flush(self, fsync: bool = True) -> None:
+        """ Writes buffered events to disk, and makes sure they're on it when :param fsync: is true """
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+        self.pending = 0
+
+    def rotate(self) -> None:
+        """ Closes the current segment and starts the next one """
+        self.flush()
+        self.file.close()
+
+        number = int(os.path.basename(self.file.name)[:-len(SEGMENT_SUFFIX)])
+        self._create(number + 1)
+
+    def close(self) -> None:
+        if self.file is not None and not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    @staticmethod
+    def _records(path: str) -> iter:
+        """ Yields the events of a segment with the offset following them, stops at the first bad record """
+        if not os.path.getsize(path):
+            return
+
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            offset = 0
+            while True:
+                event, offset = decode_event(buffer, offset)
+                if event is None:
+                    return
+                yield event, offset
+
+    def read(self, since: datetime.datetime = None) -> iter:
+        """ Yields every logged event, oldest first, optionally only those dispatched from :param since: """
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+
+        for path in self.segments():
+            for event, _ in self._records(path):
+                if since is None or (event.dispatched_at is not None and event.dispatched_at >= since):
+                    yield event
+
+    def replay(self, callback: callable, since: datetime.datetime = None) -> int:
+        """ Calls :param callback: with every logged event, returns the amount of events replayed """
+        count = 0
+        for event in self.read(since):
+            callback(event)
+            count += 1
+
+        return count
@@ -1,28 +1,82 @@
+import asyncio
+import collections.abc
+import contextlib
 import datetime
-import inspect
+import functools
+import logging
 import os
+import re
+import sys
+import weakref
 from typing import Union
 
-from .core import Joseph
-from .exceptions import InvalidState
-from .utils import State
+from .coalesce import Coalescer, LAST
+from .core import ASYNC, EXECUTORS, Joseph
+from .exceptions import InvalidEvent, InvalidState, QueueFull
+from .limits import Debounce, RateLimit, Throttle
+from .listeners import LEVEL, Listener, ListenerIndex, SEPARATOR, WILDCARD
+from .timers import TimerWheel
+from .utils import StateMachine
+
+logger = logging.getLogger(__name__)
 
 
 class Namespace(object):
-    def __init__(self, namespace: str = None):
+    """
+    Namespaces are interned, creating a namespace with a name that is in use
+    returns the existing instance. The registry only holds weak references, a
+    namespace nothing refers to anymore (ex: one an API client made up) is
+    dropped.
+
+    When no name is provided the filename of the caller is used, it's looked
+    up once per calling code object, so after the first call creating a
+    namespace is a dictionary lookup either way.
+    """
+    __slots__ = ('namespace', '_hash', '__weakref__')
+
+    # name -> weak reference to the namespace
+    _registry = {}
+    _callers = {}
+
+    def __new__(cls, namespace: str = None):
         """ Use the callers filename if no namespace is provided """
         if not namespace:
-            path = inspect.stack()[1].filename
-            namespace = os.path.basename(path).replace(".py", "")
-        self.namespace = namespace
+            code = sys._getframe(1).f_code
+            try:
+                namespace = cls._callers[code]
+            except KeyError:
+                namespace = cls._callers[code] = os.path.basename(code.co_filename).replace(".py", "")
+
+        reference = cls._registry.get(namespace)
+        if reference is not None:
+            instance = reference()
+            if instance is not None:
+                return instance
+
+        instance = super(Namespace, cls).__new__(cls)
+        instance.namespace = namespace
+        instance._hash = hash(namespace)
+
+        cls._registry[namespace] = weakref.ref(instance, functools.partial(cls._forget, namespace))
+        return instance
+
+    @classmethod
+    def _forget(cls, namespace: str, reference: weakref.ref) -> None:
+        """ Drops a namespace nothing refers to anymore, unless it was registered again in the meantime """
+        if cls._registry.get(namespace) is reference:
+            del cls._registry[namespace]
 
     def make_event(self, event: str, **data):
         """ Returns an event on the current namespace """
         return Event(self, event, **data)
 
+    def __reduce__(self) -> tuple:
+        """ Unpickling goes through the registry as well """
+        return Namespace, (self.namespace,)
+
     def __hash__(self) -> int:
         """ Returns the hash of the current namespace """
-        return hash(str(self))
+        return self._hash
 
     def __str__(self) -> str:
         """ Returns the namespace as a string """
@@ -30,123 +84,525 @@ class Namespace(object):
 
     def __eq__(self, other) -> bool:
         """ Compare the hashes of self and other """
-        return hash(self) == hash(other)
+        return self is other or self._hash == hash(other)
 
     def __ne__(self, other) -> bool:
         """ Inverses :meth: __eq__ """
         return not self.__eq__(other)
 
 
+_layouts = {(): {}}
+
+
+class Payload(collections.abc.Mapping):
+    """
+    Read-only mapping holding the data of an event.
+
+    Events with the same data keys share a single key layout, so every
+    payload only has to store a tuple with its values.
+    """
+    __slots__ = ('_layout', '_values')
+
+    def __init__(self, layout: dict, values: tuple):
+        self._layout = layout
+        self._values = values
+
+    @classmethod
+    def layout(cls, keys: tuple) -> dict:
+        """ Returns the shared ``key -> index`` layout for :param keys: """
+        try:
+            return _layouts[keys]
+        except KeyError:
+            return _layouts.setdefault(keys, {key: index for index, key in enumerate(keys)})
+
+    def __getitem__(self, key: str):
+        return self._values[self._layout[key]]
+
+    def __iter__(self) -> iter:
+        return iter(self._layout)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
 class Event(object):
-    """ Represents events """
+    """
+    Represents events
+
+    The fixed fields of an event live in slots, the event data is kept as a
+    separate, read-only :class: `Payload`. Data can be accessed through
+    :attr: `data` or as attributes of the event.
+    """
+    __slots__ = ('NAMESPACE', 'EVENT', 'STRICT', 'COALESCED', 'dispatched_at', '_layout', '_values', '_str',
+                 '_hash')
 
     def __init__(self, namespace: Namespace, event: str = "", strict: bool = True, **data):
         self.NAMESPACE = namespace
         self.EVENT = event
         self.STRICT = strict
+        self.COALESCED = 1
+        self.dispatched_at = None
+
+        keys = tuple(data)
+        self._layout = _layouts.get(keys) or Payload.layout(keys)
+        self._values = tuple(data.values())
+
+    @classmethod
+    def from_data(cls, namespace: Namespace, event: str, data: dict, strict: bool = True) -> 'Event':
+        """ Returns an event carrying :param data:, its keys can be any string (ex: ``event``) """
+        instance = cls(namespace, event, strict)
+        keys = tuple(data)
+        instance._layout = _layouts.get(keys) or Payload.layout(keys)
+        instance._values = tuple(data.values())
+        return instance
+
+    def copy(self, **data) -> 'Event':
+        """ Returns a copy of the event, with its data updated with :param data: """
+        return Event.from_data(self.NAMESPACE, self.EVENT, dict(self.data, **data), self.STRICT)
+
+    def __getattr__(self, key: str):
+        """ Makes the event data accessible as attributes """
+        if key.startswith('_'):
+            raise AttributeError(key)
+
+        try:
+            return self._values[self._layout[key]]
+        except KeyError:
+            raise AttributeError("'{}' has no attribute '{}'".format(self, key))
 
-        self.__dict__.update(data)
+    def __dir__(self) -> list:
+        """ Includes the data keys """
+        return list(object.__dir__(self)) + list(self._layout)
+
+    def __reduce__(self) -> tuple:
+        """ The read-only payload cannot be pickled as is """
+        return _rebuild_event, (self.NAMESPACE, self.EVENT, self.STRICT, dict(self.data), self.COALESCED,
+                                self.dispatched_at)
 
     def __hash__(self) -> int:
-        """ If the strict attribute is true, hash the entire object else only hash the string representation """
-        return hash(self.__dict__) if self.STRICT else hash(str(self))
+        """ Hashes the string representation, equal events always share it """
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(str(self))
+            return self._hash
 
     def __str__(self) -> str:
         """ Always includes namespace and might include event if not empty (format: NAMESPACE:EVENT) """
-        return "{}:{}".format(self.NAMESPACE, self.EVENT) if self.EVENT else "{}".format(self.NAMESPACE)
+        try:
+            return self._str
+        except AttributeError:
+            self._str = "{}:{}".format(self.NAMESPACE, self.EVENT) if self.EVENT else "{}".format(self.NAMESPACE)
+            return self._str
 
     def __eq__(self, other) -> bool:
         """ If either of the events is strict, compare complete events otherwise only compare the string """
-        try:
-            return self.__dict__ == other.__dict__ if self.STRICT or other.STRICT else str(self) == str(other)
-        except AttributeError:
+        if not isinstance(other, Event):
             return False
 
+        if self.STRICT or other.STRICT:
+            return (self.NAMESPACE == other.NAMESPACE and self.EVENT == other.EVENT and
+                    self.data == other.data)
+
+        return str(self) == str(other)
+
     def __ne__(self, other) -> bool:
         """ Inverses :meth: __eq__ """
         return not self.__eq__(other)
 
     @property
-    def data(self):
-        """ Returns all attributes that are not a constant """
-        return {key: value for key, value in self.__dict__.items() if key.islower()}
+    def data(self) -> Payload:
+        """ Returns the read-only event data """
+        return Payload(self._layout, self._values)
 
 
-class EventBus(dict):
-    CLOSED_STATES = (
-        None,
-        "STOPPING",
-        "STOPPED"
-    )
+def _rebuild_event(namespace: Namespace, event: str, strict: bool, data: dict, coalesced: int,
+                   dispatched_at: datetime.datetime) -> Event:
+    """ Recreates a pickled event """
+    instance = Event.from_data(namespace, event, data, strict)
+    instance.COALESCED = coalesced
+    instance.dispatched_at = dispatched_at
 
+    return instance
+
+
+class EventBus(object):
     def __init__(self, joseph: Joseph):
         super(EventBus, self).__init__()
 
         self.joseph = joseph
-        self.state = State(None)
-
-    def listen(self, event: Union[Event, str], priority: int = 9, **data) -> callable:
+        self.state = StateMachine(None, loop=getattr(joseph, 'loop', None))
+        # Only a running event bus accepts dispatches
+        self.closed = True
+        self.state.on_enter("RUNNING", self._opened)
+        self.state.on_exit("RUNNING", self._closed)
+        self.listeners = ListenerIndex()
+        self.coalescers = {}
+        self.limiters = weakref.WeakSet()
+        self.sinks = []
+        self.owner = None
+        self._timers = None
+
+        # The first event bus of Joseph is the one Joseph dispatches its own events on (ex: config:changed)
+        if joseph is not None and getattr(joseph, 'bus', None) is None:
+            joseph.bus = self
+            if getattr(joseph, 'metrics', None) is not None:
+                self.add_sink(joseph.metrics.dispatched)
+
+    def listen(self, event: Union[Event, str, list], priority: int = 9, executor: str = ASYNC, owner=None,
+               timeout: float = None, lane: str = None, debounce: float = None, throttle: float = None,
+               rate_limit: Union[float, tuple] = None, batch: bool = False, **data) -> callable:
         """
         Wrapper function to register a function to be run when the event has been dispatched anywhere in the program
 
         The event listening for can be either an event instance or the string representation
-        of a the event. The priority can be set as an integer, but it _cannot_ be guaranteed
-        a function will be called first
+        of a the event. Either part of the string representation can be a wildcard (ex: ``lights:*``
+        or ``*:state_changed``), an event without a name listens to every event in its namespace.
+        Hierarchical names can have a wildcard per level (ex: ``house.*:light.on``), see :class: `ListenerIndex`.
+        A list of events registers the function for all of them, it's called once for an event matching several.
+        When :param data: is provided the function is only called for events carrying the same values,
+        the data of an event instance is added to it (ex: ``listen(Event(lights, 'on', room='kitchen'))``).
+
+        The priority can be set as an integer, but it _cannot_ be guaranteed a function will be called first.
+        The executor decides where the function runs: ASYNC on the event loop, THREAD in the thread pool
+        for blocking I/O or PROCESS in the process pool for CPU heavy work. Coroutine functions can only
+        run on the event loop.
+
+        The owner (ex: the plugin registering the function) defaults to the owner set by :meth: `owned_by`
+        and can be used to unregister all listeners of the owner at once.
+
+        A call taking longer than :param timeout: seconds (LISTENER_TIMEOUT by default) is cancelled,
+        a function that keeps timing out is taken out of rotation for a while. Heavy functions can be
+        put in a :param lane: of their own, so they don't hold up other listeners (see :meth: `Joseph.add_lane`).
+
+        Functions that only need the latest value can be called less often, per event type:
+        :param debounce: once the events stopped coming for that many seconds, :param throttle:
+        at most once every that many seconds. A :param rate_limit: of ``rate`` or ``(rate, burst)``
+        calls per second drops the events above it. See :mod: `joseph.limits`.
+
+        A :param batch: function is called with a list of events: every event of a batch passed
+        to :meth: `dispatch_many` at once, a single event otherwise.
         """
-        if not isinstance(event, Event):
-            event = make_event_from_string(event, **data)
+        if executor not in EXECUTORS:
+            raise ValueError("Executor should be one of {}, got '{}' instead".format(EXECUTORS, executor))
+        if sum(option is not None for option in (debounce, throttle, rate_limit)) > 1:
+            raise ValueError("Only one of debounce, throttle and rate_limit can be used at once")
+
+        events = [event if isinstance(event, Event) else make_event_from_string(event)
+                  for event in (event if isinstance(event, (list, tuple)) else (event,))]
+        for pattern in events:
+            for key, value in pattern.data.items():
+                if data.setdefault(key, value) != value:
+                    raise ValueError("Listening for '{}' with {!r} and {!r} as '{}' at once".format(
+                        pattern, data[key], value, key))
 
         def inner(func: callable) -> callable:
             """ The inner wrapper function """
-            try:
-                self[event].append((priority, func))
-
-                # Make sure the listeners stay in order
-                self[event].sort()
-            except KeyError:
-                self[event] = [(priority, func)]
+            if executor != ASYNC and asyncio.iscoroutinefunction(func):
+                raise ValueError("Coroutine function {!r} can only run on the {} executor, got '{}' instead".format(
+                    func, ASYNC, executor))
+
+            listener = Listener(func, priority, data=data, executor=executor,
+                                owner=self.owner if owner is None else owner, timeout=timeout, lane=lane,
+                                batch=batch)
+            if debounce is not None:
+                listener.limiter = Debounce(self, listener, debounce)
+            elif throttle is not None:
+                listener.limiter = Throttle(self, listener, throttle)
+            elif rate_limit is not None:
+                rate, burst = rate_limit if isinstance(rate_limit, tuple) else (rate_limit, None)
+                listener.limiter = RateLimit(self, listener, rate, burst)
+            if listener.limiter is not None:
+                self.limiters.add(listener.limiter)
+
+            for pattern in events:
+                self.listeners.add(str(pattern.NAMESPACE), pattern.EVENT or WILDCARD, listener)
             return func
 
         return inner
 
-    def dispatch(self, event: Union[str, Event], **data) -> None:
+    def unlisten(self, func: callable = None, owner=None) -> list:
+        """
+        Unregisters the listeners of :param func: and/or :param owner:, returns the removed listeners.
+        Events a removed listener was holding back (see :param debounce: of :meth: `listen`) are dropped.
+        """
+        removed = self.listeners.remove(func, owner)
+        for listener in removed:
+            if listener.limiter is not None:
+                listener.limiter.cancel()
+                self.limiters.discard(listener.limiter)
+
+        return removed
+
+    @property
+    def timers(self) -> TimerWheel:
+        """ The timer wheel shared by every debounced and throttled listener, created on first use """
+        if self._timers is None:
+            self._timers = TimerWheel(self.joseph.loop)
+        return self._timers
+
+    @contextlib.contextmanager
+    def owned_by(self, owner) -> iter:
+        """ Listeners registered within the context are owned by :param owner: """
+        previous, self.owner = self.owner, owner
+        try:
+            yield self
+        finally:
+            self.owner = previous
+
+    def add_sink(self, sink: callable) -> callable:
+        """
+        Registers a sink, sinks are called synchronously with every dispatched event before
+        any listener is scheduled (ex: to record the event history)
+        """
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink: callable) -> None:
+        """ Unregisters a sink, nothing happens when it isn't registered """
+        try:
+            self.sinks.remove(sink)
+        except ValueError:
+            pass
+
+    def coalesce(self, event: Union[Event, str], mode: str = LAST, window: float = 0.1, key: str = None) -> Coalescer:
+        """
+        Opts the event type in to coalescing: dispatches within :param window: seconds are collapsed
+        into a single batched event before any listener is scheduled. See :class: `Coalescer` for the modes.
+        """
+        if not isinstance(event, Event):
+            event = make_event_from_string(event)
+
+        coalescer = self.coalescers[str(event)] = Coalescer(self, event, mode, window, key)
+        return coalescer
+
+    def dispatch(self, event: Union[str, Event], /, **data) -> None:
         """
         Prepares the event for dispatching, the event to be dispatched can be either an event instance
-         or a string representation of the event.
+         or a string representation of the event. Any key can be used for :param data: (ex: ``event``).
         """
-        if self.state in self.CLOSED_STATES:
+        if self.closed:
             raise InvalidState(
                 "The event bus '{}' is in state {}: dispatching new events is not allowed".format(self.__repr__(),
                                                                                                   self.state))
 
-        if isinstance(event, str):
-            event = make_event_from_string(event)
+        if self.coalescers:
+            coalescer = self.coalescers.get(event if isinstance(event, str) else str(event))
+            if coalescer is not None:
+                coalescer.add(data if isinstance(event, str) else dict(event.data, **data))
+                return
 
-        event.__dict__.update(data)
+        event = self._prepare(event, data)
         event.dispatched_at = datetime.datetime.now()
         self._dispatch(event)
 
+    def dispatch_many(self, events: iter) -> int:
+        """
+        Dispatches a batch of events (ex: every update of a single poll), each either an event
+        instance, a string representation or an ``(event, data)`` pair. Returns the amount of
+        events dispatched, coalesced events included.
+
+        The state is checked and every event is validated before any is dispatched, the whole
+        batch shares a single timestamp and its listener tasks are queued in one go. Listeners
+        registered with ``batch=True`` are called once, with the list of their events.
+
+        :raise InvalidEvent: If any of the events isn't valid, nothing is dispatched then
+        :raise QueueFull: If the listener tasks don't fit the queue, nothing is recorded by the sinks or held
+            back by the limits of listeners then
+        """
+        if self.closed:
+            raise InvalidState(
+                "The event bus '{}' is in state {}: dispatching new events is not allowed".format(self.__repr__(),
+                                                                                                  self.state))
+
+        prepared = []
+        coalesced = []
+        for event in events:
+            event, data = event if isinstance(event, tuple) else (event, {})
+            coalescer = None
+            if self.coalescers:
+                coalescer = self.coalescers.get(event if isinstance(event, str) else str(event))
+            if coalescer is not None:
+                coalesced.append((coalescer, data if isinstance(event, str) else dict(event.data, **data)))
+            else:
+                prepared.append(self._prepare(event, data))
+
+        dispatched_at = datetime.datetime.now()
+        deliveries = []
+        limited = []
+        for event in prepared:
+            event.dispatched_at = dispatched_at
+            for listener in self.get_listeners(event):
+                (deliveries if listener.limiter is None else limited).append((listener, event))
+
+        # Recorded once queued, a batch that doesn't fit the queue isn't recorded either
+        if deliveries:
+            self.joseph.add_tasks_nowait(self._calls(deliveries))
+
+        # Limiters only see an accepted batch, a refused one doesn't hold back events or use up tokens
+        if limited:
+            admitted = [(listener, event) for listener, event in limited if listener.limiter.admit(event)]
+            if admitted:
+                try:
+                    self.joseph.add_tasks_nowait(self._calls(admitted))
+                except QueueFull:
+                    logger.warning("Dropped %d calls of limited listeners, the queue is full", len(admitted))
+
+        for event in prepared:
+            for sink in self.sinks:
+                sink(event)
+
+        for coalescer, data in coalesced:
+            coalescer.add(data)
+        return len(prepared) + len(coalesced)
+
+    @staticmethod
+    def _calls(deliveries: list) -> list:
+        """ Returns the task calls for ``(listener, event)`` pairs, a batch listener gets one call with its events """
+        calls = []
+        batches = {}
+        for listener, event in deliveries:
+            if not listener.batch:
+                calls.append((listener.func, (event,), listener.priority, listener.executor, listener.timeout,
+                              listener.lane))
+            elif listener in batches:
+                batches[listener].append(event)
+            else:
+                batch = batches[listener] = [event]
+                calls.append((listener.func, (batch,), listener.priority, listener.executor, listener.timeout,
+                              listener.lane))
+
+        return calls
+
+    @staticmethod
+    def _prepare(event: Union[str, Event], data: dict) -> Event:
+        """ Returns the event to dispatch for :param event: with :param data: """
+        if isinstance(event, str):
+            namespace, name, wildcard, string = parse_event(event)
+            if wildcard:
+                raise InvalidEvent("Events with a wildcard can only be listened to, got '{}'".format(event))
+            event = Event.from_data(namespace, name, data)
+            event._str = string
+        elif data:
+            event = event.copy(**data)
+        return event
+
     def _dispatch(self, event) -> None:
-        """ Calls the listeners if any and adds them to the main event queue """
+        """ Hands the event to the sinks and adds its listeners to the main event queue """
+        for sink in self.sinks:
+            sink(event)
+
+        self._notify(event)
+
+    def _notify(self, event) -> None:
+        """ Adds the listeners of the event to the main event queue """
         for listener in self.get_listeners(event):
-            self.joseph.add_task(listener(event), priority=3)
+            if listener.limiter is None or listener.limiter.admit(event):
+                self.joseph.add_task_nowait(listener.func, [event] if listener.batch else event,
+                                            priority=listener.priority, executor=listener.executor,
+                                            timeout=listener.timeout, lane=listener.lane)
+
+    def deliver(self, listener: Listener, event: Event) -> None:
+        """ Hands :param event: to a single listener, respecting its limits """
+        if listener.limiter is None or listener.limiter.admit(event):
+            self._schedule(listener, event)
+
+    def _schedule(self, listener: Listener, event: Event) -> None:
+        self.joseph.add_task_nowait(listener.func, [event] if listener.batch else event, priority=listener.priority,
+                                    executor=listener.executor, timeout=listener.timeout, lane=listener.lane)
+
+    def replay(self, events: iter) -> int:
+        """
+        Hands previously dispatched events (ex: from an event log) to their listeners again, the
+        sinks are skipped so the events are not recorded twice. Returns the amount of events replayed.
+        """
+        count = 0
+        for event in events:
+            self._notify(event)
+            count += 1
+
+        return count
 
     def get_listeners(self, event: Event) -> iter:
         """ Yields all listeners for provided event, empty iterable if none are listening """
-        try:
-            for listener in self[event]:
+        for listener in self.listeners.get(str(event.NAMESPACE), event.EVENT):
+            if listener.matches(event):
                 yield listener
-        except KeyError:
-            return iter([])
+
+    def _opened(self, previous: str, state: str) -> None:
+        self.closed = False
+
+    def _closed(self, previous: str, state: str) -> None:
+        self.closed = True
+
+    async def wait_until_running(self) -> None:
+        """ Waits until the event bus accepts dispatches, returns right away when it does """
+        await self.state.wait_for("RUNNING")
+
+    def open(self) -> None:
+        """ Opens the event bus for dispatches, also when it has been stopped before """
+        if self.state == "RUNNING":
+            return
+        if self.state == "STOPPING":
+            self.state.set_state("STOPPED")
+
+        self.state.set_state("STARTING")
+        self.state.set_state("RUNNING")
 
     def stop_soon(self) -> None:
         """ Closes the event bus for new dispatches """
         self.state.set_state("STOPPING")
 
+        for coalescer in self.coalescers.values():
+            coalescer.flush()
+
+        for limiter in list(self.limiters):
+            limiter.flush()
+        if self._timers is not None:
+            self._timers.clear()
+
+
+PARSE_CACHE_SIZE = 4096
+
+_level = re.compile(r'[^\s:.*]+|\*')
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_event(event: str) -> tuple:
+    """
+    Parses a string event representation (ex: ``lights:on``, ``house.kitchen:light.on``
+    or ``house.*``), returns the namespace, the event name, whether it contains a
+    wildcard and the string representation of the event.
+
+    Both parts can have levels separated by dots, a level is either a wildcard or a
+    name without whitespace. The last :const: `PARSE_CACHE_SIZE` distinct strings are
+    remembered, parsing a string again is a cache lookup.
+
+    :raise InvalidEvent: If :param event: isn't a valid event representation
+    """
+    if not isinstance(event, str):
+        raise InvalidEvent("Events are represented as '<namespace>:<event>', got {!r} instead".format(event))
+
+    namespace, _, name = event.partition(SEPARATOR)
+    for part in (namespace, name) if name else (namespace,):
+        for level in part.split(LEVEL):
+            if not _level.fullmatch(level):
+                raise InvalidEvent("Events are represented as '<namespace>:<event>', got '{}' instead".format(event))
+
+    return Namespace(namespace), name, WILDCARD in event, "{}:{}".format(namespace, name) if name else namespace
+
+
+def make_event_from_string(event: str, /, **data) -> Event:
+    """
+    Turns a string event representation into an event instance, see :func: `parse_event`
 
-def make_event_from_string(event, **data) -> Event:
-    """ Turns a string event representation into an event instance """
-    namespace, event = event.split(":")
-    namespace = Namespace(namespace)
+    :raise InvalidEvent: If :param event: isn't a valid event representation
+    """
+    namespace, name, _, string = parse_event(event)
 
-    return namespace.make_event(event, **data)
+    event = Event.from_data(namespace, name, data)
+    event._str = string
+    return event
@@ -11,4 +11,26 @@ class InvalidState(JosephException):
 
 	
 class JosephFileNotFound(JosephException):
-	pass
\ No newline at end of file
+	pass
+
+
+class InvalidEvent(JosephException):
+    pass
+
+
+class QueueFull(JosephException):
+    pass
+
+
+class PluginException(JosephException):
+    pass
+
+
+class EntityNotFound(JosephException):
+    pass
+
+
+class HttpError(JosephException):
+    def __init__(self, status: int, message: str = ''):
+        super(HttpError, self).__init__(message)
+        self.status = status
@@ -0,0 +1,242 @@
+import array
+import bisect
+import datetime
+import time
+from typing import Union
+
+from .listeners import WILDCARD
+
+Timestamp = Union[datetime.datetime, float, int]
+
+
+def _timestamp(value: Timestamp) -> float:
+    """ Turns a datetime into a POSIX timestamp, numbers are returned as is """
+    return value.timestamp() if isinstance(value, datetime.datetime) else float(value)
+
+
+class RingBuffer(object):
+    """
+    Fixed capacity buffer of events ordered by their timestamp, once full the
+    oldest events are overwritten.
+
+    Timestamps are kept in a separate array so time based lookups can binary
+    search them without touching the events. Timestamps are expected to be
+    non-decreasing, an older timestamp is stored as the latest one to keep
+    the buffer sorted.
+    """
+    __slots__ = ('capacity', 'events', 'timestamps', 'start', 'size', 'appended')
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1, got {} instead".format(capacity))
+
+        self.capacity = capacity
+        self.events = [None] * capacity
+        self.timestamps = array.array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+        # Every event appended gets the next sequence number, see :attr: `oldest`
+        self.appended = 0
+
+    def append(self, timestamp: float, event) -> float:
+        """ Adds an event, overwriting the oldest one when the buffer is full, returns the timestamp stored """
+        if self.size:
+            timestamp = max(timestamp, self.timestamps[(self.start + self.size - 1) % self.capacity])
+
+        index = (self.start + self.size) % self.capacity
+        self.events[index] = event
+        self.timestamps[index] = timestamp
+        self.appended += 1
+
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.size += 1
+
+        return timestamp
+
+    @property
+    def oldest(self) -> int:
+        """ Returns the sequence number of the oldest event in the buffer """
+        return self.appended - self.size
+
+    def get(self, sequences: iter) -> list:
+        """ Returns the events with :param sequences:, which should all still be in the buffer """
+        offset = self.start - self.oldest
+        return [self.events[(offset + sequence) % self.capacity] for sequence in sequences]
+
+    def bisect(self, timestamp: float, right: bool = False) -> int:
+        """
+        Returns the position of the first event with a timestamp from
+        :param timestamp: onwards, or after it when :param right: is true.
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            value = self.timestamps[(self.start + middle) % self.capacity]
+            if value < timestamp or (right and value == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def slice(self, start: int, stop: int) -> list:
+        """ Returns the events between the positions :param start: and :param stop:, oldest first """
+        begin = (self.start + start) % self.capacity
+        end = begin + (stop - start)
+        if end <= self.capacity:
+            return self.events[begin:end]
+
+        return self.events[begin:] + self.events[:end - self.capacity]
+
+    def discard(self, count: int) -> int:
+        """ Discards up to :param count: of the oldest events, returns the amount discarded """
+        count = max(0, min(count, self.size))
+        for position in range(count):
+            self.events[(self.start + position) % self.capacity] = None
+
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+        return count
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class TimeIndex(object):
+    """
+    Timestamps and sequence numbers in a :class: `RingBuffer` of the events
+    of a single type, so looking up the events of a type doesn't go through
+    the other events of its namespace. Entries of events the buffer no longer
+    holds are trimmed off lazily.
+    """
+    __slots__ = ('timestamps', 'sequences', 'head')
+
+    def __init__(self):
+        self.timestamps = array.array('d')
+        self.sequences = array.array('q')
+        self.head = 0
+
+    def append(self, timestamp: float, sequence: int) -> None:
+        self.timestamps.append(timestamp)
+        self.sequences.append(sequence)
+
+    def trim(self, oldest: int) -> None:
+        """ Drops the entries of the events before sequence number :param oldest: """
+        self.head = bisect.bisect_left(self.sequences, oldest, self.head)
+
+        # Compacted once half of the arrays are dropped entries, so trimming stays amortized O(1)
+        if self.head > len(self.sequences) // 2:
+            del self.timestamps[:self.head]
+            del self.sequences[:self.head]
+            self.head = 0
+
+    def between(self, start: float, end: float) -> array.array:
+        """ Returns the sequence numbers of the events from :param start: up to and including :param end: """
+        low = bisect.bisect_left(self.timestamps, start, self.head)
+        return self.sequences[low:bisect.bisect_right(self.timestamps, end, low)]
+
+    def __len__(self) -> int:
+        return len(self.sequences) - self.head
+
+
+class EventHistory(object):
+    """
+    In-memory record of dispatched events, with a ring buffer per namespace.
+
+    The history is fed by the event bus by adding it as a sink:
+
+        history = EventHistory(capacity=10000, max_age=3600)
+        bus.add_sink(history.append)
+
+    Time based queries binary search the timestamps of a single namespace,
+    or of a single event type through its :class: `TimeIndex`, so their cost
+    depends on the amount of events returned rather than the amount of events
+    stored. When :param max_age: (seconds) is set, events older than that are
+    evicted as new events come in.
+    """
+
+    def __init__(self, capacity: int = 1000, max_age: float = None):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.rings = {}
+        # (namespace, event) -> TimeIndex
+        self.indexes = {}
+
+    def append(self, event) -> None:
+        """ Records a dispatched event """
+        namespace = str(event.NAMESPACE)
+        try:
+            ring = self.rings[namespace]
+        except KeyError:
+            ring = self.rings[namespace] = RingBuffer(self.capacity)
+
+        timestamp = _timestamp(event.dispatched_at) if event.dispatched_at is not None else time.time()
+        timestamp = ring.append(timestamp, event)
+
+        key = (namespace, event.EVENT)
+        try:
+            index = self.indexes[key]
+        except KeyError:
+            index = self.indexes[key] = TimeIndex()
+        index.append(timestamp, ring.appended - 1)
+        # The buffer holds at most capacity events, so at least half of the entries are dropped ones
+        if len(index) > 2 * self.capacity:
+            index.trim(ring.oldest)
+
+        if self.max_age is not None:
+            ring.discard(ring.bisect(timestamp - self.max_age))
+
+    def between(self, event, start: Timestamp, end: Timestamp = None) -> list:
+        """
+        Returns the events of type :param event: (ex: ``lights:on``) dispatched from
+        :param start: up to and including :param end:, oldest first. A namespace
+        without an event name (or with a wildcard) returns every event of the namespace.
+        """
+        namespace, _, name = str(event).partition(':')
+        try:
+            ring = self.rings[namespace]
+        except KeyError:
+            return []
+
+        end = _timestamp(end) if end is not None else float('inf')
+        if not name or name == WILDCARD:
+            return ring.slice(ring.bisect(_timestamp(start)), ring.bisect(end, right=True))
+
+        index = self.indexes.get((namespace, name))
+        if index is None:
+            return []
+
+        index.trim(ring.oldest)
+        return ring.get(index.between(_timestamp(start), end))
+
+    def last(self, namespace, count: int = 1) -> list:
+        """ Returns the last :param count: events of :param namespace:, oldest first """
+        try:
+            ring = self.rings[str(namespace)]
+        except KeyError:
+            return []
+
+        return ring.slice(max(0, len(ring) - count), len(ring))
+
+    def evict(self, max_age: float = None, max_count: int = None) -> int:
+        """
+        Evicts events older than :param max_age: seconds and/or all but the
+        last :param max_count: events of every namespace. Returns the amount
+        of events evicted.
+        """
+        evicted = 0
+        threshold = time.time() - max_age if max_age is not None else None
+
+        for ring in self.rings.values():
+            if threshold is not None:
+                evicted += ring.discard(ring.bisect(threshold))
+            if max_count is not None:
+                evicted += ring.discard(len(ring) - max_count)
+
+        return evicted
+
+    def __len__(self) -> int:
+        """ Returns the amount of events recorded """
+        return sum(len(ring) for ring in self.rings.values())
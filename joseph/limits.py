@@ -0,0 +1,167 @@
+"""
+Limits on how often a listener is called, set with the ``debounce``,
+``throttle`` and ``rate_limit`` options of :meth: `EventBus.listen`.
+
+Debounce and throttle keep the latest event of every event type the
+listener matches (ex: every sensor of ``sensors:*``), so no event type's
+latest value gets lost. Delayed calls are timers on the event bus' shared
+:class: `TimerWheel`, an event only updates the pending entry of its type.
+"""
+import abc
+import time
+
+
+class Limiter(abc.ABC):
+    """ Decides which events reach :param listener:, delayed events are scheduled on :param bus: """
+
+    def __init__(self, bus, listener):
+        self.bus = bus
+        self.listener = listener
+        self.skipped = 0
+
+    @abc.abstractmethod
+    def admit(self, event) -> bool:
+        """ Returns whether the listener should be called with :param event: right away """
+
+    def flush(self) -> None:
+        """ Calls the listener with the delayed events right away """
+
+    def cancel(self) -> None:
+        """ Drops the delayed events and their timers, the listener is no longer registered """
+
+
+class Debounce(Limiter):
+    """
+    Calls the listener once an event type has been quiet for :param wait:
+    seconds, with the last event of the burst.
+    """
+
+    def __init__(self, bus, listener, wait: float):
+        super(Debounce, self).__init__(bus, listener)
+        self.wait = wait
+        # (namespace, event) -> [latest event, due time, timer]
+        self.pending = {}
+
+    def admit(self, event) -> bool:
+        key = (event.NAMESPACE, event.EVENT)
+        due = self.bus.timers.loop.time() + self.wait
+
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = [event, due, self.bus.timers.call_later(self.wait, self._fire, key)]
+        else:
+            # The timer isn't moved, when it fires it starts over for the time that's left
+            entry[0] = event
+            entry[1] = due
+            self.skipped += 1
+        return False
+
+    def _fire(self, key: tuple) -> None:
+        entry = self.pending.get(key)
+        if entry is None:
+            return
+
+        event, due, _ = entry
+        left = due - self.bus.timers.loop.time()
+        if left > 0:
+            entry[2] = self.bus.timers.call_later(left, self._fire, key)
+            return
+
+        del self.pending[key]
+        self.bus._schedule(self.listener, event)
+
+    def flush(self) -> None:
+        pending, self.pending = self.pending, {}
+        for event, _, timer in pending.values():
+            timer.cancel()
+            self.bus._schedule(self.listener, event)
+
+    def cancel(self) -> None:
+        pending, self.pending = self.pending, {}
+        for _, _, timer in pending.values():
+            timer.cancel()
+
+
+class Throttle(Limiter):
+    """
+    Calls the listener at most once every :param interval: seconds per event
+    type. The first event is passed right away, the last event that came in
+    during the interval is passed when the interval ends.
+    """
+
+    def __init__(self, bus, listener, interval: float):
+        super(Throttle, self).__init__(bus, listener)
+        self.interval = interval
+        # (namespace, event) -> event held back until the interval ends, None when there's none
+        self.windows = {}
+        # (namespace, event) -> timer ending the interval
+        self.timers = {}
+
+    def admit(self, event) -> bool:
+        key = (event.NAMESPACE, event.EVENT)
+        if key not in self.windows:
+            self.windows[key] = None
+            self.timers[key] = self.bus.timers.call_later(self.interval, self._fire, key)
+            return True
+
+        if self.windows[key] is not None:
+            self.skipped += 1
+        self.windows[key] = event
+        return False
+
+    def _fire(self, key: tuple) -> None:
+        # An interval without events closes the window, the next event passes right away again
+        event = self.windows.pop(key, None)
+        if event is None:
+            self.timers.pop(key, None)
+            return
+
+        self.windows[key] = None
+        self.timers[key] = self.bus.timers.call_later(self.interval, self._fire, key)
+        self.bus._schedule(self.listener, event)
+
+    def flush(self) -> None:
+        windows, self.windows = self.windows, {}
+        self.cancel()
+        for event in windows.values():
+            if event is not None:
+                self.bus._schedule(self.listener, event)
+
+    def cancel(self) -> None:
+        timers, self.timers = self.timers, {}
+        self.windows = {}
+        for timer in timers.values():
+            timer.cancel()
+
+
+class RateLimit(Limiter):
+    """
+    Token bucket: the listener is called at most :param rate: times per second
+    on average and at most :param burst: (defaults to :param rate:) times in a
+    row. Events coming in without a token are dropped.
+
+    The bucket is refilled when an event comes in, so it doesn't need a timer.
+    """
+
+    def __init__(self, bus, listener, rate: float, burst: float = None):
+        super(RateLimit, self).__init__(bus, listener)
+        if rate <= 0:
+            raise ValueError("Rate limit should be positive, got {!r} instead".format(rate))
+
+        self.rate = rate
+        self.burst = max(burst or rate, 1)
+        self.tokens = self.burst
+        self.updated = None
+
+    def admit(self, event) -> bool:
+        now = time.monotonic()
+        if self.updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        self.skipped += 1
+        return False
@@ -0,0 +1,246 @@
+import itertools
+
+from .core import ASYNC
+
+WILDCARD = '*'
+
+# Levels of a hierarchical name (ex: ``house.kitchen``) and the namespace from the event name
+LEVEL = '.'
+SEPARATOR = ':'
+
+# Events whose compiled listeners are cached, the cache starts over when it's full
+LISTENER_CACHE_SIZE = 4096
+
+_missing = object()
+
+
+class Listener(object):
+    """
+    A function registered on the event bus together with the options it
+    was registered with.
+
+    Listeners are ordered by priority first and registration order second,
+    so listeners with the same priority are called in the order they were
+    registered.
+    """
+    __slots__ = ('func', 'priority', 'order', 'data', 'executor', 'owner', 'timeout', 'lane', 'batch', 'limiter',
+                 'patterns')
+
+    def __init__(self, func: callable, priority: int = 9, order: int = None, data: dict = None, executor: str = ASYNC,
+                 owner=None, timeout: float = None, lane: str = None, batch: bool = False):
+        self.func = func
+        self.priority = priority
+        self.order = order
+        self.data = data or None
+        self.executor = executor
+        self.owner = owner
+        self.timeout = timeout
+        self.lane = lane
+        self.batch = batch
+        self.limiter = None
+
+        # Every (namespace, event) the listener is registered for
+        self.patterns = []
+
+    def matches(self, event) -> bool:
+        """ Listeners registered with data only match events carrying the same values """
+        if self.data is None:
+            return True
+
+        event_data = event.data
+        for key, value in self.data.items():
+            if event_data.get(key, _missing) != value:
+                return False
+
+        return True
+
+    def __lt__(self, other) -> bool:
+        return (self.priority, self.order) < (other.priority, other.order)
+
+    def __repr__(self) -> str:
+        return 'Listener({!r}, priority={})'.format(self.func, self.priority)
+
+
+def _parts(namespace: str, event: str) -> tuple:
+    """ Returns the levels of the namespace and the event name, with the separator in between """
+    return (*namespace.split(LEVEL), SEPARATOR, *event.split(LEVEL))
+
+
+class _Node(object):
+    """ A single node of the wildcard trie """
+    __slots__ = ('children', 'wildcard', 'rest', 'listeners')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.rest = None
+        self.listeners = []
+
+    def nodes(self) -> iter:
+        """ Yields this node and every node below it """
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            yield node
+            nodes.extend(node.children.values())
+            nodes.extend(child for child in (node.wildcard, node.rest) if child is not None)
+
+
+class ListenerIndex(object):
+    """
+    Keeps track of every registered listener, indexed by namespace and
+    event name.
+
+    Exact registrations live in a ``namespace -> event -> listeners`` table,
+    registrations containing a wildcard (ex: ``lights:*`` or
+    ``*:state_changed``) live in a trie with a level per node. Names can be
+    hierarchical (ex: ``house.kitchen:light.on``): a wildcard matches a
+    single level (``house.*.light``), a wildcard ending the namespace or the
+    event name matches one or more levels (``house.*`` matches
+    ``house.kitchen`` and ``house.kitchen.light``). The merged, priority ordered
+    listeners for an event are compiled on first lookup and cached until
+    the registrations change, so looking up the listeners of an event does
+    not depend on the amount of registered listeners. At most
+    ``LISTENER_CACHE_SIZE`` events are cached, so events made up by clients
+    don't grow it without bound. A listener registered
+    for several events is looked up once for an event matching more than one.
+    """
+
+    def __init__(self):
+        self.table = {}
+        self.patterns = _Node()
+
+        self._cache = {}
+        self._counter = itertools.count()
+
+    def add(self, namespace: str, event: str, listener: Listener) -> Listener:
+        """
+        Registers :param listener: for the event, either part of the event
+        can be a wildcard to match every namespace or event name. Listeners
+        without an order are ordered after every listener registered before.
+        """
+        if listener.order is None:
+            listener.order = next(self._counter)
+        listener.patterns.append((namespace, event))
+
+        if WILDCARD in namespace or WILDCARD in event:
+            node = self.patterns
+            parts = _parts(namespace, event)
+            for position, part in enumerate(parts):
+                if part != WILDCARD:
+                    node = node.children.setdefault(part, _Node())
+                elif position + 1 == len(parts) or parts[position + 1] == SEPARATOR:
+                    if node.rest is None:
+                        node.rest = _Node()
+                    node = node.rest
+                else:
+                    if node.wildcard is None:
+                        node.wildcard = _Node()
+                    node = node.wildcard
+            listeners = node.listeners
+        else:
+            listeners = self.table.setdefault(namespace, {}).setdefault(event, [])
+
+        listeners.append(listener)
+        listeners.sort()
+        self._cache.clear()
+
+        return listener
+
+    def remove(self, func: callable = None, owner=None) -> list:
+        """
+        Unregisters every listener for :param func: and/or every listener registered by :param owner:
+        in a single pass, returns the removed listeners
+        """
+        if func is None and owner is None:
+            return []
+
+        def predicate(listener: Listener) -> bool:
+            return (func is None or listener.func is func) and (owner is None or listener.owner == owner)
+
+        removed = []
+
+        for events in self.table.values():
+            for listeners in events.values():
+                removed.extend(self._remove_from(listeners, predicate))
+
+        for node in self.patterns.nodes():
+            removed.extend(self._remove_from(node.listeners, predicate))
+
+        if removed:
+            self._cache.clear()
+
+        # A listener registered for several events is removed from all of them
+        return list(dict.fromkeys(removed))
+
+    @staticmethod
+    def _remove_from(listeners: list, predicate: callable) -> list:
+        """ Removes the listeners matching :param predicate: in place and returns them """
+        removed = [listener for listener in listeners if predicate(listener)]
+        if removed:
+            listeners[:] = [listener for listener in listeners if not predicate(listener)]
+
+        return removed
+
+    def restore(self, listeners: iter) -> None:
+        """ Registers previously removed listeners again, keeping their original order """
+        for listener in listeners:
+            patterns, listener.patterns = listener.patterns, []
+            for namespace, event in patterns:
+                self.add(namespace, event, listener)
+
+    def get(self, namespace: str, event: str) -> tuple:
+        """ Returns all listeners for the event ordered by priority """
+        key = (namespace, event)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        listeners = list(self.table.get(namespace, {}).get(event, ()))
+        self._match(self.patterns, _parts(namespace, event), 0, listeners)
+        listeners.sort()
+
+        if len(self._cache) >= LISTENER_CACHE_SIZE:
+            self._cache.clear()
+        listeners = self._cache[key] = tuple(dict.fromkeys(listeners))
+        return listeners
+
+    def _match(self, node: _Node, parts: tuple, depth: int, result: list) -> None:
+        """ Walks the trie, collecting listeners of every pattern matching :param parts: """
+        if depth == len(parts):
+            result.extend(node.listeners)
+            return
+
+        part = parts[depth]
+        child = node.children.get(part)
+        if child is not None:
+            self._match(child, parts, depth + 1, result)
+
+        if part == SEPARATOR:
+            return
+
+        if node.wildcard is not None:
+            self._match(node.wildcard, parts, depth + 1, result)
+
+        # Takes every level up to the separator or the end of the name
+        if node.rest is not None:
+            separator = parts.index(SEPARATOR)
+            self._match(node.rest, parts, separator if depth < separator else len(parts), result)
+
+    def _registrations(self) -> iter:
+        """ Yields the listener of every registration, a listener can be registered for several events """
+        for events in self.table.values():
+            for listeners in events.values():
+                yield from listeners
+
+        for node in self.patterns.nodes():
+            yield from node.listeners
+
+    def __iter__(self) -> iter:
+        """ Iterates over every registered listener """
+        return iter(dict.fromkeys(self._registrations()))
+
+    def __len__(self) -> int:
+        """ Returns the amount of registered listeners """
+        return len(dict.fromkeys(self._registrations()))
@@ -0,0 +1,238 @@
+"""
+Instrumentation of the event bus and the workers of Joseph.
+
+    metrics = joseph.enable_metrics()
+    ...
+    metrics.listeners()     # calls, errors and latency of every listener
+    metrics.events()        # dispatches, dispatch rate and queue wait time of every event type
+    metrics.queue_depth()   # tasks waiting per priority, in the shared queue or a lane
+    metrics.prometheus()    # all of the above in the Prometheus text format
+
+Latencies are recorded in :class: `Histogram`, which has log-linear buckets
+like an HDR histogram: recording a value is a couple of integer operations
+and every reading is within 12.5% of the recorded value.
+
+Instrumentation is off unless enabled (ex: with ``METRICS = True`` in the
+config), which leaves a couple of ``is None`` checks per task. Enabled,
+dispatching an event and running its one listener takes about 1.7 µs more:
+7.4 µs instead of 5.8 µs, see ``python -m benchmarks.bench_metrics``.
+"""
+import time
+
+# 2 ** SUB_BITS buckets for every power of two, the width of a bucket is at most 1 / 2 ** SUB_BITS of its values
+SUB_BITS = 3
+SUB_COUNT = 1 << SUB_BITS
+
+BUCKETS = (64 - SUB_BITS + 1) * SUB_COUNT
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram(object):
+    """
+    Counts values (ex: nanoseconds) in log-linear buckets. Values below
+    2 * SUB_COUNT get a bucket of their own, above that every power of two is
+    split in SUB_COUNT buckets.
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        # Room for any 64 bit value, so recording never has to grow the list
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value: int) -> int:
+        """ Returns the bucket of :param value: """
+        shift = value.bit_length() - SUB_BITS - 1
+        if shift <= 0:
+            return value
+        return shift * SUB_COUNT + (value >> shift)
+
+    @staticmethod
+    def upper(index: int) -> int:
+        """ Returns the highest value counted in bucket :param index: """
+        if index < 2 * SUB_COUNT:
+            return index
+        shift, top = divmod(index, SUB_COUNT)
+        return ((top + SUB_COUNT + 1) << (shift - 1)) - 1
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        shift = value.bit_length() - SUB_BITS - 1
+        self.counts[shift * SUB_COUNT + (value >> shift) if shift > 0 else value] += 1
+
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, quantile: float) -> int:
+        """ Returns the value below which :param quantile: of the values fall, 0 without values """
+        if not self.count:
+            return 0
+
+        rank = max(1, round(quantile * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper(index), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, scale: float = 1.0) -> dict:
+        """ Returns the count, mean, max and quantiles, values multiplied by :param scale: """
+        summary = {'count': self.count, 'mean': self.mean() * scale, 'max': self.max * scale}
+        for quantile in QUANTILES:
+            summary['p{:g}'.format(quantile * 100)] = self.quantile(quantile) * scale
+        return summary
+
+
+class ListenerStats(object):
+    __slots__ = ('calls', 'errors', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class EventStats(object):
+    __slots__ = ('dispatched', 'wait')
+
+    def __init__(self):
+        self.dispatched = 0
+        self.wait = Histogram()
+
+
+def _name(func) -> str:
+    module = getattr(func, '__module__', None)
+    name = getattr(func, '__qualname__', None)
+    if module is None or name is None:
+        return repr(func)
+    return '{}.{}'.format(module, name)
+
+
+def _event_name(key: tuple) -> str:
+    namespace, event = key
+    return '{}:{}'.format(namespace, event) if event else str(namespace)
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics(object):
+    """
+    Collects the numbers of :param joseph:. Event dispatches are counted by a
+    sink on the event bus (see :meth: `dispatched`), workers report every task
+    they ran to :meth: `record`.
+    """
+
+    def __init__(self, joseph):
+        # Imported here, the event bus imports Joseph which imports this module
+        from .events import Event
+
+        self.event_type = Event
+        self.joseph = joseph
+        self.started = time.monotonic()
+        self.listener_stats = {}
+        self.event_stats = {}
+
+    def dispatched(self, event) -> None:
+        """ The event bus sink """
+        # Keyed on the parts of the name, formatting the name of every event would cost more than counting it
+        key = (event.NAMESPACE, event.EVENT)
+        stats = self.event_stats.get(key)
+        if stats is None:
+            stats = self.event_stats[key] = EventStats()
+        stats.dispatched += 1
+
+    def record(self, task, started: int, finished: int, failed: bool) -> None:
+        """ Records a task that was queued at ``task.queued_at`` and ran from :param started: to :param finished: """
+        stats = self.listener_stats.get(task.func)
+        if stats is None:
+            stats = self.listener_stats[task.func] = ListenerStats()
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        stats.latency.record(finished - started)
+
+        # Only listener tasks carry an event, tasks queued before enabling metrics have no queue time
+        if task.queued_at is None or not task.args or type(task.args[0]) is not self.event_type:
+            return
+
+        event = task.args[0]
+        key = (event.NAMESPACE, event.EVENT)
+        stats = self.event_stats.get(key)
+        if stats is None:
+            stats = self.event_stats[key] = EventStats()
+        stats.wait.record(started - task.queued_at)
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.listener_stats.clear()
+        self.event_stats.clear()
+
+    def listeners(self) -> dict:
+        """ Returns the calls, errors and latency (in seconds) of every listener that ran """
+        return {_name(func): {'calls': stats.calls, 'errors': stats.errors, 'latency': stats.latency.summary(1e-9)}
+                for func, stats in self.listener_stats.items()}
+
+    def events(self) -> dict:
+        """ Returns the dispatches, dispatches per second and queue wait time (in seconds) of every event type """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {_event_name(key): {'dispatched': stats.dispatched, 'rate': stats.dispatched / elapsed,
+                                  'wait': stats.wait.summary(1e-9)}
+                for key, stats in self.event_stats.items()}
+
+    def queue_depth(self, lane: str = None) -> dict:
+        """ Returns the amount of tasks waiting per priority in the shared queue, or in :param lane: """
+        return (self.joseph.queue if lane is None else self.joseph.lanes[lane]).depths()
+
+    def prometheus(self) -> str:
+        """ Returns every metric in the Prometheus text format """
+        lines = []
+
+        def metric(name: str, kind: str, description: str, samples: iter) -> None:
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for suffix, labels, value in samples:
+                labels = ','.join('{}="{}"'.format(key, _label(str(label))) for key, label in labels)
+                lines.append('{}{}{} {!r}'.format(name, suffix, '{' + labels + '}' if labels else '', value))
+
+        def summary(label: str, stats: dict, attribute: str) -> iter:
+            for key, values in stats.items():
+                histogram = getattr(values, attribute)
+                for quantile in QUANTILES:
+                    yield '', ((label, key), ('quantile', quantile)), histogram.quantile(quantile) / 1e9
+                yield '_sum', ((label, key),), histogram.total / 1e9
+                yield '_count', ((label, key),), histogram.count
+
+        listeners = {_name(func): stats for func, stats in self.listener_stats.items()}
+        metric('joseph_listener_calls_total', 'counter', 'Calls of a listener.',
+               (('', (('listener', name),), stats.calls) for name, stats in listeners.items()))
+        metric('joseph_listener_errors_total', 'counter', 'Calls of a listener that raised an exception.',
+               (('', (('listener', name),), stats.errors) for name, stats in listeners.items()))
+        metric('joseph_listener_latency_seconds', 'summary', 'Time a listener took to run.',
+               summary('listener', listeners, 'latency'))
+        events = {_event_name(key): stats for key, stats in self.event_stats.items()}
+        metric('joseph_events_dispatched_total', 'counter', 'Events dispatched on the event bus.',
+               (('', (('event', name),), stats.dispatched) for name, stats in events.items()))
+        metric('joseph_event_queue_wait_seconds', 'summary', 'Time the listeners of an event waited in the queue.',
+               summary('event', events, 'wait'))
+        # The shared queue has no lane label, every lane is labeled with its name
+        queues = [((), self.joseph.queue)] + [((('lane', name),), lane) for name, lane in self.joseph.lanes.items()]
+        metric('joseph_queue_depth', 'gauge', 'Tasks waiting in the queue or a lane per priority.',
+               (('', labels + (('priority', priority),), depth)
+                for labels, queue in queues for priority, depth in queue.depths().items()))
+        metric('joseph_queue_dropped_total', 'counter', 'Tasks dropped because the queue or a lane was full.',
+               (('', labels, queue.dropped) for labels, queue in queues))
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,359 @@
+import ast
+import importlib.util
+import logging
+import os
+import sys
+
+from .exceptions import PluginException
+from .sandbox import Sandbox
+from .utils.watcher import Watcher
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_PACKAGE = 'joseph_plugins'
+
+
+class Manifest(object):
+    """
+    Describes an installed plugin without importing it.
+
+    The events a plugin listens to are read from the module level ``EVENTS``
+    constant of the plugin, which has to be a literal list of event strings:
+
+        EVENTS = ['lights:*', 'sensors:motion']
+
+        def setup(bus):
+            @bus.listen('lights:on')
+            async def on(event):
+                ...
+
+    A plugin opts in to running in its own process with the ``SANDBOX``
+    constant, either ``True`` or a literal dict of options for
+    :class: `joseph.sandbox.Sandbox`:
+
+        SANDBOX = {'cpu': 60, 'memory': 268435456}
+    """
+    __slots__ = ('name', 'path', 'package', 'events', 'mtime', 'sandbox')
+
+    def __init__(self, name: str, path: str, package: bool, events: tuple, mtime: float, sandbox=None):
+        self.name = name
+        self.path = path
+        self.package = package
+        self.events = events
+        self.mtime = mtime
+        self.sandbox = sandbox
+
+    @classmethod
+    def read(cls, directory: str, name: str):
+        """ Reads the manifest of plugin :param name:, returns None if it's not a plugin """
+        path = os.path.join(directory, name)
+        package = os.path.isdir(path)
+
+        if package:
+            path = os.path.join(path, '__init__.py')
+        elif name.endswith('.py'):
+            name = name[:-3]
+        else:
+            return None
+
+        if name.startswith(('_', '.')) or not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as file:
+            tree = ast.parse(file.read(), path)
+
+        constants = {}
+        for node in tree.body:
+            if not isinstance(node, ast.Assign):
+                continue
+
+            for target in node.targets:
+                if getattr(target, 'id', None) in ('EVENTS', 'SANDBOX'):
+                    try:
+                        constants[target.id] = ast.literal_eval(node.value)
+                    except ValueError:
+                        raise PluginException("{} of plugin '{}' should be a literal".format(target.id, name))
+
+        events = tuple(str(event) for event in constants.get('EVENTS', ()))
+        sandbox = constants.get('SANDBOX') or None
+        if sandbox is not None and not isinstance(sandbox, dict):
+            sandbox = {}
+
+        return cls(name, path, package, events, os.path.getmtime(path), sandbox)
+
+    def __repr__(self) -> str:
+        return 'Manifest({!r}, events={!r})'.format(self.name, self.events)
+
+
+class PluginLoader(object):
+    """
+    Finds, lazily loads and reloads the plugins in :param directory:.
+
+    Scanning only reads the manifests of the plugins. A plugin is imported the
+    first time one of the events in its manifest is dispatched, plugins without
+    declared events or with saved tasks (see :meth: `Joseph.save_tasks`) are
+    imported right away. Once imported, the ``setup(bus)`` function of the
+    plugin is called, every listener registered by the plugin is owned by it
+    so it can be unregistered at once when the plugin is reloaded or removed.
+    A plugin can define ``teardown(bus)`` to clean up.
+
+    :meth: `watch` watches the directory and reloads changed plugins only.
+    """
+
+    def __init__(self, bus, directory: str):
+        self.bus = bus
+        self.directory = directory
+
+        self.manifests = {}
+        self.index = {}
+        self.modules = {}
+        self.watcher = None
+
+    def scan(self) -> dict:
+        """ Builds the manifest index of every plugin in the directory """
+        for name in sorted(os.listdir(self.directory)):
+            try:
+                manifest = Manifest.read(self.directory, name)
+            except (PluginException, SyntaxError):
+                logger.exception("Could not read plugin '%s'", name)
+                continue
+
+            if manifest is not None and manifest.name not in self.manifests:
+                self._register(manifest)
+
+        return self.manifests
+
+    def _register(self, manifest: Manifest) -> None:
+        """ Adds the manifest to the index and waits for its events, or loads the plugin right away """
+        self.manifests[manifest.name] = manifest
+        self._index(manifest)
+
+        # Tasks saved at the previous stop are waiting for the listeners of the plugin
+        if not manifest.events or manifest.name in self.bus.joseph.unresolved:
+            self.load(manifest.name)
+            return
+
+        # A single listener for every declared event, an event matching several of them triggers once
+        self.bus.listen(list(manifest.events), priority=0, owner=self._trigger_owner(manifest.name))(
+            self._trigger(manifest.name))
+
+    def _unregister(self, name: str) -> None:
+        """ Removes the plugin from the index, unloading it if needed """
+        if name in self.modules:
+            self.unload(name)
+        self.bus.unlisten(owner=self._trigger_owner(name))
+
+        self._unindex(self.manifests.pop(name))
+
+    def _index(self, manifest: Manifest) -> None:
+        for event in manifest.events:
+            self.index.setdefault(event, set()).add(manifest.name)
+
+    def _unindex(self, manifest: Manifest) -> None:
+        for event in manifest.events:
+            self.index[event].discard(manifest.name)
+            if not self.index[event]:
+                del self.index[event]
+
+    @staticmethod
+    def _trigger_owner(name: str) -> tuple:
+        return 'trigger', name
+
+    def _trigger(self, name: str) -> callable:
+        """ Returns the listener importing the plugin on the first of its events """
+        def trigger(event):
+            try:
+                module = self.load(name)
+            except PluginException:
+                logger.exception("Could not load plugin '%s'", name)
+                return
+
+            # The plugin missed the event that triggered its import
+            for listener in self.bus.get_listeners(event):
+                if listener.owner == name or listener.owner is module:
+                    self.bus.deliver(listener, event)
+
+        return trigger
+
+    def load(self, name: str):
+        """ Imports the plugin and calls its setup, returns the module """
+        try:
+            return self.modules[name]
+        except KeyError:
+            pass
+
+        self.bus.unlisten(owner=self._trigger_owner(name))
+        module = self.modules[name] = self._import(self.manifests[name])
+        self.bus.joseph.resume_plugin_tasks(name, [listener.func for listener in self.bus.listeners
+                                                   if listener.owner == name])
+        return module
+
+    def _import(self, manifest: Manifest):
+        """ Imports the plugin module and registers its listeners, or starts its sandbox """
+        if manifest.sandbox is not None:
+            return self._sandbox(manifest)
+
+        module_name = '{}.{}'.format(PLUGIN_PACKAGE, manifest.name)
+        locations = [os.path.dirname(manifest.path)] if manifest.package else None
+        spec = importlib.util.spec_from_file_location(module_name, manifest.path,
+                                                      submodule_search_locations=locations)
+        module = importlib.util.module_from_spec(spec)
+
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+            with self.bus.owned_by(manifest.name):
+                if hasattr(module, 'setup'):
+                    module.setup(self.bus)
+        except Exception as e:
+            self.bus.unlisten(owner=manifest.name)
+            self._forget(module_name)
+            raise PluginException("Could not import plugin '{}': {!r}".format(manifest.name, e)) from e
+
+        return module
+
+    def _sandbox(self, manifest: Manifest) -> Sandbox:
+        """ Runs the plugin in its own process """
+        try:
+            sandbox = Sandbox(self.bus, manifest, **manifest.sandbox)
+        except TypeError as e:
+            raise PluginException("Invalid SANDBOX of plugin '{}': {}".format(manifest.name, e)) from e
+
+        sandbox.start()
+        return sandbox
+
+    def unload(self, name: str) -> None:
+        """ Calls the teardown of the plugin and unregisters all of its listeners """
+        module = self.modules.pop(name)
+        self.bus.unlisten(owner=name)
+        self._teardown(module)
+
+    def _teardown(self, module) -> None:
+        """ Stops the sandbox, or calls the teardown of the module and forgets it """
+        if isinstance(module, Sandbox):
+            module.stop()
+            return
+
+        try:
+            if hasattr(module, 'teardown'):
+                module.teardown(self.bus)
+        finally:
+            self._forget(module.__name__)
+
+    @staticmethod
+    def _loaded(module_name: str) -> dict:
+        """ Returns the module and its submodules found in ``sys.modules`` """
+        return {loaded: module for loaded, module in list(sys.modules.items())
+                if loaded == module_name or loaded.startswith(module_name + '.')}
+
+    @classmethod
+    def _forget(cls, module_name: str) -> None:
+        """ Removes the module and its submodules from ``sys.modules`` """
+        for loaded in cls._loaded(module_name):
+            del sys.modules[loaded]
+
+    def reload(self, name: str):
+        """
+        Reloads a loaded plugin. Its listeners are unregistered at once and the
+        previous version is torn down before the new version is set up, so both
+        never run side by side. If importing fails the previous version is set
+        up again.
+        """
+        manifest = self.manifests[name]
+        module = self.modules.pop(name)
+        loaded = {} if isinstance(module, Sandbox) else self._loaded(module.__name__)
+        self.bus.unlisten(owner=name)
+        try:
+            self._teardown(module)
+        except Exception:
+            logger.exception("Teardown of plugin '%s' failed", name)
+
+        try:
+            self.modules[name] = self._import(manifest)
+        except PluginException:
+            self._restore(name, module, loaded)
+            raise
+
+        return self.modules[name]
+
+    def _restore(self, name: str, module, loaded: dict) -> None:
+        """
+        Sets up the previous version of a plugin again, after its new version
+        failed to import. :param loaded: are the modules of the previous version
+        (the plugin and its submodules) to put back in ``sys.modules``.
+        """
+        try:
+            if isinstance(module, Sandbox):
+                module.start()
+            else:
+                sys.modules.update(loaded)
+                with self.bus.owned_by(name):
+                    if hasattr(module, 'setup'):
+                        module.setup(self.bus)
+        except Exception:
+            self.bus.unlisten(owner=name)
+            if not isinstance(module, Sandbox):
+                self._forget(module.__name__)
+            logger.exception("Could not restore the previous version of plugin '%s'", name)
+            return
+
+        self.modules[name] = module
+
+    def watch(self, loop=None, interval: float = 1.0) -> Watcher:
+        """ Reloads plugins when their files change, uses inotify if available and polling otherwise """
+        self.watcher = Watcher(self.directory, self._changed, loop or self.bus.joseph.loop, interval)
+        self.watcher.start()
+        return self.watcher
+
+    def _changed(self, paths: set) -> None:
+        """ Handles the changed plugin files reported by the watcher """
+        names = set()
+        for path in paths:
+            relative = os.path.relpath(path, self.directory)
+            if relative.startswith(os.pardir):
+                continue
+            parts = relative.split(os.sep)
+            if '__pycache__' in parts or os.path.splitext(path)[1] not in ('', '.py'):
+                continue
+            names.add(parts[0])
+
+        for name in sorted(names):
+            try:
+                self._update(name)
+            except (PluginException, SyntaxError):
+                logger.exception("Could not update plugin '%s'", name)
+
+    def _update(self, entry: str) -> None:
+        """ Brings a single plugin, by its directory entry, up to date """
+        manifest = Manifest.read(self.directory, entry)
+        name = manifest.name if manifest else entry[:-3] if entry.endswith('.py') else entry
+
+        if name not in self.manifests:
+            if manifest is not None:
+                self._register(manifest)
+            return
+
+        if manifest is None:
+            self._unregister(name)
+            return
+
+        if name in self.modules:
+            previous = self.manifests[name]
+            self.manifests[name] = manifest
+            try:
+                self.reload(name)
+            except PluginException:
+                self.manifests[name] = previous
+                raise
+
+            self._unindex(previous)
+            self._index(manifest)
+        else:
+            self._unregister(name)
+            self._register(manifest)
+
+    def stop(self) -> None:
+        """ Stops watching the plugin directory """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
@@ -0,0 +1,283 @@
+import collections
+import operator
+
+from .core import ASYNC
+
+
+class Fact(object):
+    """
+    Refers to a value in the rule engine's working memory: the latest value of
+    a data key of an event type. Comparing a fact creates a :class: `Condition`.
+
+    Ex:
+        Fact('sensors:lux', 'value') < 30
+        Fact('sensors:motion', 'detected') == True
+        Fact('house:mode', 'name').is_in(('away', 'night'))
+    """
+    __slots__ = ('event', 'key')
+
+    def __init__(self, event, key: str):
+        self.event = str(event)
+        self.key = key
+
+    @property
+    def field(self) -> tuple:
+        return self.event, self.key
+
+    def __eq__(self, value) -> 'Condition':
+        return Condition(self, operator.eq, value)
+
+    def __ne__(self, value) -> 'Condition':
+        return Condition(self, operator.ne, value)
+
+    def __lt__(self, value) -> 'Condition':
+        return Condition(self, operator.lt, value)
+
+    def __le__(self, value) -> 'Condition':
+        return Condition(self, operator.le, value)
+
+    def __gt__(self, value) -> 'Condition':
+        return Condition(self, operator.gt, value)
+
+    def __ge__(self, value) -> 'Condition':
+        return Condition(self, operator.ge, value)
+
+    def is_in(self, values) -> 'Condition':
+        return Condition(self, _is_in, frozenset(values))
+
+    def test(self, predicate: callable) -> 'Condition':
+        """ Creates a condition that holds when :param predicate: returns true for the value """
+        return Condition(self, _test, predicate)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'Fact({!r}, {!r})'.format(self.event, self.key)
+
+
+def _is_in(value, values) -> bool:
+    return value in values
+
+
+def _test(value, predicate) -> bool:
+    return predicate(value)
+
+
+def _freeze(value):
+    """ Returns a hashable stand-in for :param value:, lists, tuples, sets and dicts are compared by content """
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return dict, frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(value)
+    return value
+
+
+class Condition(object):
+    """
+    A single test of a fact, conditions with the same fact, test and value are shared between rules
+
+    :raise TypeError: If :param value: can't be compared by content (ex: an unhashable object)
+    """
+    __slots__ = ('fact', 'test', 'value', 'key')
+
+    def __init__(self, fact: Fact, test: callable, value):
+        self.fact = fact
+        self.test = test
+        self.value = value
+
+        # Identifies the condition within the network
+        self.key = fact.field + (test, _freeze(value))
+        try:
+            hash(self.key)
+        except TypeError:
+            raise TypeError("Facts can be compared to hashable values, lists, tuples, sets and dicts, "
+                            "got {!r} instead".format(value))
+
+    def evaluate(self, value) -> bool:
+        try:
+            return bool(self.test(value, self.value))
+        except TypeError:
+            return False
+
+    def __repr__(self) -> str:
+        return 'Condition({!r}, {}, {!r})'.format(self.fact, self.test.__name__, self.value)
+
+
+class _Node(object):
+    """ Holds the outcome of a single condition and the rules depending on it """
+    __slots__ = ('condition', 'state', 'rules')
+
+    def __init__(self, condition: Condition):
+        self.condition = condition
+        self.state = False
+        self.rules = []
+
+
+class Rule(object):
+    """ A set of conditions and the action to call once all of them hold """
+    __slots__ = ('name', 'action', 'nodes', 'priority', 'satisfied', 'active')
+
+    def __init__(self, name: str, action: callable, priority: int = 9):
+        self.name = name
+        self.action = action
+        self.priority = priority
+        self.nodes = []
+        self.satisfied = 0
+        self.active = False
+
+    def __repr__(self) -> str:
+        return 'Rule({!r})'.format(self.name)
+
+
+class RuleEngine(object):
+    """
+    Evaluates rules against the events dispatched on the event bus.
+
+    Rules are compiled into a network once, when they're added. Every distinct
+    condition is a single node shared by all rules using it, and nodes are
+    indexed by the fact they test. An incoming event only re-evaluates the
+    nodes of the facts whose value actually changed, and only the rules
+    depending on those nodes are checked. The cost of an event depends on the
+    rules it affects, not on the total amount of rules.
+
+    A rule's action is scheduled when all of its conditions start to hold, it
+    is not scheduled again until one of them has stopped holding first. The
+    action is called with the event that completed the rule.
+
+        engine = RuleEngine(bus)
+
+        @engine.rule(Fact('sensors:motion', 'detected') == True, Fact('sensors:lux', 'value') < 30)
+        async def lights_on(event):
+            ...
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.memory = {}
+        self.rules = {}
+
+        self.nodes = {}
+        self.fields = {}
+        self.events = {}
+
+        bus.add_sink(self.evaluate)
+
+    def rule(self, *conditions: Condition, name: str = None, priority: int = 9) -> callable:
+        """ Decorator registering the function as the action of a rule with the given conditions """
+        def inner(func: callable) -> callable:
+            self.add_rule(name or func.__name__, func, conditions, priority)
+            return func
+
+        return inner
+
+    def add_rule(self, name: str, action: callable, conditions: iter, priority: int = 9) -> Rule:
+        """ Compiles a rule into the network, its conditions are checked against the current memory """
+        if name in self.rules:
+            raise ValueError("A rule named '{}' already exists".format(name))
+
+        rule = Rule(name, action, priority)
+        for condition in conditions:
+            node = self._node(condition)
+            if node not in rule.nodes:
+                rule.nodes.append(node)
+                node.rules.append(rule)
+                rule.satisfied += node.state
+
+        if not rule.nodes:
+            raise ValueError("Rule '{}' needs at least one condition".format(name))
+
+        rule.active = rule.satisfied == len(rule.nodes)
+        self.rules[name] = rule
+        return rule
+
+    def _node(self, condition: Condition) -> _Node:
+        """ Returns the node for :param condition:, creates it if it's the first of its kind """
+        key = condition.key
+        try:
+            return self.nodes[key]
+        except KeyError:
+            pass
+
+        node = self.nodes[key] = _Node(condition)
+
+        field = condition.fact.field
+        self.fields.setdefault(field, []).append(node)
+        self.events.setdefault(field[0], set()).add(field[1])
+
+        if field in self.memory:
+            node.state = condition.evaluate(self.memory[field])
+
+        return node
+
+    def remove_rule(self, name: str) -> Rule:
+        """ Removes a rule, nodes no other rule depends on are removed as well """
+        rule = self.rules.pop(name)
+
+        for node in rule.nodes:
+            node.rules.remove(rule)
+            if node.rules:
+                continue
+
+            condition = node.condition
+            del self.nodes[condition.key]
+
+            field = condition.fact.field
+            self.fields[field].remove(node)
+            if not self.fields[field]:
+                del self.fields[field]
+                self.events[field[0]].discard(field[1])
+                if not self.events[field[0]]:
+                    del self.events[field[0]]
+
+        return rule
+
+    def evaluate(self, event) -> None:
+        """ Updates the memory with the event and schedules the actions of rules that started to hold """
+        name = str(event)
+        keys = self.events.get(name)
+        if not keys:
+            return
+
+        data = event.data
+        affected = collections.OrderedDict()
+
+        for key in keys:
+            if key not in data:
+                continue
+
+            field = (name, key)
+            value = data[key]
+            if field in self.memory and self.memory[field] == value:
+                continue
+            self.memory[field] = value
+
+            for node in self.fields[field]:
+                state = node.condition.evaluate(value)
+                if state == node.state:
+                    continue
+
+                node.state = state
+                for rule in node.rules:
+                    rule.satisfied += 1 if state else -1
+                    affected[rule] = None
+
+        fired = []
+        for rule in affected:
+            active = rule.satisfied == len(rule.nodes)
+            if active and not rule.active:
+                fired.append(rule)
+            else:
+                rule.active = active
+
+        # Queued at once, when they don't fit the queue none of the rules counts as fired
+        if fired:
+            self.bus.joseph.add_tasks_nowait([(rule.action, (event,), rule.priority, ASYNC, None, None)
+                                              for rule in fired])
+            for rule in fired:
+                rule.active = True
+
+    def get(self, event, key: str, default=None):
+        """ Returns the current value of a fact """
+        return self.memory.get((str(event), key), default)
@@ -0,0 +1,402 @@
+"""
+Runs plugins in their own process, so a misbehaving plugin cannot block the
+event loop of Joseph.
+
+Events cross the process boundary through two single producer, single
+consumer ring buffers in shared memory, one for each direction, holding
+records in the format of :mod: `joseph.codec`. Writing a record is followed
+by a single byte on a pipe to wake up the other side, the events themselves
+never go through the pipe.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import struct
+import time
+
+from .codec import HEADER, encode_event, decode_event
+from .core import Joseph, THREAD
+from .events import EventBus
+from .exceptions import JosephException, PluginException, QueueFull
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+WRAP = 0xFFFFFFFF
+
+_position = struct.Struct('<Q')
+_marker = struct.Struct('<I')
+
+# The writer only updates the head, the reader only updates the tail
+HEAD = 0
+TAIL = _position.size
+DATA = 2 * _position.size
+
+
+class SharedRing(object):
+    """
+    Ring buffer of encoded events in shared memory, for a single writer and a single reader.
+
+    The head and the tail are byte positions that only ever grow, their
+    difference is the amount of bytes in use. A record never wraps around the
+    end of the buffer, the writer skips the remaining bytes instead and marks
+    them as skipped when there's room for the marker.
+
+    Creates a new ring of :param size: bytes when :param name: is None, attaches
+    to the existing ring :param name: otherwise.
+    """
+
+    def __init__(self, name: str = None, size: int = 1024 * 1024):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=DATA + size)
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+
+        self.buffer = self.memory.buf
+        self.data = self.buffer[DATA:]
+        self.capacity = len(self.data)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def write(self, record: bytes) -> bool:
+        """ Appends an encoded event, returns False when the ring has no room for it """
+        head = _position.unpack_from(self.buffer, HEAD)[0]
+        tail = _position.unpack_from(self.buffer, TAIL)[0]
+
+        size = len(record)
+        offset = head % self.capacity
+        skip = self.capacity - offset if offset + size > self.capacity else 0
+        if head + skip + size - tail > self.capacity:
+            return False
+
+        if skip:
+            if skip >= _marker.size:
+                _marker.pack_into(self.data, offset, WRAP)
+            offset = 0
+
+        self.data[offset:offset + size] = record
+        _position.pack_into(self.buffer, HEAD, head + skip + size)
+        return True
+
+    def read(self) -> iter:
+        """ Yields the events written since the last read, the space of every event is freed once it's yielded """
+        tail = _position.unpack_from(self.buffer, TAIL)[0]
+
+        while True:
+            head = _position.unpack_from(self.buffer, HEAD)[0]
+            if tail >= head:
+                return
+
+            offset = tail % self.capacity
+            remaining = self.capacity - offset
+            if remaining < HEADER.size or _marker.unpack_from(self.data, offset)[0] == WRAP:
+                tail += remaining
+                _position.pack_into(self.buffer, TAIL, tail)
+                continue
+
+            event, end = decode_event(self.data, offset)
+            if event is None:
+                # Only a bug could get here, drop everything instead of reading garbage
+                logger.error("Corrupt record in shared ring '%s', dropping %d bytes", self.name, head - tail)
+                _position.pack_into(self.buffer, TAIL, head)
+                return
+
+            tail += end - offset
+            _position.pack_into(self.buffer, TAIL, tail)
+            yield event
+
+    def __len__(self) -> int:
+        """ Returns the amount of bytes in use """
+        return _position.unpack_from(self.buffer, HEAD)[0] - _position.unpack_from(self.buffer, TAIL)[0]
+
+    def close(self, unlink: bool = False) -> None:
+        self.data.release()
+        self.buffer = self.data = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _ring(fd: int) -> None:
+    """ Wakes up the other side, a full pipe means it still has to wake up anyway """
+    try:
+        os.write(fd, b'\0')
+    except (BlockingIOError, BrokenPipeError):
+        pass
+
+
+class SandboxBus(EventBus):
+    """ The event bus of a sandboxed plugin, events it dispatches are handed to the event bus of Joseph """
+
+    def __init__(self, joseph: Joseph, ring: SharedRing, fd: int):
+        super(SandboxBus, self).__init__(joseph)
+
+        self.ring = ring
+        self.fd = fd
+
+    def _dispatch(self, event) -> None:
+        """
+        Writes the event to the outbound ring
+
+        :raise QueueFull: If the ring has no room for the event
+        """
+        if not self.ring.write(encode_event(event)):
+            raise QueueFull("The outbound ring of the sandbox is full, dropped {}".format(event))
+        _ring(self.fd)
+
+
+def _limit(cpu: int = None, memory: int = None) -> None:
+    """ Limits the CPU time in seconds and the address space in bytes of the current process """
+    if resource is None:
+        if cpu or memory:
+            logger.warning("Resource limits are not supported on this platform")
+        return
+
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def _run(manifest, inbound: str, outbound: str, inbox, outbox, cpu: int, memory: int, workers: int) -> None:
+    """ Entry point of the sandbox process """
+    from .plugins import PluginLoader
+
+    _limit(cpu, memory)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    joseph = Joseph(loop)
+    # Before the bus exists, so the lifecycle events of this Joseph aren't forwarded
+    joseph.state.set_state('STARTING')
+    joseph.state.set_state('RUNNING')
+    joseph.executors[THREAD] = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    inbound, outbound = SharedRing(inbound), SharedRing(outbound)
+    os.set_blocking(outbox.fileno(), False)
+
+    bus = SandboxBus(joseph, outbound, outbox.fileno())
+    bus.state.set_state('RUNNING')
+
+    manifest.sandbox = None
+    PluginLoader(bus, os.path.dirname(manifest.path))._import(manifest)
+
+    def receive():
+        # Joseph closed its end of the pipe, either by stopping the sandbox or by exiting
+        if not os.read(inbox.fileno(), 4096):
+            loop.stop()
+            return
+
+        for event in inbound.read():
+            bus._notify(event)
+
+    for _ in range(workers):
+        joseph.workers.append(loop.create_task(joseph.worker()))
+
+    loop.add_reader(inbox.fileno(), receive)
+    receive()
+    try:
+        loop.run_forever()
+    finally:
+        inbound.close()
+        outbound.close()
+
+
+class Sandbox(object):
+    """
+    Runs the plugin described by :param manifest: in a child process.
+
+    The sandbox listens to the events of the manifest on :param bus: and
+    forwards them to the plugin, which registers its listeners on a proxy
+    event bus in the child process. Events dispatched by the plugin are
+    dispatched on :param bus:. Events are dropped, and counted in
+    :attr: `dropped`, when the plugin can't keep up and its ring is full.
+
+    :param cpu: limits the CPU time of the process in seconds and
+    :param memory: its address space in bytes. A process exceeding its limits
+    or exiting for any other reason is restarted after :param backoff:
+    seconds, doubling for every consecutive restart, up to
+    :param max_restarts: times. A process that ran for :param stable: seconds
+    resets the count. Events forwarded while the process is down wait in the
+    ring, events the process already took from the ring are lost with it.
+    """
+
+    def __init__(self, bus, manifest, cpu: int = None, memory: int = None, ring_size: int = 1024 * 1024,
+                 workers: int = 2, priority: int = 9, restart: bool = True, max_restarts: int = 5,
+                 backoff: float = 0.5, stable: float = 60.0):
+        if shared_memory is None:
+            raise PluginException("Sandboxed plugins need multiprocessing.shared_memory (Python 3.8+)")
+
+        self.bus = bus
+        self.manifest = manifest
+        self.cpu = cpu
+        self.memory = memory
+        self.ring_size = ring_size
+        self.workers = workers
+        self.priority = priority
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.stable = stable
+
+        self.loop = bus.joseph.loop
+        self.context = multiprocessing.get_context('spawn')
+        self.inbound = None
+        self.outbound = None
+        self.process = None
+        self.inbox = None
+        self.outbox = None
+        self.handle = None
+
+        self.running = False
+        self.restarts = 0
+        self.dropped = 0
+        self.started_at = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        """ Creates the rings, starts the process and starts forwarding events """
+        self.inbound = SharedRing(size=self.ring_size)
+        self.outbound = SharedRing(size=self.ring_size)
+        self.running = True
+
+        try:
+            self._spawn()
+        except Exception as e:
+            self.stop()
+            raise PluginException("Could not start sandbox of plugin '{}': {!r}".format(self.manifest.name, e)) from e
+
+        if self.manifest.events:
+            self.bus.listen(list(self.manifest.events), priority=self.priority, owner=self)(self.forward)
+
+    def _spawn(self) -> None:
+        self.handle = None
+
+        inbox, self.inbox = self.context.Pipe(duplex=False)
+        self.outbox, outbox = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_run, name='joseph-sandbox-{}'.format(self.manifest.name), daemon=True,
+            args=(self.manifest, self.inbound.name, self.outbound.name, inbox, outbox, self.cpu, self.memory,
+                  self.workers))
+        try:
+            process.start()
+        finally:
+            # Only the child holds these ends now, so each side notices when the other one is gone
+            inbox.close()
+            outbox.close()
+        self.process = process
+
+        os.set_blocking(self.inbox.fileno(), False)
+        self.loop.add_reader(self.outbox.fileno(), self._receive)
+        self.loop.add_reader(self.process.sentinel, self._exited)
+        self.started_at = time.monotonic()
+
+        # Events forwarded while the previous process was down are waiting in the ring
+        if len(self.inbound):
+            _ring(self.inbox.fileno())
+
+    def forward(self, event) -> None:
+        """ Writes the event to the ring of the plugin """
+        if not self.inbound.write(encode_event(event)):
+            self.dropped += 1
+            return
+
+        if self.inbox is not None:
+            _ring(self.inbox.fileno())
+
+    def _receive(self) -> None:
+        """ Dispatches the events the plugin dispatched """
+        try:
+            closed = not os.read(self.outbox.fileno(), 4096)
+        except BlockingIOError:
+            closed = False
+
+        for event in self.outbound.read():
+            try:
+                self.bus.dispatch(event)
+            except JosephException:
+                logger.exception("Could not dispatch %s from sandboxed plugin '%s'", event, self.manifest.name)
+
+        if closed:
+            self.loop.remove_reader(self.outbox.fileno())
+
+    def _exited(self) -> None:
+        """ Cleans up after the process exited and restarts it if needed """
+        self._close()
+
+        if not self.running:
+            return
+
+        logger.warning("Sandboxed plugin '%s' exited with code %s", self.manifest.name, self.process.exitcode)
+
+        if time.monotonic() - self.started_at >= self.stable:
+            self.restarts = 0
+
+        if not self.restart or self.restarts >= self.max_restarts:
+            logger.error("Sandboxed plugin '%s' is not restarted anymore", self.manifest.name)
+            self.stop()
+            return
+
+        self.handle = self.loop.call_later(self.backoff * 2 ** self.restarts, self._spawn)
+        self.restarts += 1
+
+    def _close(self) -> None:
+        """ Stops watching the process and closes the pipes, after dispatching what the plugin left behind """
+        if self.outbox is not None:
+            self.loop.remove_reader(self.outbox.fileno())
+            if self.outbound is not None:
+                self._receive()
+            self.outbox.close()
+            self.outbox = None
+
+        if self.inbox is not None:
+            self.inbox.close()
+            self.inbox = None
+
+        if self.process is not None:
+            self.loop.remove_reader(self.process.sentinel)
+            self.process.join()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """ Stops forwarding events, stops the process and releases the rings """
+        self.running = False
+        self.bus.unlisten(owner=self)
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        if self.inbox is not None:
+            # Closing the pipe asks the process to exit
+            self.inbox.close()
+            self.inbox = None
+
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self._close()
+
+        for ring in (self.inbound, self.outbound):
+            if ring is not None:
+                ring.close(unlink=True)
+        self.inbound = self.outbound = None
+
+    def __repr__(self) -> str:
+        return 'Sandbox({!r})'.format(self.manifest.name)
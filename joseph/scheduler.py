@@ -0,0 +1,250 @@
+import asyncio
+import collections
+import concurrent.futures
+import heapq
+import itertools
+
+from .exceptions import QueueFull
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DROP_LOWEST = 'drop_lowest'
+REJECT = 'reject'
+
+POLICIES = (BLOCK, DROP_OLDEST, DROP_LOWEST, REJECT)
+
+
+class Scheduler(object):
+    """
+    Priority queue for Joseph's tasks, built for use on the event loop.
+
+    Every priority level has its own FIFO lane, a heap keeps track of the
+    levels that currently hold items. Putting and getting an item only
+    touches the lane and, when a lane becomes (non-)empty, the heap of
+    levels. Items carry a monotonic sequence number, so items with the same
+    priority are never compared to each other and always leave the queue
+    in the order they were put.
+
+    The scheduler is not thread-safe, code running outside of the event loop
+    (ex: in an executor thread) has to use :meth: `submit_threadsafe`.
+
+    When :param maxsize: is set, the policy decides what happens to new items
+    once the queue is full:
+        BLOCK: :meth: `put` waits for a free slot, :meth: `put_nowait` raises QueueFull
+        DROP_OLDEST: the item that has been waiting the longest is dropped
+        DROP_LOWEST: the newest item with the lowest priority is dropped, which
+            is the new item itself if nothing queued has a lower priority
+        REJECT: the new item is refused by raising QueueFull
+    """
+
+    def __init__(self, loop=None, maxsize: int = 0, policy: str = BLOCK):
+        self.loop = loop or asyncio.get_event_loop()
+        self.maxsize = 0
+        self.policy = BLOCK
+        self.dropped = 0
+
+        self._lanes = {}
+        self._levels = []
+        self._getters = collections.deque()
+        self._putters = collections.deque()
+        self._size = 0
+        self._counter = itertools.count()
+
+        self.limit(maxsize, policy)
+
+    def limit(self, maxsize: int = 0, policy: str = BLOCK) -> None:
+        """ Sets the high-water mark and the policy applied when it is reached, 0 means unbounded """
+        if policy not in POLICIES:
+            raise ValueError("Queue policy should be one of {}, got '{}' instead".format(POLICIES, policy))
+
+        self.maxsize = maxsize or 0
+        self.policy = policy
+
+        while self._putters and not self.full():
+            self._wakeup(self._putters)
+
+    def full(self) -> bool:
+        """ Returns whether the high-water mark has been reached """
+        return 0 < self.maxsize <= self._size
+
+    def put_nowait(self, item, priority: int = 9):
+        """
+        Adds :param item: to the lane of :param priority:, lower priorities run first.
+
+        Returns the item that was dropped to make room, if any.
+        :raise QueueFull: If the queue is full and the policy does not allow dropping items
+        """
+        dropped = None
+
+        if self.full():
+            dropped = self._make_room(item, priority)
+            if dropped is item:
+                return item
+
+        self._put(item, priority)
+        return dropped
+
+    def put_many_nowait(self, items: list) -> list:
+        """
+        Adds a batch of (item, priority) pairs in one go, returns the items that were dropped to make room.
+
+        :raise QueueFull: If the batch doesn't fit and the policy does not allow dropping items, nothing is added then
+        """
+        if self.maxsize and self.policy in (BLOCK, REJECT) and self._size + len(items) > self.maxsize:
+            raise QueueFull("The queue has room for {} of the {} items".format(max(self.maxsize - self._size, 0),
+                                                                             len(items)))
+
+        dropped = []
+        for item, priority in items:
+            if self.full():
+                dropped.append(self._make_room(item, priority))
+                if dropped[-1] is item:
+                    continue
+            self._put(item, priority)
+
+        return dropped
+
+    def _make_room(self, item, priority: int):
+        """ Applies the policy to the full queue, returns the dropped item, which is :param item: if it doesn't fit """
+        if self.policy in (BLOCK, REJECT):
+            raise QueueFull("The queue has reached its limit of {} items".format(self.maxsize))
+        elif self.policy == DROP_OLDEST:
+            return self._drop_oldest()
+
+        lowest = max(self._levels)
+        if priority >= lowest:
+            self.dropped += 1
+            return item
+        return self._drop(lowest, self._lanes[lowest].pop)
+
+    def _put(self, item, priority: int) -> None:
+        """ Puts the item in its lane without checking the limit """
+        lane = self._lanes.get(priority)
+        if lane is None:
+            lane = self._lanes[priority] = collections.deque()
+        if not lane:
+            heapq.heappush(self._levels, priority)
+
+        lane.append((next(self._counter), item))
+        self._size += 1
+        self._wakeup(self._getters)
+
+    def _drop_oldest(self):
+        """ Drops the item that has been waiting the longest, regardless of its priority """
+        priority = min(self._levels, key=lambda level: self._lanes[level][0][0])
+        return self._drop(priority, self._lanes[priority].popleft)
+
+    def _drop(self, priority: int, pop: callable):
+        """ Removes an item from the lane of :param priority: using :param pop: """
+        _, item = pop()
+        if not self._lanes[priority]:
+            self._levels.remove(priority)
+            heapq.heapify(self._levels)
+
+        self._size -= 1
+        self.dropped += 1
+        return item
+
+    async def put(self, item, priority: int = 9):
+        """ Like :meth: `put_nowait`, but waits for a free slot when the policy is BLOCK """
+        while self.policy == BLOCK and self.full():
+            putter = self.loop.create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except:
+                putter.cancel()
+                if not self.full() and not putter.cancelled():
+                    self._wakeup(self._putters)
+                raise
+
+        return self.put_nowait(item, priority)
+
+    def submit_threadsafe(self, item, priority: int = 9) -> concurrent.futures.Future:
+        """
+        Adds :param item: from a thread other than the one running the event loop. Returns a future
+        holding the result of :meth: `put_nowait`, or QueueFull when the item was refused. Refused
+        items are counted in :attr: `dropped`, so they aren't lost silently when nobody checks the future.
+        """
+        future = concurrent.futures.Future()
+
+        def put():
+            try:
+                future.set_result(self.put_nowait(item, priority))
+            except QueueFull as e:
+                self.dropped += 1
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(put)
+        return future
+
+    def get_nowait(self):
+        """ Removes and returns the item with the lowest priority, raises QueueEmpty when there is none """
+        if not self._size:
+            raise asyncio.QueueEmpty()
+
+        priority = self._levels[0]
+        lane = self._lanes[priority]
+
+        _, item = lane.popleft()
+        if not lane:
+            heapq.heappop(self._levels)
+
+        self._size -= 1
+        self._wakeup(self._putters)
+        return item
+
+    async def get(self):
+        """ Removes and returns the item with the lowest priority, waits until one is available """
+        while not self._size:
+            getter = self.loop.create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except:
+                getter.cancel()
+                if self._size and not getter.cancelled():
+                    self._wakeup(self._getters)
+                raise
+
+        return self.get_nowait()
+
+    def drain_nowait(self) -> list:
+        """ Removes every item, returns them as (priority, item) pairs in the order they would have been taken """
+        items = [(priority, item) for priority in sorted(self._levels) for _, item in self._lanes[priority]]
+
+        for priority in self._levels:
+            self._lanes[priority].clear()
+        self._levels.clear()
+        self._size = 0
+
+        while self._putters and not self.full():
+            self._wakeup(self._putters)
+        return items
+
+    @staticmethod
+    def _wakeup(waiters: collections.deque) -> None:
+        """ Wakes up the first of :param waiters: that is still waiting """
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def depth(self, priority: int) -> int:
+        """ Returns the amount of items waiting with :param priority: """
+        return len(self._lanes.get(priority, ()))
+
+    def depths(self) -> dict:
+        """ Returns the amount of items waiting for every priority that has any """
+        return {priority: len(self._lanes[priority]) for priority in sorted(self._levels)}
+
+    def qsize(self) -> int:
+        """ Returns the amount of items waiting in the queue """
+        return self._size
+
+    def empty(self) -> bool:
+        return not self._size
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,147 @@
+import array
+from typing import Union
+
+STATE_CHANGED = 'state_changed'
+
+
+def _number(value) -> bool:
+    """ Deadbands apply to ints and floats, booleans only change when they flip """
+    return type(value) is int or type(value) is float
+
+
+class StateCache(object):
+    """
+    Current state of every entity, derived from the events dispatched on the
+    event bus. The cache is fed by the event bus as a sink:
+
+        state = StateCache(bus)
+        state.track('sensors', deadband={'temperature': 0.5})
+        state.track('lights', entity_key='light')
+
+        @bus.listen('sensors:state_changed', entity='kitchen', attribute='temperature')
+        async def heating(event):
+            ...
+
+        state.get('sensors', 'kitchen', 'temperature')
+
+    Every data key of an event of a tracked namespace is an attribute of an
+    entity. The entity is the value of the :param entity_key: data key of
+    the event, or the event name without one (ex: ``sensors:kitchen``).
+
+    Only a value that differs from the last reported one is propagated, as a
+    ``<namespace>:state_changed`` event carrying the entity, attribute, value
+    and previous value. Numbers have to move by more than their deadband, so
+    a sensor repeating or jittering around the same value dispatches nothing.
+
+    Values live in a table: every (namespace, entity, attribute) gets a slot
+    the first time it's seen, the slot indexes the latest value, the last
+    reported value and the deadband. Reads are a dictionary and a list lookup.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        # namespace -> (entity key, {attribute: deadband}, default deadband)
+        self.tracked = {}
+
+        self.slots = {}
+        self.entities = {}
+        self.values = []
+        self.reported = []
+        self.deadbands = array.array('d')
+        self.suppressed = 0
+
+        bus.add_sink(self.update)
+
+    def track(self, namespace, entity_key: str = None, deadband: Union[float, dict] = None) -> None:
+        """
+        Derives state from the events of :param namespace:. The :param deadband:
+        is either a single amount for every numeric attribute or a dict with the
+        amount per attribute. Tracking a namespace again replaces its options.
+        """
+        if isinstance(deadband, dict):
+            bands, default = dict(deadband), 0.0
+        else:
+            bands, default = {}, float(deadband or 0.0)
+
+        namespace = str(namespace)
+        self.tracked[namespace] = (entity_key, bands, default)
+
+        for (slot_namespace, _, attribute), index in self.slots.items():
+            if slot_namespace == namespace:
+                self.deadbands[index] = bands.get(attribute, default)
+
+    def untrack(self, namespace) -> None:
+        """ Stops deriving state from :param namespace:, its current state stays readable """
+        self.tracked.pop(str(namespace), None)
+
+    def update(self, event) -> None:
+        """ The event bus sink, updates the table and dispatches the changes """
+        namespace = str(event.NAMESPACE)
+        options = self.tracked.get(namespace)
+        if options is None or event.EVENT == STATE_CHANGED:
+            return
+
+        entity_key, bands, default = options
+        data = event.data
+        if entity_key is None:
+            entity = event.EVENT
+        else:
+            entity = data.get(entity_key)
+            if entity is None:
+                return
+
+        changes = []
+        for attribute, value in data.items():
+            if attribute == entity_key:
+                continue
+
+            key = (namespace, entity, attribute)
+            index = self.slots.get(key)
+            if index is None:
+                index = self.slots[key] = len(self.values)
+                self.entities.setdefault((namespace, entity), {})[attribute] = index
+                self.values.append(value)
+                self.reported.append(value)
+                self.deadbands.append(bands.get(attribute, default))
+                changes.append((attribute, value, None))
+                continue
+
+            self.values[index] = value
+            previous = self.reported[index]
+            if previous == value and type(previous) is type(value):
+                self.suppressed += 1
+                continue
+
+            deadband = self.deadbands[index]
+            if deadband and _number(value) and _number(previous) and abs(value - previous) <= deadband:
+                self.suppressed += 1
+                continue
+
+            self.reported[index] = value
+            changes.append((attribute, value, previous))
+
+        # Dispatched after the table is up to date, the listeners read a consistent entity
+        for attribute, value, previous in changes:
+            changed = event.NAMESPACE.make_event(STATE_CHANGED, entity=entity, attribute=attribute, value=value,
+                                                 previous=previous)
+            changed.dispatched_at = event.dispatched_at
+            self.bus._dispatch(changed)
+
+    def get(self, namespace, entity, attribute: str, default=None):
+        """ Returns the latest value of an attribute of an entity """
+        index = self.slots.get((str(namespace), entity, attribute))
+        return default if index is None else self.values[index]
+
+    def entity(self, namespace, entity) -> dict:
+        """ Returns the latest value of every attribute of an entity, empty if it's unknown """
+        return {attribute: self.values[index]
+                for attribute, index in self.entities.get((str(namespace), entity), {}).items()}
+
+    def __contains__(self, key: tuple) -> bool:
+        """ Returns whether a ``(namespace, entity, attribute)`` has a value """
+        namespace, entity, attribute = key
+        return (str(namespace), entity, attribute) in self.slots
+
+    def __len__(self) -> int:
+        """ Returns the amount of attributes in the table """
+        return len(self.values)
@@ -0,0 +1,122 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Timer(object):
+    __slots__ = ('tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, tick: int, callback: callable, args: tuple):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel(object):
+    """
+    Hashed timer wheel: a ring of :param size: slots, every slot holding the
+    timers due in its tick of :param resolution: seconds. Adding a timer is
+    an append to its slot, the wheel only has a single handle on the event
+    loop, set for the first tick a timer is due in. Ticks without timers
+    are skipped, the loop isn't woken up every tick.
+
+    Timers never fire early, but up to one tick late. Timers due more than
+    a full turn ahead wait in their slot until their turn comes.
+    """
+
+    def __init__(self, loop, resolution: float = 0.01, size: int = 256):
+        self.loop = loop
+        self.resolution = resolution
+        self.size = size
+
+        self.slots = [[] for _ in range(size)]
+        self.current = None
+        self.handle = None
+        # The tick the handle is set for
+        self.armed = None
+        self.pending = 0
+
+    def call_later(self, delay: float, callback: callable, *args) -> Timer:
+        """ Calls :param callback: with :param args: after :param delay: seconds, returns the cancellable timer """
+        now = self.loop.time()
+        if self.handle is None:
+            self.current = int(now // self.resolution)
+
+        # Rounded up, a timer fires in the first tick starting after its due time, but never in a passed tick
+        tick = max(-int(-(now + delay) // self.resolution), self.current + 1)
+        timer = Timer(tick, callback, args)
+
+        self.slots[tick % self.size].append(timer)
+        self.pending += 1
+
+        if self.handle is None or tick < self.armed:
+            self._arm(tick)
+        return timer
+
+    def _arm(self, tick: int) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+        self.armed = tick
+        self.handle = self.loop.call_at(tick * self.resolution, self._advance)
+
+    def _next(self) -> int:
+        """ Returns the first tick a pending timer is due in, a turn ahead when every timer is due later """
+        for tick in range(self.current + 1, self.current + self.size + 1):
+            slot = self.slots[tick % self.size]
+            if slot and any(timer.tick <= tick for timer in slot):
+                return tick
+
+        return self.current + self.size
+
+    def _advance(self) -> None:
+        """ Fires the timers of every slot passed since the previous tick """
+        handle = self.handle
+        now = int(self.loop.time() // self.resolution)
+
+        # After a stall longer than a turn every slot is visited once
+        due = []
+        for tick in range(self.current + 1, min(now, self.current + self.size) + 1):
+            slot = self.slots[tick % self.size]
+            if slot:
+                if all(timer.tick <= now for timer in slot):
+                    due.extend(slot)
+                    slot.clear()
+                else:
+                    due.extend(timer for timer in slot if timer.tick <= now)
+                    slot[:] = [timer for timer in slot if timer.tick > now]
+
+        # Moved on before firing, timers added by the callbacks go in the upcoming ticks
+        self.current = max(self.current, now)
+        self.pending -= len(due)
+
+        for timer in due:
+            if timer.cancelled:
+                continue
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception("Timer callback %r failed", timer.callback)
+
+        # Unless a callback cleared the wheel and started it again
+        if self.handle is handle:
+            self.handle = None
+            if self.pending:
+                self._arm(self._next())
+
+    def clear(self) -> None:
+        """ Drops every pending timer """
+        for slot in self.slots:
+            slot.clear()
+        self.pending = 0
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def __len__(self) -> int:
+        """ Returns the amount of pending timers, cancelled timers included until their tick passed """
+        return self.pending
@@ -1,7 +1,11 @@
+import asyncio
+import logging
 from typing import Union
 
 from joseph.exceptions import InvalidState
 
+logger = logging.getLogger(__name__)
+
 
 class State(object):
     """
@@ -20,25 +24,38 @@ class State(object):
 
     def __init__(self, state: Union[int, str, None] = None, states: iter = None):
         self.state = None
+        self.indexes = {state: index for index, state in enumerate(self.STATES)}
         self.set_state(state)
 
         if states:
             self.STATES = tuple([None, ])
+            self.indexes = {None: 0}
             for state in states:
                 self.add_state(state)
 
-    def set_state(self, state: Union[int, str, None]) -> None:
-        """ Update the state """
+    def resolve(self, state: Union[int, str, None]) -> Union[str, None]:
+        """
+        Returns the state :param state: refers to, by name or by index
+
+        :raise InvalidState: If it's not one of the available states
+        """
         try:
             if isinstance(state, int):
-                self.state = self.STATES[state]
-            else:
-                self.state = self.STATES[self.STATES.index(state)]
-        except (ValueError, IndexError):
-            raise InvalidState("State {} is not in the available states: {}".format(state, self.STATES.__repr__()))
+                return self.STATES[state]
+            elif state in self.indexes:
+                return state
+        except IndexError:
+            pass
+
+        raise InvalidState("State {} is not in the available states: {}".format(state, self.STATES.__repr__()))
+
+    def set_state(self, state: Union[int, str, None]) -> None:
+        """ Update the state """
+        self.state = self.resolve(state)
 
     def add_state(self, state) -> None:
         """ While probably not needed, a state can be added at runtime """
+        self.indexes.setdefault(state, len(self.STATES))
         self.STATES += tuple([state, ])
 
     def increase_state(self) -> None:
@@ -52,7 +69,7 @@ class State(object):
     @property
     def current_index(self) -> int:
         """ Returns the index of the current state in the states tuple """
-        return self.STATES.index(self.state)
+        return self.indexes[self.state]
 
     def __str__(self) -> str:
         """ Returns the current state, empty string if no state has been set yet """
@@ -70,3 +87,104 @@ class State(object):
 
     def __ne__(self, other) -> bool:
         return not self.__eq__(other)
+
+
+class StateMachine(State):
+    """
+    A :class: `State` that only allows the transitions in its transition table,
+    runs hooks when a state is entered or left, and lets coroutines wait for
+    a state instead of polling it.
+
+        state = StateMachine('STOPPED')
+        state.on_enter('RUNNING', lambda previous, current: print('Up and running'))
+        await state.wait_for('RUNNING')
+
+    The table maps a state to the states it can move on to, a state missing
+    from the table can move on to any state. Setting the current state again
+    is not a transition. The default table is the one of the default states,
+    custom :param states: need their own :param transitions:.
+    """
+    TRANSITIONS = {
+        None: ('STARTING', 'RUNNING', 'STOPPING', 'STOPPED'),
+        'STARTING': ('RUNNING', 'STOPPING', 'STOPPED'),
+        'RUNNING': ('STOPPING',),
+        'STOPPING': ('STOPPED',),
+        'STOPPED': ('STARTING',),
+    }
+
+    def __init__(self, state: Union[int, str, None] = None, states: iter = None, transitions: dict = None,
+                 loop=None):
+        if transitions is None:
+            if states is not None:
+                raise InvalidState("A state machine with custom states needs a transition table")
+            transitions = self.TRANSITIONS
+
+        self.transitions = {source: frozenset(targets) for source, targets in transitions.items()}
+        self.enter_hooks = {}
+        self.exit_hooks = {}
+        self.transition_hooks = []
+        self.waiters = {}
+        self.loop = loop
+
+        super(StateMachine, self).__init__(state, states)
+
+    def set_state(self, state: Union[int, str, None]) -> None:
+        """
+        Moves on to :param state:, running the exit hooks of the current state,
+        the enter hooks of the new one and the transition hooks, in that order
+
+        :raise InvalidState: If the state doesn't exist or can't be reached from the current state
+        """
+        target = self.resolve(state)
+        source = self.state
+        if target == source:
+            return
+
+        allowed = self.transitions.get(source)
+        if allowed is not None and target not in allowed:
+            raise InvalidState("Can't move on from state {} to {}, only to: {}".format(
+                source, target, sorted(allowed, key=self.indexes.get)))
+
+        self._run_hooks(self.exit_hooks.get(source, ()), source, target)
+        self.state = target
+        self._run_hooks(self.enter_hooks.get(target, ()), source, target)
+        self._run_hooks(self.transition_hooks, source, target)
+
+        for future in self.waiters.pop(target, ()):
+            if not future.done():
+                future.set_result(target)
+
+    @staticmethod
+    def _run_hooks(hooks: iter, source, target) -> None:
+        # A failing hook can't stop the transition, it has already happened for the other hooks
+        for hook in hooks:
+            try:
+                hook(source, target)
+            except Exception:
+                logger.exception("State hook %r failed on %s -> %s", hook, source, target)
+
+    def on_enter(self, state: Union[int, str, None], hook: callable) -> callable:
+        """ Calls :param hook: with the previous and the new state whenever :param state: is entered """
+        self.enter_hooks.setdefault(self.resolve(state), []).append(hook)
+        return hook
+
+    def on_exit(self, state: Union[int, str, None], hook: callable) -> callable:
+        """ Calls :param hook: with the current and the next state whenever :param state: is left """
+        self.exit_hooks.setdefault(self.resolve(state), []).append(hook)
+        return hook
+
+    def on_transition(self, hook: callable) -> callable:
+        """ Calls :param hook: with the previous and the new state on every transition """
+        self.transition_hooks.append(hook)
+        return hook
+
+    def wait_for(self, state: Union[int, str, None]) -> asyncio.Future:
+        """ Returns a future resolved once :param state: is entered, right away when it's the current state """
+        target = self.resolve(state)
+        future = (self.loop or asyncio.get_event_loop()).create_future()
+        if target == self.state:
+            future.set_result(target)
+        else:
+            self.waiters.setdefault(target, []).append(future)
+
+        return future
@@ -0,0 +1,199 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_event = struct.Struct('iIII')
+
+
+class Inotify(object):
+    """
+    Minimal inotify binding using ctypes, only available on Linux.
+
+    :raise OSError: If inotify is not available
+    """
+
+    def __init__(self):
+        path = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(path, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches = {}
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        """ Watches the directory :param path: """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed for '{}'".format(path))
+
+        self.watches[wd] = path
+        return wd
+
+    def read(self) -> list:
+        """ Returns ``(path, mask)`` for every pending event """
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _event.unpack_from(buffer, offset)
+            offset += _event.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            directory = self.watches.get(wd)
+            if directory is not None:
+                events.append((os.path.join(directory, name) if name else directory, mask))
+
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher(object):
+    """
+    Watches a directory tree and calls :param callback: with the set of
+    changed paths.
+
+    Uses inotify when available and falls back to polling modification times
+    every :param interval: seconds otherwise. Changes are collected for
+    :param delay: seconds before the callback is called, so a file saved in
+    several writes results in a single call. Only :param path: itself is
+    watched when :param recursive: is false.
+    """
+
+    def __init__(self, path: str, callback: callable, loop=None, interval: float = 1.0, delay: float = 0.1,
+                 use_inotify: bool = True, recursive: bool = True):
+        self.path = path
+        self.recursive = recursive
+        self.callback = callback
+        self.loop = loop or asyncio.get_event_loop()
+        self.interval = interval
+        self.delay = delay
+        self.use_inotify = use_inotify
+
+        self.inotify = None
+        self.poller = None
+        self.changed = set()
+        self.handle = None
+        self.mtimes = {}
+
+    def start(self) -> None:
+        """ Starts watching, the watcher runs on the event loop """
+        if self.use_inotify:
+            try:
+                self.inotify = Inotify()
+                for directory in self._directories():
+                    self.inotify.add_watch(directory)
+                self.loop.add_reader(self.inotify.fd, self._read)
+                return
+            except (OSError, AttributeError, NotImplementedError):
+                if self.inotify is not None:
+                    self.inotify.close()
+                self.inotify = None
+
+        self.mtimes = self._scan()
+        self.poller = self.loop.create_task(self._poll())
+
+    def stop(self) -> None:
+        """ Stops watching, pending changes are discarded """
+        if self.inotify is not None:
+            self.loop.remove_reader(self.inotify.fd)
+            self.inotify.close()
+            self.inotify = None
+
+        if self.poller is not None:
+            self.poller.cancel()
+            self.poller = None
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    @property
+    def polling(self) -> bool:
+        """ Returns whether the watcher fell back to polling """
+        return self.poller is not None
+
+    def _directories(self, path: str = None) -> iter:
+        """ Yields :param path: (the watched path by default) and, when recursive, its directories """
+        path = path or self.path
+        if not self.recursive:
+            yield path
+            return
+
+        for directory, names, _ in os.walk(path):
+            names[:] = [name for name in names if not name.startswith(('.', '__pycache__'))]
+            yield directory
+
+    def _read(self) -> None:
+        """ Handles pending inotify events """
+        for path, mask in self.inotify.read():
+            if self.recursive and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                for directory in self._directories(path):
+                    try:
+                        self.inotify.add_watch(directory)
+                    except OSError:
+                        # Removed again before it could be watched
+                        continue
+            self._changed(path)
+
+    def _scan(self) -> dict:
+        """ Returns the modification time of every file in the tree """
+        mtimes = {}
+        for directory in self._directories():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+
+            for entry in entries:
+                if entry.is_file():
+                    try:
+                        mtimes[entry.path] = entry.stat().st_mtime
+                    except OSError:
+                        continue
+
+        return mtimes
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            mtimes = self._scan()
+            for path in set(mtimes) | set(self.mtimes):
+                if mtimes.get(path) != self.mtimes.get(path):
+                    self._changed(path)
+            self.mtimes = mtimes
+
+    def _changed(self, path: str) -> None:
+        self.changed.add(path)
+        if self.handle is None:
+            self.handle = self.loop.call_later(self.delay, self._flush)
+
+    def _flush(self) -> None:
+        self.handle = None
+        changed, self.changed = self.changed, set()
+        self.callback(changed)
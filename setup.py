@@ -11,7 +11,7 @@ setup(
     url="https://github.com/NiekKeijzer/joseph",
     packages=["joseph"],
     install_requires=[
-        "janus",
+        "PyYAML>=5.1",
     ],
     tests_require=[
         "asynctest",
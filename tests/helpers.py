@@ -0,0 +1,17 @@
+class Recorder(object):
+    """ Stands in for Joseph, records the listener tasks instead of queueing them """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        # The event (or batch of events) of every task
+        self.tasks = []
+        # (function, event) of every task
+        self.calls = []
+
+    def add_task_nowait(self, task, *args, **kwargs):
+        self.tasks.append(args[0])
+        self.calls.append((task, args[0]))
+
+    def add_tasks_nowait(self, tasks: list) -> None:
+        for task, args, *_ in tasks:
+            self.add_task_nowait(task, *args)
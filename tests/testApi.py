@@ -0,0 +1,209 @@
+import asyncio
+import base64
+import json
+import os
+import struct
+import unittest
+
+from joseph.api import ApiServer, DROP, Message, Subscriber, read_websocket_frame
+from joseph.events import Event, EventBus, Namespace
+
+from tests.helpers import Recorder
+
+
+class TestSubscriber(unittest.TestCase):
+    def setUp(self):
+        self.message = Message(Event(Namespace("lights"), "on", room="kitchen"))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_disconnect(self):
+        subscriber = Subscriber(limit=2)
+        for _ in range(3):
+            subscriber.push(self.message)
+
+        self.assertTrue(subscriber.closed)
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual(len(subscriber.pending), 0)
+
+    def test_drop(self):
+        subscriber = Subscriber(limit=2, policy=DROP)
+        messages = [Message(Event(Namespace("lights"), "on", value=value)) for value in range(5)]
+        for message in messages:
+            subscriber.push(message)
+
+        self.assertFalse(subscriber.closed)
+        self.assertEqual(subscriber.dropped, 3)
+        self.assertEqual(list(subscriber.pending), messages[3:])
+
+    def test_message(self):
+        self.assertEqual(json.loads(self.message.text),
+                         {'namespace': 'lights', 'event': 'on', 'data': {'room': 'kitchen'}, 'dispatched_at': None})
+        self.assertTrue(self.message.sse().startswith(b'event: lights:on\ndata: {'))
+        self.assertIs(self.message.sse(), self.message.sse())
+        self.assertEqual(self.message.websocket()[0], 0x81)
+
+
+class TestApiServer(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.joseph = Recorder(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+
+        self.dispatched = []
+        self.bus.add_sink(self.dispatched.append)
+
+        self.server = ApiServer(self.bus, port=0)
+        self.loop.run_until_complete(self.server.start())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.server.stop())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(asyncio.wait_for(coroutine, 5))
+
+    async def connect(self):
+        return await asyncio.open_connection('127.0.0.1', self.server.port)
+
+    @staticmethod
+    async def request(reader, writer, method, path, body=b'', headers=''):
+        writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n{}\r\n'.format(
+            method, path, len(body), headers).encode('latin-1') + body)
+        head = await reader.readuntil(b'\r\n\r\n')
+        status = int(head.split(b' ')[1])
+        length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+        return status, json.loads((await reader.readexactly(length)).decode('utf-8'))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_dispatch(self):
+        async def test():
+            reader, writer = await self.connect()
+            # Both requests go over the same connection
+            first = await self.request(reader, writer, 'POST', '/events/lights:on', b'{"room": "kitchen"}')
+            second = await self.request(reader, writer, 'POST', '/events/lights:off')
+            # Data keys are free to shadow the arguments of dispatch
+            third = await self.request(reader, writer, 'POST', '/events/lights:on', b'{"event": 1, "strict": 2}')
+            writer.close()
+            return first, second, third
+
+        first, second, third = self.run_async(test())
+        self.assertEqual(first, (202, {'dispatched': 'lights:on'}))
+        self.assertEqual((second[0], third[0]), (202, 202))
+        self.assertEqual([str(event) for event in self.dispatched], ['lights:on', 'lights:off', 'lights:on'])
+        self.assertEqual(self.dispatched[0].room, 'kitchen')
+        self.assertEqual(self.dispatched[2].data, {'event': 1, 'strict': 2})
+
+    def test_errors(self):
+        async def test():
+            results = []
+            for method, path, body in (('POST', '/events/lights', b''), ('POST', '/events/lights:on', b'[1]'),
+                                       ('POST', '/events/lights:on', b'{'), ('GET', '/events/lights:on', b''),
+                                       ('POST', '/unknown', b''), ('GET', '/events?event=lights:%20on', b'')):
+                reader, writer = await self.connect()
+                results.append((await self.request(reader, writer, method, path, body))[0])
+                writer.close()
+            return results
+
+        self.assertEqual(self.run_async(test()), [400, 400, 400, 405, 404, 400])
+
+    def test_metrics(self):
+        async def get():
+            reader, writer = await self.connect()
+            writer.write(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.lower().split(b'content-length: ')[1].split(b'\r\n')[0])
+            body = await reader.readexactly(length)
+            writer.close()
+            return int(head.split(b' ')[1]), head, body
+
+        self.assertEqual(self.run_async(get())[0], 404)
+
+        class Metrics(object):
+            def prometheus(self):
+                return 'joseph_queue_dropped_total 0\n'
+
+        self.joseph.metrics = Metrics()
+        status, head, body = self.run_async(get())
+        self.assertEqual(status, 200)
+        self.assertIn(b'Content-Type: text/plain; version=0.0.4', head)
+        self.assertEqual(body, b'joseph_queue_dropped_total 0\n')
+
+    def test_closed_bus(self):
+        self.bus.state.set_state("STOPPING")
+
+        async def test():
+            reader, writer = await self.connect()
+            result = await self.request(reader, writer, 'POST', '/events/lights:on')
+            writer.close()
+            return result
+
+        self.assertEqual(self.run_async(test())[0], 503)
+
+    def test_sse(self):
+        async def test():
+            reader, writer = await self.connect()
+            writer.write(b'GET /events?event=lights:*&event=lights:on HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            head = await reader.readuntil(b'\r\n\r\n')
+
+            self.bus.dispatch("sensors:motion")
+            self.bus.dispatch("lights:on", room="kitchen")
+            chunk = await reader.readuntil(b'\n\n')
+            writer.close()
+            return head, chunk
+
+        head, chunk = self.run_async(test())
+        self.assertIn(b'Content-Type: text/event-stream', head)
+        name, data = chunk.decode('utf-8').strip().split('\n')
+        self.assertEqual(name, 'event: lights:on')
+        self.assertEqual(json.loads(data[len('data: '):])['data'], {'room': 'kitchen'})
+
+    def test_websocket(self):
+        async def test():
+            reader, writer = await self.connect()
+            key = base64.b64encode(os.urandom(16)).decode('latin-1')
+            writer.write('GET /events?event=lights:on HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n'
+                         'Connection: Upgrade\r\nSec-WebSocket-Key: {}\r\nSec-WebSocket-Version: 13\r\n\r\n'
+                         .format(key).encode('latin-1'))
+            head = await reader.readuntil(b'\r\n\r\n')
+
+            self.bus.dispatch("lights:on", room="kitchen")
+            frame = await read_websocket_frame(reader, 1024)
+
+            # A masked ping from the client is answered with a pong
+            mask = os.urandom(4)
+            writer.write(struct.pack('!BB', 0x89, 0x84) + mask + bytes(b ^ mask[i] for i, b in enumerate(b'ping')))
+            pong = await read_websocket_frame(reader, 1024)
+
+            writer.close()
+            return head, frame, pong
+
+        head, (opcode, payload), pong = self.run_async(test())
+        self.assertTrue(head.startswith(b'HTTP/1.1 101'))
+        self.assertEqual(opcode, 0x1)
+        self.assertEqual(json.loads(payload.decode('utf-8'))['event'], 'on')
+        self.assertEqual(pong, (0xA, b'ping'))
+
+    def test_slow_client(self):
+        self.server.max_pending = 10
+
+        async def test():
+            reader, writer = await self.connect()
+            writer.write(b'GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n')
+            await reader.readuntil(b'\r\n\r\n')
+            self.assertEqual(len(self.server.subscriptions), 1)
+
+            # Nothing is read and the stream can't be written in between
+            for value in range(11):
+                self.bus.dispatch("lights:on", value=value)
+            await reader.read()
+            writer.close()
+
+        self.run_async(test())
+        self.assertEqual(len(self.server.subscriptions), 0)
@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from joseph.coalesce import COLLECT, LAST, MERGE, Coalescer
+from joseph.events import EventBus
+
+from tests.helpers import Recorder
+
+
+def listener(event):
+    pass
+
+
+class TestCoalesce(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Recorder(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.bus.listen("sensors:power")(listener)
+
+    def tearDown(self):
+        self.loop.close()
+        del self.bus
+
+    def run_window(self):
+        self.loop.run_until_complete(asyncio.sleep(0.02))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            self.bus.coalesce("sensors:power", mode="foo")
+
+    def test_last(self):
+        coalescer = self.bus.coalesce("sensors:power", mode=LAST, window=0.01)
+        self.assertIsInstance(coalescer, Coalescer)
+
+        for watts in range(100):
+            self.bus.dispatch("sensors:power", watts=watts)
+        self.assertEqual(len(coalescer), 100)
+        self.assertEqual(self.joseph.tasks, [])
+
+        self.run_window()
+        self.assertEqual(len(self.joseph.tasks), 1)
+
+        event = self.joseph.tasks[0]
+        self.assertEqual(event.COALESCED, 100)
+        self.assertEqual(event.watts, 99)
+        self.assertEqual(len(coalescer), 0)
+
+    def test_merge(self):
+        self.bus.coalesce("sensors:power", mode=MERGE, window=0.01)
+
+        self.bus.dispatch("sensors:power", watts=1, phase=1)
+        self.bus.dispatch("sensors:power", watts=2)
+        self.run_window()
+
+        event = self.joseph.tasks[0]
+        self.assertEqual(event.COALESCED, 2)
+        self.assertEqual(event.watts, 2)
+        self.assertEqual(event.phase, 1)
+
+    def test_collect(self):
+        self.bus.coalesce("sensors:power", mode=COLLECT, window=0.01)
+
+        self.bus.dispatch("sensors:power", watts=1)
+        self.bus.dispatch("sensors:power", watts=2)
+        self.run_window()
+
+        event = self.joseph.tasks[0]
+        self.assertEqual(event.events, [{'watts': 1}, {'watts': 2}])
+
+    def test_key(self):
+        self.bus.coalesce("sensors:power", window=0.01, key="meter")
+
+        for watts in range(10):
+            self.bus.dispatch("sensors:power", meter=watts % 2, watts=watts)
+        self.run_window()
+
+        self.assertEqual(len(self.joseph.tasks), 2)
+        self.assertEqual(sorted(event.watts for event in self.joseph.tasks), [8, 9])
+        self.assertEqual([event.COALESCED for event in self.joseph.tasks], [5, 5])
+
+    def test_stop_soon_flushes(self):
+        self.bus.coalesce("sensors:power", window=10)
+
+        self.bus.dispatch("sensors:power", watts=1)
+        self.bus.stop_soon()
+
+        self.assertEqual(len(self.joseph.tasks), 1)
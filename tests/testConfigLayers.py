@@ -0,0 +1,97 @@
+import asyncio
+import os
+import pickle
+import unittest
+
+from joseph.config import CLI, DEFAULTS, ENV, FILE, OVERRIDE, Config, coerce
+from joseph.exceptions import ConfigException
+
+
+class TestLayeredConfig(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.config = Config(WORKER_COUNT=2, DEBUG=False)
+        os.environ["JOSEPH_WORKER_COUNT"] = "4"
+        os.environ["JOSEPH_QUEUE_POLICY"] = "drop_oldest"
+
+    def tearDown(self):
+        self.loop.close()
+        del os.environ["JOSEPH_WORKER_COUNT"]
+        del os.environ["JOSEPH_QUEUE_POLICY"]
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_precedence(self):
+        self.config.set_layer(FILE, {'WORKER_COUNT': 3, 'DEBUG': True})
+        self.assertEqual((self.config.WORKER_COUNT, self.config.origin('WORKER_COUNT')), (3, FILE))
+
+        self.loop.run_until_complete(self.config.from_env_vars())
+        self.assertEqual((self.config.WORKER_COUNT, self.config.origin('WORKER_COUNT')), (4, ENV))
+
+        self.loop.run_until_complete(self.config.from_args(['WORKER_COUNT=5']))
+        self.assertEqual((self.config.WORKER_COUNT, self.config.origin('WORKER_COUNT')), (5, CLI))
+
+        self.config.override('WORKER_COUNT', 6)
+        self.assertEqual((self.config.WORKER_COUNT, self.config.origin('WORKER_COUNT')), (6, OVERRIDE))
+
+        with self.assertRaises(KeyError):
+            self.config.origin('FOO')
+
+    def test_assignment(self):
+        self.config['QUEUE_MAX_SIZE'] = 10
+        self.assertEqual(self.config.origin('QUEUE_MAX_SIZE'), DEFAULTS)
+
+        # A value shadowed by a higher layer would be dropped, it's an override instead
+        self.config.set_layer(FILE, {'WORKER_COUNT': 3})
+        self.config.WORKER_COUNT = 1
+        self.assertEqual((self.config.WORKER_COUNT, self.config.origin('WORKER_COUNT')), (1, OVERRIDE))
+        self.assertEqual(self.config.layer(DEFAULTS)['WORKER_COUNT'], 2)
+
+        self.loop.run_until_complete(self.config.from_env_vars())
+        self.config.update(QUEUE_POLICY='block')
+        self.assertEqual((self.config.QUEUE_POLICY, self.config.origin('QUEUE_POLICY')), ('block', OVERRIDE))
+
+    def test_env_keys(self):
+        self.loop.run_until_complete(self.config.from_env_vars(keys=['WORKER_COUNT', 'DEBUG']))
+        self.assertEqual(dict(self.config.layer(ENV)), {'WORKER_COUNT': 4})
+        self.assertNotIn('QUEUE_POLICY', self.config)
+
+    def test_replace_layer(self):
+        self.config.set_layer(FILE, {'DEBUG': True, 'QUEUE_MAX_SIZE': 10})
+        self.config.set_layer(FILE, {'QUEUE_MAX_SIZE': 20})
+
+        # Keys dropped from a layer fall back to a lower one, or are gone
+        self.assertEqual((self.config.DEBUG, self.config.origin('DEBUG')), (False, DEFAULTS))
+        self.assertEqual(self.config.QUEUE_MAX_SIZE, 20)
+        self.config.set_layer(FILE, {})
+        self.assertNotIn('QUEUE_MAX_SIZE', self.config)
+
+        with self.assertRaises(ConfigException):
+            self.config.set_layer('foo', {})
+        with self.assertRaises(ConfigException):
+            self.config.set_layer(FILE, {'debug': True})
+
+    def test_coerce(self):
+        self.loop.run_until_complete(self.config.from_env_vars())
+        self.assertEqual(self.config.WORKER_COUNT, 4)
+        self.assertEqual(self.config.QUEUE_POLICY, 'drop_oldest')
+
+        self.assertEqual([coerce(value) for value in ('True', '1.5', '[1, 2]', 'None', 'kitchen hall')],
+                         [True, 1.5, [1, 2], None, 'kitchen hall'])
+
+        with self.assertRaises(ConfigException):
+            self.loop.run_until_complete(self.config.from_args(['--debug']))
+
+    def test_copy(self):
+        self.config.override('DEBUG', True)
+        config = Config(self.config)
+        self.assertEqual(config.origin('DEBUG'), OVERRIDE)
+
+        config = pickle.loads(pickle.dumps(self.config))
+        self.assertEqual(config, self.config)
+        self.assertEqual(config.origin('DEBUG'), OVERRIDE)
+
+        del config['DEBUG']
+        self.assertNotIn('DEBUG', config)
+        self.assertIn('DEBUG', self.config)
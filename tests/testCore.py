@@ -0,0 +1,457 @@
+import asyncio
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from joseph.breaker import CircuitBreaker
+from joseph.config import Config
+from joseph.core import ASYNC, CONFIG_SCHEMA, LANE_MAX_SIZE, PROCESS, THREAD, Joseph, Task
+from joseph.events import Event, EventBus, make_event_from_string
+from joseph.exceptions import InvalidEvent, InvalidState, QueueFull
+from joseph.scheduler import DROP_OLDEST, REJECT
+
+
+def double(value):
+    return value * 2
+
+
+async def double_async(value):
+    return value * 2
+
+
+class TestJoseph(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Joseph(self.loop)
+
+    def tearDown(self):
+        for executor in self.joseph.executors.values():
+            executor.shutdown()
+        self.loop.close()
+        del self.joseph
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_run_async(self):
+        self.assertEqual(self.loop.run_until_complete(self.joseph.run(double_async, (2,))), 4)
+        self.assertEqual(self.loop.run_until_complete(self.joseph.run(double, (2,), executor=ASYNC)), 4)
+
+    def test_run_without_executor(self):
+        with self.assertRaises(InvalidState):
+            self.loop.run_until_complete(self.joseph.run(double, (2,), executor=THREAD))
+
+    def test_run_executors(self):
+        self.joseph.executors[THREAD] = concurrent.futures.ThreadPoolExecutor(1)
+        self.joseph.executors[PROCESS] = concurrent.futures.ProcessPoolExecutor(1)
+
+        result = self.loop.run_until_complete(self.joseph.run(double, (2,), executor=THREAD))
+        self.assertEqual(result, 4)
+
+        pid = self.loop.run_until_complete(self.joseph.run(os.getpid, executor=PROCESS))
+        self.assertNotEqual(pid, os.getpid())
+
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self.joseph.run(double_async, (2,), executor=THREAD))
+
+    def test_add_task_is_lazy(self):
+        calls = []
+
+        async def task():
+            calls.append(True)
+
+        self.joseph.add_task_nowait(task)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(calls, [])
+
+        queued = self.joseph.queue.get_nowait()
+        self.assertIsInstance(queued, Task)
+        self.loop.run_until_complete(self.joseph.run(queued.func, queued.args, queued.kwargs, queued.executor))
+        self.assertEqual(calls, [True])
+
+    def test_worker_priority(self):
+        results = []
+
+        self.joseph.add_task_nowait(results.append, "low", priority=9)
+        self.joseph.add_task_nowait(results.append, "high", priority=1)
+        self.joseph.add_task_nowait(results.append, "same", priority=9)
+
+        async def run_workers():
+            worker = self.loop.create_task(self.joseph.worker())
+            await asyncio.sleep(0.01)
+            worker.cancel()
+
+        self.loop.run_until_complete(run_workers())
+        self.assertEqual(results, ["high", "low", "same"])
+
+    def test_add_tasks(self):
+        results = []
+
+        self.joseph.add_tasks_nowait([(results.append, ("low",), 9, ASYNC, None, None),
+                                      (results.append, ("high",), 1, ASYNC, None, None),
+                                      (results.append, ("lane",), 9, ASYNC, None, 'batch')])
+        self.assertEqual(self.joseph.queue.qsize(), 2)
+        self.assertEqual(self.joseph.lanes['batch'].qsize(), 1)
+
+        async def run():
+            self.joseph.resize_workers(1)
+            await self.joseph.drain(1)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(sorted(results), ["high", "lane", "low"])
+        self.assertLess(results.index("high"), results.index("low"))
+        self.stop_workers()
+
+    def test_dispatch_many(self):
+        bus = EventBus(self.joseph)
+        bus.state.set_state("RUNNING")
+        single, batches = [], []
+        bus.listen("lights:*")(single.append)
+        bus.listen("lights:*", batch=True)(batches.append)
+
+        count = bus.dispatch_many(["lights:on", ("lights:off", {'room': 'hall'}),
+                                   make_event_from_string("lights:dim", level=3)])
+        self.assertEqual(count, 3)
+        self.assertEqual(self.joseph.queue.qsize(), 4)
+
+        async def run():
+            self.joseph.resize_workers(1)
+            await self.joseph.drain(1)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual([str(event) for event in single], ["lights:on", "lights:off", "lights:dim"])
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([str(event) for event in batches[0]], ["lights:on", "lights:off", "lights:dim"])
+        self.assertEqual(len({event.dispatched_at for event in batches[0]}), 1)
+
+        # A batch listener gets a list for a single dispatch as well
+        bus.dispatch("lights:on")
+        self.assertIsInstance(self.joseph.queue.get_nowait().args[0], Event)
+        self.assertEqual(len(self.joseph.queue.get_nowait().args[0]), 1)
+
+        with self.assertRaises(InvalidEvent):
+            bus.dispatch_many(["lights:on", "lights:*"])
+        self.assertEqual(self.joseph.queue.qsize(), 0)
+
+        # Events whose listeners can't be queued aren't recorded as dispatched
+        recorded = []
+        bus.add_sink(recorded.append)
+        self.joseph.queue.limit(2, REJECT)
+        with self.assertRaises(QueueFull):
+            bus.dispatch_many(["lights:on", "lights:off"])
+        self.assertEqual((recorded, self.joseph.queue.qsize()), ([], 0))
+
+        # Nor held back by the limits of listeners
+        bus.listen("lights:*", debounce=10)(recorded.append)
+        limiter = bus.listeners.get("lights", "on")[-1].limiter
+        with self.assertRaises(QueueFull):
+            bus.dispatch_many(["lights:on", "lights:off"])
+        self.assertEqual(limiter.pending, {})
+        bus.stop_soon()
+        self.stop_workers()
+
+    def test_resize_workers(self):
+        results = []
+
+        async def resize():
+            self.joseph.resize_workers(3)
+            await asyncio.sleep(0)
+            self.assertEqual(len(self.joseph.workers), 3)
+            self.assertEqual(len(self.joseph.idle), 3)
+
+            # A busy worker retires once its task is done
+            started = asyncio.Event()
+
+            async def busy():
+                started.set()
+                await asyncio.sleep(0.01)
+                results.append("busy")
+
+            self.joseph.add_task_nowait(busy)
+            await started.wait()
+            self.joseph.resize_workers(0)
+            self.assertEqual(len(self.joseph.workers), 1)
+            self.assertEqual(self.joseph.retiring, 1)
+
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.joseph.workers, [])
+            self.assertEqual(self.joseph.retiring, 0)
+
+            self.joseph.resize_workers(1)
+            self.joseph.add_task_nowait(results.append, "after")
+            await asyncio.sleep(0.01)
+            for worker in self.joseph.workers:
+                worker.cancel()
+
+        self.loop.run_until_complete(resize())
+        self.assertEqual(results, ["busy", "after"])
+
+    def test_reload_config(self):
+        self.joseph.config = Config(WORKER_COUNT=1, QUEUE_MAX_SIZE=10).freeze(CONFIG_SCHEMA)
+        bus = EventBus(self.joseph)
+        bus.state.set_state("RUNNING")
+        dispatched = []
+        bus.add_sink(dispatched.append)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".py") as file:
+            file.write("WORKER_COUNT = 2\nQUEUE_MAX_SIZE = 10\nQUEUE_POLICY = 'drop_oldest'\n")
+            file.flush()
+            changed = self.loop.run_until_complete(self.joseph.reload_config(file.name))
+
+            self.assertEqual(changed, {'WORKER_COUNT': (1, 2), 'QUEUE_POLICY': (None, DROP_OLDEST)})
+            self.assertEqual(self.joseph.config.WORKER_COUNT, 2)
+            self.assertEqual(len(self.joseph.workers), 2)
+            self.assertEqual(self.joseph.executors[THREAD]._max_workers, 2)
+            self.assertNotIn(PROCESS, self.joseph.executors)
+            self.assertEqual(self.joseph.queue.policy, DROP_OLDEST)
+            self.assertEqual([str(event) for event in dispatched], ["config:changed"])
+            self.assertEqual(dispatched[0].changed, changed)
+
+            # Nothing changed, nothing is applied
+            self.assertEqual(self.loop.run_until_complete(self.joseph.reload_config(file.name)), {})
+
+            # An invalid config is ignored
+            file.write("WORKER_COUNT = 'many'\n")
+            file.flush()
+            with self.assertLogs("joseph.core", "ERROR"):
+                self.assertEqual(self.loop.run_until_complete(self.joseph.reload_config(file.name)), {})
+            self.assertEqual(self.joseph.config.WORKER_COUNT, 2)
+
+        for worker in self.joseph.workers:
+            worker.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+    def test_reload_live(self):
+        self.joseph.config = Config(LANES={"heavy": {"workers": 1}}).freeze(CONFIG_SCHEMA)
+        self.joseph.state.set_state("STARTING")
+        self.joseph.state.set_state("RUNNING")
+        self.joseph.lane("heavy")
+        self.joseph.breakers[print] = CircuitBreaker()
+
+        self.joseph.override_config(LANES={"heavy": {"workers": 2, "maxsize": 5}}, BREAKER_THRESHOLD=5)
+        self.assertEqual((self.joseph.lanes["heavy"].maxsize, self.joseph.lane_sizes["heavy"]), (5, 2))
+        self.assertEqual(len(self.joseph.lane_workers), 2)
+        self.assertEqual(self.joseph.breakers[print].threshold, 5)
+
+        # Fewer workers and a new entity path wait for a restart
+        with self.assertLogs("joseph.core", "WARNING") as logs:
+            self.joseph.override_config(LANES={"heavy": {"workers": 1}}, ENTITY_PATH="elsewhere")
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(self.joseph.lanes["heavy"].maxsize, LANE_MAX_SIZE)
+        self.stop_workers()
+
+    def test_override_config(self):
+        self.joseph.config = Config(QUEUE_MAX_SIZE=10, FOO='bar').freeze(CONFIG_SCHEMA)
+
+        self.assertEqual(self.joseph.override_config(QUEUE_MAX_SIZE=20), {'QUEUE_MAX_SIZE': (10, 20)})
+        self.assertEqual(self.joseph.queue.maxsize, 20)
+        self.assertEqual(self.joseph.config_sources.origin('QUEUE_MAX_SIZE'), 'override')
+        self.assertEqual(self.joseph.override_config(QUEUE_MAX_SIZE=20), {})
+
+    def test_lifecycle_events(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for key, value in (("WORKER_COUNT", 1), ("CONFIG_WATCH", False), ("PROCESS_POOL_SIZE", 1),
+                           ("ENTITY_PATH", os.path.join(directory, "entities")),
+                           ("PENDING_TASKS_PATH", os.path.join(directory, "tasks.pickle"))):
+            self.joseph.config.override(key, value)
+
+        # The bus isn't opened by hand, starting Joseph opens it
+        bus = EventBus(self.joseph)
+        dispatched = []
+        bus.add_sink(dispatched.append)
+
+        # Stopping before starting does nothing
+        self.loop.run_until_complete(self.joseph._stop_procedure())
+        self.assertEqual((self.joseph.state, dispatched), ("STOPPED", []))
+
+        running = asyncio.ensure_future(bus.wait_until_running(), loop=self.loop)
+        self.loop.run_until_complete(self.joseph._start_procedure())
+        self.assertEqual([str(event) for event in dispatched], ["joseph:starting", "joseph:running"])
+        self.assertEqual(dispatched[1].previous, "STARTING")
+        self.assertTrue(running.done())
+
+        self.loop.run_until_complete(self.joseph._stop_procedure())
+        self.assertEqual(str(dispatched[-1]), "joseph:stopping")
+        self.assertTrue(bus.closed)
+
+        # Stopping again does nothing either
+        self.loop.run_until_complete(self.joseph._stop_procedure())
+        self.assertEqual(self.joseph.state, "STOPPED")
+
+        # Starting again opens the stopped bus again
+        bus.open()
+        self.assertFalse(bus.closed)
+
+    def test_drain(self):
+        results = []
+
+        async def slow(name):
+            await asyncio.sleep(0.02)
+            results.append(name)
+
+        async def drain():
+            self.joseph.resize_workers(1)
+            for name, priority in (("low", 9), ("high", 1), ("normal", 5)):
+                self.joseph.add_task_nowait(slow, name, priority=priority)
+            return await self.joseph.drain(1)
+
+        self.assertEqual(self.loop.run_until_complete(drain()), [])
+        self.assertEqual(results, ["high", "normal", "low"])
+
+        async def timeout():
+            for name in ("first", "second", "third"):
+                self.joseph.add_task_nowait(slow, name)
+            return await self.joseph.drain(0.01)
+
+        pending = self.loop.run_until_complete(timeout())
+        self.assertEqual([task.args for _, task in pending], [("second",), ("third",)])
+        self.assertEqual(len(self.joseph.running), 1)
+
+        for worker in self.joseph.workers:
+            worker.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(self.joseph.running, {})
+
+    def test_save_tasks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "pending", "tasks.pickle")
+
+        tasks = [(1, Task(double, (2,))), (9, Task(lambda: None)), (5, Task(os.getpid, executor=PROCESS))]
+        with self.assertLogs("joseph.core", "WARNING"):
+            self.assertEqual(self.joseph.save_tasks(tasks, path), 2)
+
+        self.assertEqual(self.joseph.resume_tasks(path), 2)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.joseph.resume_tasks(path), 0)
+
+        first, second = self.joseph.queue.get_nowait(), self.joseph.queue.get_nowait()
+        self.assertEqual((first.func, first.args), (double, (2,)))
+        self.assertEqual(second.executor, PROCESS)
+
+        # Nothing is written when no task could be saved
+        with self.assertLogs("joseph.core", "WARNING"):
+            self.assertEqual(self.joseph.save_tasks([(9, Task(lambda: None))], path), 0)
+        self.assertFalse(os.path.exists(path))
+
+    def stop_workers(self):
+        for worker in self.joseph.workers + self.joseph.lane_workers:
+            worker.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+    def test_timeout(self):
+        results = []
+
+        async def hang():
+            await asyncio.sleep(10)
+            results.append("hang")
+
+        async def run():
+            self.joseph.resize_workers(1)
+            self.joseph.add_task_nowait(hang, timeout=0.01)
+            self.joseph.add_task_nowait(results.append, "next")
+            await self.joseph.drain(1)
+
+        with self.assertLogs("joseph.core", "WARNING"):
+            self.loop.run_until_complete(run())
+        self.assertEqual(results, ["next"])
+        self.assertEqual(self.joseph.expired, set())
+        self.assertEqual(self.joseph.breakers[hang].failures, 1)
+
+        # The worker survived its cancellation
+        self.joseph.add_task_nowait(results.append, "after")
+        self.loop.run_until_complete(self.joseph.drain(1))
+        self.assertEqual(results, ["next", "after"])
+        self.stop_workers()
+
+    def test_swallowed_timeout(self):
+        async def stubborn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                pass
+
+        async def run():
+            self.joseph.resize_workers(1)
+            self.joseph.add_task_nowait(stubborn, timeout=0.01)
+            await self.joseph.drain(1)
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(self.joseph.expired, set())
+        self.assertEqual(self.joseph.breakers[stubborn].failures, 1)
+
+        # Cancelling the worker afterwards isn't mistaken for a timeout
+        workers = list(self.joseph.workers)
+        for worker in workers:
+            worker.cancel()
+        self.loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+        self.assertTrue(all(worker.cancelled() for worker in workers))
+
+    def test_circuit_breaker(self):
+        self.joseph.config = Config(LISTENER_TIMEOUT=0.01, BREAKER_THRESHOLD=2, BREAKER_COOLDOWN=10)
+        calls = []
+
+        def block():
+            # Blocks the loop, so it can't be cancelled but still counts as timing out
+            calls.append(True)
+            time.sleep(0.02)
+
+        async def run():
+            self.joseph.resize_workers(1)
+            for _ in range(2):
+                self.joseph.add_task_nowait(block)
+                await self.joseph.drain(1)
+
+            self.joseph.add_task_nowait(block)
+            await self.joseph.drain(1)
+
+        with self.assertLogs("joseph.core", "WARNING"):
+            self.loop.run_until_complete(run())
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(self.joseph.breakers[block].open)
+        self.assertEqual(self.joseph.breakers[block].skipped, 1)
+        self.stop_workers()
+
+    def test_breaker_trial(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=5)
+        self.assertFalse(breaker.failure(now=0))
+        self.assertTrue(breaker.failure(now=0))
+
+        self.assertFalse(breaker.allow(now=1))
+        self.assertTrue(breaker.allow(now=5))
+        # Only one trial at a time
+        self.assertFalse(breaker.allow(now=6))
+        self.assertTrue(breaker.failure(now=6))
+        self.assertFalse(breaker.allow(now=7))
+
+        # A task queued before the breaker opened timing out only extends the cooldown
+        self.assertFalse(breaker.failure(now=8))
+        self.assertFalse(breaker.allow(now=12))
+        self.assertTrue(breaker.allow(now=13))
+
+    def test_lanes(self):
+        self.joseph.config = Config(LANES={'heavy': {'workers': 1, 'maxsize': 2}})
+        results = []
+
+        async def heavy(name):
+            await asyncio.sleep(0.05)
+            results.append(name)
+
+        async def run():
+            self.joseph.resize_workers(1)
+            for number in range(4):
+                self.joseph.add_task_nowait(heavy, number, lane='heavy')
+            self.joseph.add_task_nowait(results.append, "light")
+            await asyncio.sleep(0.01)
+            self.assertEqual(results, ["light"])
+            await self.joseph.drain(1)
+
+        self.loop.run_until_complete(run())
+        # The lane is bounded and drops its oldest waiting tasks
+        self.assertEqual(results, ["light", 2, 3])
+        self.assertEqual(self.joseph.lanes['heavy'].dropped, 2)
+        self.stop_workers()
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from joseph.entities import Entity, EntityStore
+from joseph.exceptions import EntityNotFound
+
+
+class TestEntityStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.store = self.make_store()
+
+        self.store.put(Entity("lights.kitchen", "light", "lights", {"on": False, "room": "kitchen"}))
+        self.store.put(Entity("lights.hall", "light", "lights", {"on": True, "room": "hall"}))
+        self.store.put(Entity("sensors.kitchen", "motion", "sensors", {"room": "kitchen", "zones": [1, 2]}))
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def make_store(self, **kwargs):
+        return EntityStore(self.directory, self.loop, **kwargs)
+
+    def make_store_loaded(self):
+        store = self.make_store()
+        store.load()
+        return store
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_find(self):
+        self.assertEqual([entity.id for entity in self.store.find(type="light")], ["lights.hall", "lights.kitchen"])
+        self.assertEqual([entity.id for entity in self.store.find(room="kitchen")],
+                         ["lights.kitchen", "sensors.kitchen"])
+        self.assertEqual([entity.id for entity in self.store.find(namespace="lights", on=True)], ["lights.hall"])
+        self.assertEqual(self.store.find(type="thermostat"), [])
+        self.assertEqual(len(self.store.find()), 3)
+
+        with self.assertRaises(ValueError):
+            self.store.find(zones=[1, 2])
+
+    def test_update(self):
+        entity = self.store.update("lights.kitchen", on=True, room=None, brightness=80)
+
+        self.assertEqual(dict(entity.attributes), {"on": True, "brightness": 80})
+        self.assertEqual([entity.id for entity in self.store.find(room="kitchen")], ["sensors.kitchen"])
+        self.assertEqual(len(self.store.find(type="light", on=True)), 2)
+
+        with self.assertRaises(TypeError):
+            entity.attributes["on"] = False
+        with self.assertRaises(EntityNotFound):
+            self.store.update("lights.attic", on=True)
+
+    def test_remove(self):
+        self.store.remove("sensors.kitchen")
+
+        self.assertNotIn("sensors.kitchen", self.store)
+        self.assertEqual(self.store.find(type="motion"), [])
+        self.assertNotIn("motion", self.store.types)
+        with self.assertRaises(EntityNotFound):
+            self.store["sensors.kitchen"]
+
+    def test_persistence(self):
+        self.assertEqual(self.store.flush(), 3)
+        self.store.update("lights.kitchen", on=True)
+        self.store.remove("lights.hall")
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.store.flush(), 0)
+
+        # Only the journal was written to
+        self.assertFalse(os.path.exists(self.store.snapshot_path))
+
+        store = self.make_store()
+        self.assertEqual(store.load(), 2)
+        self.assertEqual(store["lights.kitchen"], self.store["lights.kitchen"])
+        self.assertEqual(store.journaled, 5)
+        self.assertEqual([entity.id for entity in store.find(room="kitchen", on=True)], ["lights.kitchen"])
+
+    def test_compact(self):
+        self.store.compact_every = 4
+        self.store.flush()
+        self.store.update("lights.kitchen", on=True)
+        self.store.flush()
+
+        self.assertEqual(self.store.journaled, 0)
+        self.assertEqual(os.path.getsize(self.store.journal_path), 0)
+
+        store = self.make_store()
+        self.assertEqual(store.load(), 3)
+        self.assertTrue(store["lights.kitchen"].attributes["on"])
+
+    def test_torn_journal(self):
+        self.store.flush()
+        with open(self.store.journal_path, "a") as file:
+            file.write("--- {id: lights.attic, type: li")
+
+        size = os.path.getsize(self.store.journal_path) - len("--- {id: lights.attic, type: li")
+
+        store = self.make_store()
+        with self.assertLogs("joseph.entities", "WARNING"):
+            self.assertEqual(store.load(), 3)
+        self.assertNotIn("lights.attic", store)
+
+        # The torn tail is cut off, so changes written after it are read back
+        self.assertEqual(os.path.getsize(store.journal_path), size)
+        store.put(Entity("lights.cellar", "light", "lights"))
+        store.flush()
+        self.assertIn("lights.cellar", self.make_store_loaded())
+
+    def test_empty_journal_document(self):
+        self.store.flush()
+        with open(self.store.journal_path, "a") as file:
+            file.write("---\n")
+
+        store = self.make_store()
+        with self.assertLogs("joseph.entities", "WARNING"):
+            self.assertEqual(store.load(), 3)
+        self.assertEqual(store.journaled, 3)
+
+    def test_save(self):
+        self.assertEqual(self.loop.run_until_complete(self.store.save()), 3)
+        self.store.update("lights.kitchen", on=True)
+        self.store.compact_every = 4
+        self.assertEqual(self.loop.run_until_complete(self.store.save()), 1)
+
+        self.assertEqual(self.store.journaled, 0)
+        store = self.make_store()
+        self.assertEqual(store.load(), 3)
+        self.assertTrue(store["lights.kitchen"].attributes["on"])
+
+    def test_debounce(self):
+        store = self.make_store(delay=0.01)
+        store.put(Entity("lights.attic", "light", "lights"))
+        store.update("lights.attic", on=True)
+        self.assertFalse(os.path.exists(store.journal_path))
+
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        self.assertEqual(store.journaled, 1)
+        self.assertEqual(store.dirty, set())
@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import shutil
+import tempfile
+import unittest
+
+from joseph.codec import decode_event, encode_event
+from joseph.eventlog import EventLog
+from joseph.events import EventBus, Namespace
+
+from tests.helpers import Recorder
+
+
+def make_event(i):
+    event = Namespace("sensors").make_event("power", watts=i, meter="kitchen")
+    event.dispatched_at = datetime.datetime(2017, 1, 1) + datetime.timedelta(seconds=i)
+    return event
+
+
+def listener(event):
+    pass
+
+
+class TestCodec(unittest.TestCase):
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_round_trip(self):
+        event = make_event(1)
+        record = encode_event(event)
+
+        decoded, offset = decode_event(record)
+        self.assertEqual(decoded, event)
+        self.assertEqual(decoded.dispatched_at, event.dispatched_at)
+        self.assertEqual(offset, len(record))
+
+    def test_not_dispatched(self):
+        event = Namespace("sensors").make_event("power")
+        decoded, _ = decode_event(encode_event(event))
+
+        self.assertEqual(decoded, event)
+        self.assertIsNone(decoded.dispatched_at)
+
+    def test_torn_record(self):
+        record = encode_event(make_event(1))
+
+        self.assertEqual(decode_event(record[:-1]), (None, 0))
+        self.assertEqual(decode_event(record[:3]), (None, 0))
+
+        corrupt = record[:-1] + b'x'
+        self.assertEqual(decode_event(corrupt), (None, 0))
+
+    def test_types(self):
+        data = {"window": (1, 2), "nested": [{"at": datetime.datetime(2017, 1, 1, 12, 30)}],
+                "day": datetime.date(2017, 1, 1), "time": datetime.time(6, 45), "rooms": {"hall"},
+                "fixed": frozenset([(1, 2)]), "raw": b"\x00\xff"}
+        decoded, _ = decode_event(encode_event(Namespace("sensors").make_event("power", **data)))
+        self.assertEqual(dict(decoded.data), data)
+        self.assertIsInstance(decoded.window, tuple)
+
+        # Any other type JSON has no type for comes back as its string representation
+        decoded, _ = decode_event(encode_event(Namespace("sensors").make_event("power", meter=Namespace("kitchen"))))
+        self.assertEqual(decoded.meter, "kitchen")
+
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.log = EventLog(self.directory, fsync_every=10, loop=self.loop)
+
+    def tearDown(self):
+        self.log.close()
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_append_read(self):
+        for i in range(25):
+            self.log.append(make_event(i))
+
+        events = list(self.log.read())
+        self.assertEqual([event.watts for event in events], list(range(25)))
+
+        since = datetime.datetime(2017, 1, 1, 0, 0, 20)
+        self.assertEqual([event.watts for event in self.log.read(since)], list(range(20, 25)))
+
+    def test_fsync_interval(self):
+        self.log.close()
+        self.log = EventLog(self.directory, fsync_interval=0.01, loop=self.loop)
+
+        # The first unsynced event starts the timer, the events after it don't move it
+        self.log.append(make_event(0))
+        handle = self.log.handle
+        self.log.append(make_event(1))
+        self.assertIs(self.log.handle, handle)
+        self.assertEqual(self.log.pending, 2)
+
+        self.loop.run_until_complete(asyncio.sleep(0.03))
+        self.assertEqual(self.log.pending, 0)
+        self.assertIsNone(self.log.handle)
+
+    def test_rotation(self):
+        self.log.close()
+        self.log = EventLog(self.directory, segment_size=len(encode_event(make_event(0))) * 10, loop=self.loop)
+
+        for i in range(25):
+            self.log.append(make_event(i))
+
+        self.assertEqual(len(self.log.segments()), 3)
+        self.assertEqual([event.watts for event in self.log.read()], list(range(25)))
+
+    def test_reopen_torn_write(self):
+        for i in range(5):
+            self.log.append(make_event(i))
+        self.log.close()
+
+        with open(self.log.segments()[-1], 'ab') as file:
+            file.write(encode_event(make_event(5))[:-3])
+
+        self.log = EventLog(self.directory, loop=self.loop)
+        self.log.append(make_event(6))
+
+        self.assertEqual([event.watts for event in self.log.read()], [0, 1, 2, 3, 4, 6])
+
+    def test_replay(self):
+        for i in range(5):
+            self.log.append(make_event(i))
+
+        joseph = Recorder()
+        bus = EventBus(joseph)
+        bus.listen("sensors:power")(listener)
+        bus.add_sink(self.log.append)
+
+        self.assertEqual(bus.replay(self.log.read()), 5)
+        self.assertEqual([event.watts for event in joseph.tasks], list(range(5)))
+
+        # Replayed events should not be logged again
+        self.assertEqual(len(list(self.log.read())), 5)
+
+        received = []
+        self.assertEqual(self.log.replay(received.append), 5)
+        self.assertEqual(len(received), 5)
@@ -1,6 +1,10 @@
+import datetime
+import gc
+import pickle
 import unittest
 
-from joseph.events import Event, Namespace
+from joseph.events import Event, Namespace, make_event_from_string, parse_event
+from joseph.exceptions import InvalidEvent
 
 
 class TestNamespace(unittest.TestCase):
@@ -17,6 +21,13 @@ class TestNamespace(unittest.TestCase):
         self.assertIsInstance(self.namespace, Namespace)
         self.assertEqual(str(self.namespace), "testEvents")
 
+    def test_init_caller(self):
+        def make_namespace():
+            return Namespace()
+
+        self.assertIs(make_namespace(), make_namespace())
+        self.assertEqual(str(make_namespace()), "testEvents")
+
     def test_make_event(self):
         event_1 = self.namespace.make_event("test")
         self.assertIsInstance(event_1, Event)
@@ -47,3 +58,118 @@ class TestNamespace(unittest.TestCase):
 
         test_namespace = Namespace("foo")
         self.assertNotEqual(self.namespace, test_namespace)
+
+    def test_interned(self):
+        self.assertIs(Namespace("tests"), self.namespace)
+        self.assertIsNot(Namespace("foo"), self.namespace)
+
+    def test_pickle(self):
+        self.assertIs(pickle.loads(pickle.dumps(self.namespace)), self.namespace)
+
+    def test_released(self):
+        namespace = Namespace("made_up")
+        self.assertIn("made_up", Namespace._registry)
+
+        del namespace
+        gc.collect()
+        self.assertNotIn("made_up", Namespace._registry)
+        self.assertIn("tests", Namespace._registry)
+
+
+class TestEvent(unittest.TestCase):
+    def setUp(self):
+        self.namespace = Namespace("tests")
+        self.event = self.namespace.make_event("test", foo="bar")
+
+    def tearDown(self):
+        del self.event
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_data(self):
+        self.assertEqual(self.event.data, {"foo": "bar"})
+        self.assertEqual(self.event.foo, "bar")
+
+        with self.assertRaises(AttributeError):
+            var = self.event.bar
+
+        with self.assertRaises(TypeError):
+            self.event.data["foo"] = "baz"
+
+    def test_from_data(self):
+        event = Event.from_data(Namespace("tests"), "test", {"event": "on", "strict": 1})
+
+        self.assertEqual(str(event), "tests:test")
+        self.assertEqual(dict(event.data), {"event": "on", "strict": 1})
+        self.assertTrue(event.STRICT)
+        self.assertEqual(event.copy(namespace="lights").data["namespace"], "lights")
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.event.foo = "baz"
+
+        self.assertFalse(hasattr(self.event, "__dict__"))
+
+    def test_copy(self):
+        event = self.event.copy(baz=1)
+        self.assertEqual(event.data, {"foo": "bar", "baz": 1})
+        self.assertEqual(self.event.data, {"foo": "bar"})
+
+    def test_string(self):
+        self.assertEqual(str(self.event), "tests:test")
+        self.assertEqual(str(self.namespace.make_event("")), "tests")
+
+    def test_equal(self):
+        self.assertEqual(self.event, self.namespace.make_event("test", foo="bar"))
+        self.assertNotEqual(self.event, self.namespace.make_event("test", foo="baz"))
+        self.assertNotEqual(self.event, "tests:test")
+
+        loose = self.namespace.make_event("test", strict=False)
+        self.assertEqual(loose, self.namespace.make_event("test", strict=False, foo="baz"))
+
+    def test_hash(self):
+        self.assertEqual(hash(self.event), hash("tests:test"))
+        self.assertEqual(hash(self.event), hash(self.namespace.make_event("test", foo="bar")))
+
+    def test_pickle(self):
+        self.event.dispatched_at = datetime.datetime.now()
+        event = pickle.loads(pickle.dumps(self.event))
+
+        self.assertEqual(event, self.event)
+        self.assertIs(event.NAMESPACE, self.namespace)
+        self.assertEqual(event.dispatched_at, self.event.dispatched_at)
+
+
+class TestParseEvent(unittest.TestCase):
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_parse(self):
+        namespace, name, wildcard, string = parse_event("house.kitchen:light.on")
+        self.assertIs(namespace, Namespace("house.kitchen"))
+        self.assertEqual(name, "light.on")
+        self.assertFalse(wildcard)
+        self.assertEqual(string, "house.kitchen:light.on")
+
+        self.assertEqual(parse_event("lights")[1:], ("", False, "lights"))
+        self.assertEqual(parse_event("lights:")[1:], ("", False, "lights"))
+        self.assertEqual(parse_event("house.*:*")[1:], ("*", True, "house.*:*"))
+
+    def test_invalid(self):
+        for event in ("", ":on", "lights:on:off", "lights.:on", "lights:o n", "lights:on*", None):
+            with self.assertRaises(InvalidEvent):
+                parse_event(event)
+
+    def test_cached(self):
+        parse_event.cache_clear()
+        first = parse_event("lights:on")
+        self.assertIs(parse_event("lights:on"), first)
+        self.assertEqual(parse_event.cache_info().hits, 1)
+
+    def test_make_event(self):
+        event = make_event_from_string("house.kitchen:light.on", level=3)
+
+        self.assertEqual(str(event), "house.kitchen:light.on")
+        self.assertEqual(event, Namespace("house.kitchen").make_event("light.on", level=3))
+        self.assertEqual(event.level, 3)
@@ -0,0 +1,83 @@
+import pickle
+import types
+import unittest
+
+from joseph.config import FROZEN_CLASSES, Config, FrozenConfig, _snapshot_class
+from joseph.exceptions import ConfigException
+
+
+class TestFrozenConfig(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(WORKER_COUNT=2, DEBUG=True, QUEUE_POLICY='block')
+        self.frozen = self.config.freeze()
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_access(self):
+        self.assertEqual(self.frozen.WORKER_COUNT, 2)
+        self.assertEqual(self.frozen['QUEUE_POLICY'], 'block')
+        self.assertIsNone(self.frozen.get('FOO'))
+        self.assertIn('DEBUG', self.frozen)
+        self.assertEqual(len(self.frozen), 3)
+        self.assertEqual(self.frozen, self.config.items())
+
+        with self.assertRaises(AttributeError):
+            var = self.frozen.FOO
+        with self.assertRaises(KeyError):
+            var = self.frozen['FOO']
+
+    def test_immutable(self):
+        with self.assertRaises(ConfigException):
+            self.frozen.WORKER_COUNT = 4
+        with self.assertRaises(ConfigException):
+            del self.frozen.WORKER_COUNT
+        with self.assertRaises(ConfigException):
+            self.frozen['WORKER_COUNT'] = 4
+        with self.assertRaises(ConfigException):
+            self.frozen.update(WORKER_COUNT=4)
+        with self.assertRaises(ConfigException):
+            self.frozen.pop('WORKER_COUNT')
+        with self.assertRaises(TypeError):
+            self.frozen.proxy['WORKER_COUNT'] = 4
+
+        # Changing the config afterwards doesn't change the snapshot
+        self.config['WORKER_COUNT'] = 4
+        self.assertEqual(self.frozen.WORKER_COUNT, 2)
+
+    def test_views(self):
+        self.assertEqual(self.frozen.keys(), ('DEBUG', 'QUEUE_POLICY', 'WORKER_COUNT'))
+        self.assertEqual(self.frozen.values(), (True, 'block', 2))
+        self.assertIsInstance(self.frozen.items(), types.MappingProxyType)
+        self.assertIs(self.frozen.proxy, self.frozen.proxy)
+        self.assertIs(self.frozen.keys(), self.frozen.keys())
+
+    def test_schema(self):
+        frozen = self.config.freeze({'WORKER_COUNT': int, 'PROCESS_POOL_SIZE': (int, type(None))})
+        self.assertIsNone(frozen.PROCESS_POOL_SIZE)
+
+        with self.assertRaises(ConfigException):
+            self.config.freeze({'WORKER_COUNT': str})
+        with self.assertRaises(ConfigException):
+            self.config.freeze({'THREAD_POOL_SIZE': int})
+
+    def test_thaw(self):
+        config = self.frozen.thaw()
+        self.assertIsInstance(config, Config)
+        self.assertEqual(config.items(), dict(self.frozen.items()))
+
+        self.assertEqual(Config(self.frozen, FOO='bar').keys(), ['DEBUG', 'QUEUE_POLICY', 'WORKER_COUNT', 'FOO'])
+
+    def test_pickle(self):
+        frozen = pickle.loads(pickle.dumps(self.frozen))
+        self.assertIsInstance(frozen, FrozenConfig)
+        self.assertEqual(frozen.WORKER_COUNT, 2)
+
+    def test_classes(self):
+        self.assertIs(type(Config(self.frozen).freeze()), type(self.frozen))
+
+        # Every key set gets its own class, only the most recently used ones are kept
+        for count in range(FROZEN_CLASSES * 2):
+            frozen = Config({'KEY_{}'.format(key): key for key in range(count)}).freeze()
+            self.assertEqual(frozen.get('KEY_0'), 0 if count else None)
+        self.assertLessEqual(_snapshot_class.cache_info().currsize, FROZEN_CLASSES)
@@ -0,0 +1,130 @@
+import unittest
+
+from joseph.events import EventBus, Namespace
+from joseph.history import EventHistory, RingBuffer
+
+
+def make_event(name, timestamp, namespace="sensors"):
+    event = Namespace(namespace).make_event(name, timestamp=timestamp)
+    event.dispatched_at = timestamp
+    return event
+
+
+class TestRingBuffer(unittest.TestCase):
+    def setUp(self):
+        self.ring = RingBuffer(4)
+
+    def tearDown(self):
+        del self.ring
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            RingBuffer(0)
+
+    def test_overwrite(self):
+        for i in range(6):
+            self.ring.append(i, i)
+
+        self.assertEqual(len(self.ring), 4)
+        self.assertEqual(self.ring.slice(0, 4), [2, 3, 4, 5])
+
+    def test_bisect(self):
+        for i in range(6):
+            self.ring.append(i, i)
+
+        self.assertEqual(self.ring.bisect(3), 1)
+        self.assertEqual(self.ring.bisect(3, right=True), 2)
+        self.assertEqual(self.ring.bisect(0), 0)
+        self.assertEqual(self.ring.bisect(10), 4)
+
+    def test_out_of_order(self):
+        self.ring.append(5, "foo")
+        self.ring.append(3, "bar")
+
+        self.assertEqual(self.ring.bisect(5), 0)
+        self.assertEqual(self.ring.bisect(5, right=True), 2)
+
+    def test_discard(self):
+        for i in range(6):
+            self.ring.append(i, i)
+
+        self.assertEqual(self.ring.discard(3), 3)
+        self.assertEqual(self.ring.slice(0, len(self.ring)), [5])
+        self.assertEqual(self.ring.discard(-1), 0)
+        self.assertEqual(self.ring.discard(10), 1)
+        self.assertEqual(len(self.ring), 0)
+
+
+class TestEventHistory(unittest.TestCase):
+    def setUp(self):
+        self.history = EventHistory(capacity=100)
+        for i in range(10):
+            self.history.append(make_event("on" if i % 2 else "off", float(i)))
+
+    def tearDown(self):
+        del self.history
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_between(self):
+        events = self.history.between("sensors:on", 2, 7)
+        self.assertEqual([event.timestamp for event in events], [3, 5, 7])
+
+        events = self.history.between("sensors", 2, 4)
+        self.assertEqual([event.timestamp for event in events], [2, 3, 4])
+
+        events = self.history.between("sensors:*", 8)
+        self.assertEqual([event.timestamp for event in events], [8, 9])
+
+        self.assertEqual(self.history.between("lights:on", 0, 10), [])
+        self.assertEqual(self.history.between("sensors:dim", 0, 10), [])
+
+    def test_between_dropped(self):
+        history = EventHistory(capacity=4)
+        for i in range(20):
+            history.append(make_event("on" if i % 3 else "off", float(i)))
+
+        # Only the last 4 events are held, the index of a type doesn't return the dropped ones
+        self.assertEqual([event.timestamp for event in history.between("sensors:on", 0, 20)], [16, 17, 19])
+        self.assertEqual([event.timestamp for event in history.between("sensors:off", 0, 20)], [18])
+        self.assertLessEqual(len(history.indexes[("sensors", "on")]), 8)
+
+        history.evict(max_count=1)
+        self.assertEqual(history.between("sensors:on", 0, 18), [])
+        self.assertEqual([event.timestamp for event in history.between("sensors:on", 19)], [19])
+
+    def test_last(self):
+        events = self.history.last("sensors", 3)
+        self.assertEqual([event.timestamp for event in events], [7, 8, 9])
+
+        self.assertEqual(len(self.history.last("sensors", 100)), 10)
+        self.assertEqual(self.history.last("lights", 3), [])
+
+    def test_evict(self):
+        self.assertEqual(self.history.evict(max_count=4), 6)
+        self.assertEqual(len(self.history), 4)
+
+        # Every event is from 1970, so way too old
+        self.assertEqual(self.history.evict(max_age=60), 4)
+        self.assertEqual(len(self.history), 0)
+
+    def test_max_age(self):
+        history = EventHistory(max_age=5)
+        for i in range(10):
+            history.append(make_event("on", float(i)))
+
+        self.assertEqual([event.timestamp for event in history.last("sensors", 10)], [4, 5, 6, 7, 8, 9])
+
+    def test_sink(self):
+        history = EventHistory()
+        bus = EventBus(None)
+        bus.add_sink(history.append)
+        bus.state.set_state("RUNNING")
+
+        bus.dispatch("lights:on", room="kitchen")
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history.last("lights")[0].room, "kitchen")
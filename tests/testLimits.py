@@ -0,0 +1,208 @@
+import asyncio
+import unittest
+
+from joseph.events import EventBus
+from joseph.limits import Debounce, Limiter, RateLimit, Throttle
+from joseph.timers import TimerWheel
+
+from tests.helpers import Recorder
+
+
+def listener(event):
+    pass
+
+
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.wheel = TimerWheel(self.loop, resolution=0.005, size=8)
+        self.fired = []
+
+    def tearDown(self):
+        self.wheel.clear()
+        self.loop.close()
+
+    def sleep(self, delay: float):
+        self.loop.run_until_complete(asyncio.sleep(delay))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_call_later(self):
+        started = self.loop.time()
+        self.wheel.call_later(0.02, lambda: self.fired.append(self.loop.time()))
+        self.assertEqual(len(self.wheel), 1)
+
+        self.sleep(0.01)
+        self.assertEqual(self.fired, [])
+
+        self.sleep(0.03)
+        self.assertEqual(len(self.fired), 1)
+        self.assertGreaterEqual(self.fired[0] - started, 0.02)
+        self.assertEqual(len(self.wheel), 0)
+        self.assertIsNone(self.wheel.handle)
+
+    def test_single_handle(self):
+        for delay in range(100):
+            self.wheel.call_later(delay / 1000, self.fired.append, delay)
+        handle = self.wheel.handle
+
+        self.wheel.call_later(0.01, self.fired.append, 100)
+        self.assertIs(self.wheel.handle, handle)
+
+        self.sleep(0.15)
+        self.assertEqual(sorted(self.fired), list(range(101)))
+
+    def test_next_deadline(self):
+        # The handle is set for the first due timer, not for every tick
+        self.wheel.call_later(0.03, self.fired.append, 'late')
+        self.assertAlmostEqual(self.wheel.handle.when(), self.loop.time() + 0.03, delta=0.006)
+
+        self.wheel.call_later(0.01, self.fired.append, 'early')
+        self.assertAlmostEqual(self.wheel.handle.when(), self.loop.time() + 0.01, delta=0.006)
+
+        self.sleep(0.015)
+        self.assertEqual(self.fired, ['early'])
+        self.assertAlmostEqual(self.wheel.handle.when() - self.loop.time(), 0.015, delta=0.006)
+
+        self.sleep(0.02)
+        self.assertEqual(self.fired, ['early', 'late'])
+
+    def test_beyond_a_turn(self):
+        # 8 slots of 5 ms make a turn of 40 ms
+        self.wheel.call_later(0.05, self.fired.append, 'late')
+        self.wheel.call_later(0.01, self.fired.append, 'early')
+
+        self.sleep(0.03)
+        self.assertEqual(self.fired, ['early'])
+
+        self.sleep(0.04)
+        self.assertEqual(self.fired, ['early', 'late'])
+
+    def test_cancel(self):
+        timer = self.wheel.call_later(0.01, self.fired.append, 1)
+        timer.cancel()
+
+        self.sleep(0.03)
+        self.assertEqual(self.fired, [])
+
+    def test_callback_adds_timer(self):
+        self.wheel.call_later(0.01, lambda: self.wheel.call_later(0.01, self.fired.append, 2))
+
+        self.sleep(0.05)
+        self.assertEqual(self.fired, [2])
+
+    def test_failing_callback(self):
+        self.wheel.call_later(0.01, lambda: 1 / 0)
+        self.wheel.call_later(0.01, self.fired.append, 1)
+
+        with self.assertLogs('joseph.timers'):
+            self.sleep(0.03)
+        self.assertEqual(self.fired, [1])
+
+
+class TestLimits(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Recorder(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+
+    def tearDown(self):
+        self.bus.stop_soon()
+        self.loop.close()
+
+    def sleep(self, delay: float):
+        self.loop.run_until_complete(asyncio.sleep(delay))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            Limiter(self.bus, None)
+
+    def test_unlisten(self):
+        self.bus.listen("sensors:power", debounce=0.01)(listener)
+        self.bus.listen("sensors:voltage", throttle=0.01)(listener)
+        self.bus.dispatch("sensors:power", watts=1)
+        self.bus.dispatch("sensors:voltage", volts=230)
+        self.bus.dispatch("sensors:voltage", volts=231)
+        limiters = [listener.limiter for listener in self.bus.unlisten(listener)]
+
+        # The held back events are dropped with their timers
+        self.assertEqual([event.volts for event in self.joseph.tasks], [230])
+        self.assertEqual((limiters[0].pending, limiters[1].windows, limiters[1].timers), ({}, {}, {}))
+        self.assertEqual(len(self.bus.limiters), 0)
+
+        self.sleep(0.03)
+        self.assertEqual(len(self.joseph.tasks), 1)
+        self.assertIsNone(self.bus.timers.handle)
+
+    def test_exclusive(self):
+        with self.assertRaises(ValueError):
+            self.bus.listen("sensors:power", debounce=0.1, throttle=0.1)
+
+    def test_debounce(self):
+        self.bus.listen("sensors:*", debounce=0.02)(listener)
+
+        for watts in range(5):
+            self.bus.dispatch("sensors:power", watts=watts)
+            self.sleep(0.005)
+        self.bus.dispatch("sensors:voltage", volts=230)
+        self.assertEqual(self.joseph.tasks, [])
+
+        self.sleep(0.05)
+        self.assertEqual(sorted(str(event) for event in self.joseph.tasks), ["sensors:power", "sensors:voltage"])
+        self.assertEqual([event.watts for event in self.joseph.tasks if event.EVENT == "power"], [4])
+
+        limiter = self.bus.listeners.get("sensors", "power")[0].limiter
+        self.assertIsInstance(limiter, Debounce)
+        self.assertEqual(limiter.skipped, 4)
+
+    def test_throttle(self):
+        self.bus.listen("sensors:power", throttle=0.03)(listener)
+
+        for watts in range(5):
+            self.bus.dispatch("sensors:power", watts=watts)
+        self.assertEqual([event.watts for event in self.joseph.tasks], [0])
+
+        self.sleep(0.05)
+        self.assertEqual([event.watts for event in self.joseph.tasks], [0, 4])
+        self.assertIsInstance(self.bus.listeners.get("sensors", "power")[0].limiter, Throttle)
+
+        # A quiet interval closes the window
+        self.sleep(0.05)
+        self.bus.dispatch("sensors:power", watts=5)
+        self.assertEqual([event.watts for event in self.joseph.tasks], [0, 4, 5])
+
+    def test_rate_limit(self):
+        self.bus.listen("sensors:power", rate_limit=(100, 3))(listener)
+
+        for watts in range(10):
+            self.bus.dispatch("sensors:power", watts=watts)
+        self.assertEqual([event.watts for event in self.joseph.tasks], [0, 1, 2])
+
+        limiter = self.bus.listeners.get("sensors", "power")[0].limiter
+        self.assertIsInstance(limiter, RateLimit)
+        self.assertEqual(limiter.skipped, 7)
+
+        self.sleep(0.015)
+        self.bus.dispatch("sensors:power", watts=10)
+        self.assertEqual(self.joseph.tasks[-1].watts, 10)
+
+    def test_unlimited_listeners(self):
+        self.bus.listen("sensors:power", debounce=10)(listener)
+        self.bus.listen("sensors:power")(listener)
+
+        self.bus.dispatch("sensors:power", watts=1)
+        self.assertEqual(len(self.joseph.tasks), 1)
+
+    def test_stop_soon_flushes(self):
+        self.bus.listen("sensors:power", debounce=10)(listener)
+
+        self.bus.dispatch("sensors:power", watts=1)
+        self.bus.stop_soon()
+
+        self.assertEqual([event.watts for event in self.joseph.tasks], [1])
+        self.assertEqual(len(self.bus.timers), 0)
@@ -0,0 +1,190 @@
+import unittest
+
+from joseph.core import PROCESS, THREAD
+from joseph.events import EventBus, make_event_from_string
+from joseph.listeners import LISTENER_CACHE_SIZE, Listener, ListenerIndex
+
+
+def foo(event):
+    pass
+
+
+def bar(event):
+    pass
+
+
+class TestListenerIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ListenerIndex()
+
+    def tearDown(self):
+        del self.index
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_exact(self):
+        listener = self.index.add("lights", "on", Listener(foo))
+
+        self.assertEqual(self.index.get("lights", "on"), (listener,))
+        self.assertEqual(self.index.get("lights", "off"), ())
+        self.assertEqual(self.index.get("sensors", "on"), ())
+
+    def test_wildcards(self):
+        namespace = self.index.add("lights", "*", Listener(foo))
+        event = self.index.add("*", "state_changed", Listener(bar))
+        everything = self.index.add("*", "*", Listener(foo))
+
+        self.assertEqual(self.index.get("lights", "on"), (namespace, everything))
+        self.assertEqual(self.index.get("lights", "state_changed"), (namespace, event, everything))
+        self.assertEqual(self.index.get("sensors", "state_changed"), (event, everything))
+        self.assertEqual(self.index.get("sensors", "on"), (everything,))
+
+    def test_hierarchical_wildcards(self):
+        level = self.index.add("house.*.light", "on", Listener(foo))
+        rest = self.index.add("house.*", "*", Listener(bar))
+        switch = self.index.add("*", "switch.*", Listener(foo))
+
+        self.assertEqual(self.index.get("house.kitchen.light", "on"), (level, rest))
+        self.assertEqual(self.index.get("house.kitchen", "light.on"), (rest,))
+        self.assertEqual(self.index.get("house", "on"), ())
+        self.assertEqual(self.index.get("house.kitchen.light.spot", "on"), (rest,))
+        self.assertEqual(self.index.get("garden.shed", "switch.on.off"), (switch,))
+        self.assertEqual(self.index.get("garden", "switch"), ())
+        self.assertEqual(len(self.index), 3)
+
+    def test_priority(self):
+        low = self.index.add("lights", "on", Listener(foo, priority=9))
+        high = self.index.add("lights", "*", Listener(bar, priority=1))
+        same = self.index.add("lights", "on", Listener(bar, priority=9))
+
+        self.assertEqual(self.index.get("lights", "on"), (high, low, same))
+
+    def test_cache_invalidation(self):
+        first = self.index.add("lights", "on", Listener(foo))
+        self.assertEqual(self.index.get("lights", "on"), (first,))
+
+        second = self.index.add("*", "on", Listener(bar))
+        self.assertEqual(self.index.get("lights", "on"), (first, second))
+
+    def test_cache_bounded(self):
+        listener = self.index.add("sensors", "*", Listener(foo))
+
+        for sensor in range(LISTENER_CACHE_SIZE + 10):
+            self.assertEqual(self.index.get("sensors", str(sensor)), (listener,))
+        self.assertLessEqual(len(self.index._cache), LISTENER_CACHE_SIZE)
+
+    def test_remove(self):
+        self.index.add("lights", "on", Listener(foo))
+        self.index.add("lights", "*", Listener(foo))
+        listener = self.index.add("lights", "on", Listener(bar))
+        self.assertEqual(len(self.index), 3)
+
+        removed = self.index.remove(foo)
+        self.assertEqual(len(removed), 2)
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.get("lights", "on"), (listener,))
+
+    def test_several_events(self):
+        listener = Listener(foo)
+        self.index.add("lights", "*", listener)
+        self.index.add("lights", "on", listener)
+
+        self.assertEqual(self.index.get("lights", "on"), (listener,))
+        self.assertEqual(len(self.index), 1)
+
+        self.assertEqual(self.index.remove(foo), [listener])
+        self.index.restore([listener])
+        self.assertEqual(self.index.get("lights", "off"), (listener,))
+        self.assertEqual(listener.patterns, [("lights", "*"), ("lights", "on")])
+
+
+class TestEventBusListeners(unittest.TestCase):
+    def setUp(self):
+        self.bus = EventBus(None)
+
+    def tearDown(self):
+        del self.bus
+
+    def test_listen(self):
+        self.bus.listen("lights:on")(foo)
+        self.bus.listen("lights:*", priority=1)(bar)
+
+        event = make_event_from_string("lights:on")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [bar, foo])
+
+        event = make_event_from_string("lights:off")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [bar])
+
+    def test_listen_several(self):
+        self.bus.listen(["lights:*", "lights:on"])(foo)
+
+        event = make_event_from_string("lights:on")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [foo])
+
+    def test_dispatch_any_key(self):
+        dispatched = []
+        self.bus.add_sink(dispatched.append)
+        self.bus.state.set_state("RUNNING")
+
+        self.bus.dispatch("lights:on", event="switched", data=1)
+        self.assertEqual(dict(dispatched[0].data), {"event": "switched", "data": 1})
+        self.assertEqual(make_event_from_string("lights:on", event="switched").data["event"], "switched")
+
+    def test_listen_namespace(self):
+        namespace_event = make_event_from_string("lights:")
+        self.bus.listen(namespace_event)(foo)
+
+        event = make_event_from_string("lights:off")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [foo])
+
+    def test_listen_data(self):
+        self.bus.listen("lights:on", room="kitchen")(foo)
+
+        event = make_event_from_string("lights:on", room="kitchen")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [foo])
+
+        event = make_event_from_string("lights:on", room="hallway")
+        self.assertEqual(list(self.bus.get_listeners(event)), [])
+
+    def test_listen_event_data(self):
+        self.bus.listen(make_event_from_string("lights:on", room="kitchen"), level=1)(foo)
+
+        for room, level, listeners in (("kitchen", 1, [foo]), ("hallway", 1, []), ("kitchen", 2, [])):
+            event = make_event_from_string("lights:on", room=room, level=level)
+            self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], listeners)
+
+        with self.assertRaises(ValueError):
+            self.bus.listen(make_event_from_string("lights:on", room="kitchen"), room="hallway")
+
+    def test_listen_executor(self):
+        self.bus.listen("camera:motion", executor=PROCESS)(foo)
+
+        event = make_event_from_string("camera:motion")
+        self.assertEqual([listener.executor for listener in self.bus.get_listeners(event)], [PROCESS])
+
+        with self.assertRaises(ValueError):
+            self.bus.listen("camera:motion", executor="foo")
+
+        async def detect(event):
+            pass
+
+        # A coroutine function would only be called, never awaited, in a pool
+        for executor in (THREAD, PROCESS):
+            with self.assertRaises(ValueError):
+                self.bus.listen("camera:motion", executor=executor)(detect)
+        self.assertEqual(len(list(self.bus.get_listeners(event))), 1)
+
+    def test_no_listeners(self):
+        event = make_event_from_string("lights:on")
+        self.assertEqual(list(self.bus.get_listeners(event)), [])
+
+    def test_listen_hierarchical(self):
+        self.bus.listen("house.*:light.*")(foo)
+        self.bus.listen("house")(bar)
+
+        event = make_event_from_string("house.kitchen:light.on")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [foo])
+
+        event = make_event_from_string("house:light")
+        self.assertEqual([listener.func for listener in self.bus.get_listeners(event)], [bar])
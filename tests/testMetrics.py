@@ -0,0 +1,128 @@
+import asyncio
+import random
+import unittest
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+from joseph.metrics import Histogram
+
+
+async def listener(event):
+    await asyncio.sleep(0)
+
+
+def failing_listener(event):
+    raise RuntimeError
+
+
+class TestHistogram(unittest.TestCase):
+    def setUp(self):
+        self.histogram = Histogram()
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_buckets(self):
+        # Every value lands in a bucket that holds it, and buckets follow each other without gaps
+        previous = -1
+        for index in range(400):
+            self.assertEqual(Histogram.index(previous + 1), index)
+            self.assertEqual(Histogram.index(Histogram.upper(index)), index)
+            previous = Histogram.upper(index)
+
+    def test_quantiles(self):
+        values = [random.randint(1000, 10 ** 9) for _ in range(10000)]
+        for value in values:
+            self.histogram.record(value)
+        values.sort()
+
+        for quantile in (0.5, 0.9, 0.99):
+            exact = values[round(quantile * len(values)) - 1]
+            self.assertLessEqual(abs(self.histogram.quantile(quantile) - exact) / exact, 0.125)
+
+        self.assertEqual(self.histogram.count, 10000)
+        self.assertEqual(self.histogram.quantile(1), values[-1])
+        self.assertEqual(Histogram().quantile(0.5), 0)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Joseph(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.metrics = self.joseph.enable_metrics()
+
+        self.bus.listen("lights:on")(listener)
+        self.bus.listen("lights:*")(failing_listener)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_workers(self):
+        async def run():
+            self.joseph.resize_workers(1)
+            await self.joseph.drain(1)
+            for worker in self.joseph.workers:
+                worker.cancel()
+            await asyncio.sleep(0)
+
+        self.loop.run_until_complete(run())
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_listeners(self):
+        for _ in range(3):
+            self.bus.dispatch("lights:on")
+        self.bus.dispatch("lights:off")
+
+        with self.assertLogs("joseph.core", "ERROR"):
+            self.run_workers()
+
+        listeners = self.metrics.listeners()
+        self.assertEqual(listeners[__name__ + ".listener"]["calls"], 3)
+        self.assertEqual(listeners[__name__ + ".listener"]["errors"], 0)
+        self.assertEqual(listeners[__name__ + ".failing_listener"]["errors"], 4)
+        self.assertGreater(listeners[__name__ + ".listener"]["latency"]["p99"], 0)
+
+        events = self.metrics.events()
+        self.assertEqual(events["lights:on"]["dispatched"], 3)
+        self.assertEqual(events["lights:on"]["wait"]["count"], 6)
+        self.assertEqual(events["lights:off"]["wait"]["count"], 1)
+
+    def test_queue_depth(self):
+        self.bus.dispatch("lights:on")
+        self.joseph.add_task_nowait(listener, None, priority=1)
+
+        self.assertEqual(self.metrics.queue_depth(), {1: 1, 9: 2})
+
+    def test_lanes(self):
+        self.joseph.add_lane("heavy", workers=0, maxsize=1)
+        for _ in range(3):
+            self.joseph.add_task_nowait(listener, None, priority=5, lane="heavy")
+        self.assertEqual(self.metrics.queue_depth("heavy"), {5: 1})
+
+        text = self.metrics.prometheus()
+        self.assertIn('joseph_queue_depth{lane="heavy",priority="5"} 1\n', text)
+        self.assertIn('joseph_queue_dropped_total{lane="heavy"} 2\n', text)
+        self.assertIn('joseph_queue_dropped_total 0\n', text)
+
+    def test_prometheus(self):
+        self.bus.dispatch("lights:on")
+        with self.assertLogs("joseph.core", "ERROR"):
+            self.run_workers()
+
+        text = self.metrics.prometheus()
+        self.assertIn('joseph_listener_calls_total{listener="%s.listener"} 1\n' % __name__, text)
+        self.assertIn('joseph_events_dispatched_total{event="lights:on"} 1\n', text)
+        self.assertIn('# TYPE joseph_listener_latency_seconds summary\n', text)
+        self.assertIn('joseph_event_queue_wait_seconds_count{event="lights:on"} 2\n', text)
+        self.assertIn('joseph_queue_dropped_total 0\n', text)
+
+    def test_disable(self):
+        self.joseph.disable_metrics()
+        self.bus.dispatch("lights:on")
+        self.assertIsNone(self.joseph.metrics)
+        self.assertNotIn(self.metrics.dispatched, self.bus.sinks)
+        self.assertEqual(self.metrics.events(), {})
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from joseph.core import Joseph
+from joseph.events import EventBus
+from joseph.exceptions import PluginException
+from joseph.plugins import Manifest, PluginLoader
+from joseph.utils.watcher import Watcher
+
+PLUGIN = """
+EVENTS = ['lights:*']
+
+calls = []
+
+
+def setup(bus):
+    @bus.listen('lights:on')
+    def on(event):
+        calls.append(({version}, str(event)))
+"""
+
+
+class TestPlugins(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Joseph(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.loader = PluginLoader(self.bus, self.directory)
+
+        self.write("lights.py", PLUGIN.format(version=1))
+
+    def tearDown(self):
+        self.loader.stop()
+        for name in list(self.loader.modules):
+            self.loader.unload(name)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, source):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(textwrap.dedent(source))
+
+    def run_tasks(self):
+        queue = self.joseph.queue
+        while queue:
+            task = queue.get_nowait()
+            self.loop.run_until_complete(self.joseph.run(task.func, task.args, task.kwargs, task.executor))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_manifest(self):
+        manifest = Manifest.read(self.directory, "lights.py")
+        self.assertEqual(manifest.name, "lights")
+        self.assertEqual(manifest.events, ("lights:*",))
+
+        self.write("broken.py", "EVENTS = [foo]")
+        with self.assertRaises(PluginException):
+            Manifest.read(self.directory, "broken.py")
+
+        self.write("notes.txt", "")
+        self.assertIsNone(Manifest.read(self.directory, "notes.txt"))
+
+    def test_lazy_load(self):
+        self.loader.scan()
+        self.assertIn("lights", self.loader.manifests)
+        self.assertEqual(self.loader.index, {"lights:*": {"lights"}})
+        self.assertNotIn("joseph_plugins.lights", sys.modules)
+
+        self.bus.dispatch("lights:on")
+        self.run_tasks()
+
+        module = self.loader.modules["lights"]
+        self.assertEqual(module.calls, [(1, "lights:on")])
+
+        # The trigger should be gone, only the plugin's listener is left
+        self.bus.dispatch("lights:on")
+        self.run_tasks()
+        self.assertEqual(module.calls, [(1, "lights:on"), (1, "lights:on")])
+        self.assertEqual(len(self.bus.listeners), 1)
+
+    def test_overlapping_events(self):
+        self.write("lights.py", PLUGIN.format(version=1).replace("EVENTS = ['lights:*']",
+                                                                 "EVENTS = ['lights:*', 'lights:on']"))
+        self.loader.scan()
+
+        # Both triggers match, the plugin still gets the event once
+        self.bus.dispatch("lights:on")
+        self.run_tasks()
+        self.assertEqual(self.loader.modules["lights"].calls, [(1, "lights:on")])
+
+    def test_eager_load(self):
+        self.write("status.py", "loaded = True")
+        self.loader.scan()
+
+        self.assertTrue(self.loader.modules["status"].loaded)
+        self.assertNotIn("lights", self.loader.modules)
+
+    def test_package(self):
+        self.write("hue/__init__.py", """
+            from .bridge import Bridge
+
+            def setup(bus):
+                bus.listen('hue:discovered')(Bridge.discovered)
+        """)
+        self.write("hue/bridge.py", """
+            class Bridge(object):
+                @staticmethod
+                def discovered(event):
+                    pass
+        """)
+        self.loader.scan()
+
+        self.assertIn("hue", self.loader.modules)
+        self.assertEqual([listener.owner for listener in self.bus.listeners.get("hue", "discovered")], ["hue"])
+
+    def test_reload(self):
+        self.loader.scan()
+        self.loader.load("lights")
+
+        self.write("lights.py", PLUGIN.format(version=2))
+        module = self.loader.reload("lights")
+
+        self.bus.dispatch("lights:on")
+        self.run_tasks()
+        self.assertEqual(module.calls, [(2, "lights:on")])
+        self.assertEqual(len(self.bus.listeners), 1)
+
+    def test_saved_tasks(self):
+        self.loader.scan()
+        self.loader.load("lights")
+        self.bus.dispatch("lights:on")
+
+        # The listener is a closure within setup, only a reference to it can be saved
+        path = os.path.join(self.directory, "pending", "tasks.pickle")
+        self.assertEqual(self.joseph.save_tasks(self.joseph.queue.drain_nowait(), path), 1)
+        self.loader._unregister("lights")
+
+        self.assertEqual(self.joseph.resume_tasks(path), 0)
+        self.assertEqual(list(self.joseph.unresolved), ["lights"])
+
+        # Waiting tasks make the plugin load at once instead of on its events
+        self.loader.scan()
+        self.assertIn("lights", self.loader.modules)
+        self.assertEqual(self.joseph.unresolved, {})
+        self.run_tasks()
+        self.assertEqual(self.loader.modules["lights"].calls, [(1, "lights:on")])
+
+    def test_reload_teardown(self):
+        source = """
+            def setup(bus):
+                bus.order.append(("setup", {version}))
+
+            def teardown(bus):
+                bus.order.append(("teardown", {version}))
+        """
+        self.bus.order = []
+        self.write("status.py", source.format(version=1))
+        self.loader.scan()
+
+        self.write("status.py", source.format(version=2))
+        self.loader.reload("status")
+        self.assertEqual(self.bus.order, [("setup", 1), ("teardown", 1), ("setup", 2)])
+
+        # A failing new version sets up the previous one again
+        self.write("status.py", "raise RuntimeError")
+        with self.assertRaises(PluginException):
+            self.loader.reload("status")
+        self.assertEqual(self.bus.order[3:], [("teardown", 2), ("setup", 2)])
+
+    def test_reload_failure(self):
+        self.loader.scan()
+        module = self.loader.load("lights")
+
+        self.write("lights.py", PLUGIN + "raise RuntimeError")
+        with self.assertRaises(PluginException):
+            self.loader.reload("lights")
+
+        self.assertIs(self.loader.modules["lights"], module)
+        self.assertEqual(len(self.bus.listeners), 1)
+
+    def test_reload_package_failure(self):
+        self.write("hue/__init__.py", "from .bridge import Bridge")
+        self.write("hue/bridge.py", "class Bridge(object): pass")
+        self.loader.scan()
+        module = self.loader.modules["hue"]
+        bridge = sys.modules[module.__name__ + ".bridge"]
+
+        self.write("hue/bridge.py", "raise RuntimeError")
+        with self.assertRaises(PluginException):
+            self.loader.reload("hue")
+
+        self.assertIs(sys.modules[module.__name__], module)
+        self.assertIs(sys.modules[module.__name__ + ".bridge"], bridge)
+        self.loader.unload("hue")
+        self.assertNotIn(module.__name__ + ".bridge", sys.modules)
+
+    def test_watch(self):
+        for use_inotify in (True, False):
+            self.loader.scan()
+            self.loader.load("lights")
+            self.loader.watch(self.loop, interval=0.05).use_inotify = use_inotify
+
+            self.write("lights.py", PLUGIN.format(version=3))
+            self.write("sensors.py", "EVENTS = ['sensors:*']")
+            self.loop.run_until_complete(asyncio.sleep(0.4))
+
+            self.assertIn("sensors", self.loader.manifests)
+            self.bus.dispatch("lights:on")
+            self.run_tasks()
+            self.assertEqual(self.loader.modules["lights"].calls, [(3, "lights:on")])
+
+            os.remove(os.path.join(self.directory, "sensors.py"))
+            self.loop.run_until_complete(asyncio.sleep(0.4))
+            self.assertNotIn("sensors", self.loader.manifests)
+
+            self.loader.stop()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loader.unload("lights")
+            self.loader.manifests.clear()
+            self.loader.index.clear()
+            self.bus.unlisten(owner=("trigger", "lights"))
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.changes = []
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def check_watcher(self, use_inotify, recursive=True):
+        watcher = Watcher(self.directory, self.changes.append, self.loop, interval=0.05, use_inotify=use_inotify,
+                          recursive=recursive)
+        os.makedirs(os.path.join(self.directory, "bar"), exist_ok=True)
+        watcher.start()
+
+        path = os.path.join(self.directory, "foo.py")
+        with open(path, "w") as file:
+            file.write("foo = 1")
+        with open(os.path.join(self.directory, "bar", "baz.py"), "w") as file:
+            file.write("baz = 1")
+        self.loop.run_until_complete(asyncio.sleep(0.3))
+        watcher.stop()
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+        if recursive:
+            self.assertEqual(self.changes, [{path, os.path.join(self.directory, "bar", "baz.py")}])
+        else:
+            self.assertEqual(self.changes, [{path}])
+        return watcher
+
+    def test_new_directory(self):
+        watcher = Watcher(self.directory, self.changes.append, self.loop, interval=0.05)
+        watcher.start()
+        if not watcher.inotify:
+            watcher.stop()
+            self.skipTest("inotify is not available")
+
+        # Moved in at once, so the tree is complete when it is walked
+        source = tempfile.mkdtemp()
+        os.makedirs(os.path.join(source, "__pycache__"))
+        os.makedirs(os.path.join(source, "bar"))
+        os.rename(source, os.path.join(self.directory, "new"))
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+
+        watched = set(watcher.inotify.watches.values())
+        watcher.stop()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(watched, {self.directory, os.path.join(self.directory, "new"),
+                                   os.path.join(self.directory, "new", "bar")})
+
+    def test_inotify(self):
+        self.check_watcher(use_inotify=True)
+
+    def test_polling(self):
+        self.check_watcher(use_inotify=False)
+
+    def test_not_recursive(self):
+        self.check_watcher(use_inotify=True, recursive=False)
+        self.changes.clear()
+        self.check_watcher(use_inotify=False, recursive=False)
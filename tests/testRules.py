@@ -0,0 +1,154 @@
+import unittest
+
+from joseph.events import EventBus
+from joseph.exceptions import QueueFull
+from joseph.rules import Fact, RuleEngine
+
+from tests.helpers import Recorder
+
+
+def lights_on(event):
+    pass
+
+
+def heating_off(event):
+    pass
+
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.joseph = Recorder()
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.engine = RuleEngine(self.bus)
+
+        self.motion = Fact("sensors:motion", "detected") == True
+        self.dark = Fact("sensors:lux", "value") < 30
+
+    def tearDown(self):
+        del self.engine
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_fires_when_all_conditions_hold(self):
+        self.engine.rule(self.motion, self.dark)(lights_on)
+
+        self.bus.dispatch("sensors:motion", detected=True)
+        self.assertEqual(self.joseph.tasks, [])
+
+        self.bus.dispatch("sensors:lux", value=10)
+        self.assertEqual(len(self.joseph.tasks), 1)
+
+        task, event = self.joseph.calls[0]
+        self.assertIs(task, lights_on)
+        self.assertEqual(str(event), "sensors:lux")
+
+    def test_fires_once_per_activation(self):
+        self.engine.rule(self.motion, self.dark)(lights_on)
+
+        self.bus.dispatch("sensors:motion", detected=True)
+        self.bus.dispatch("sensors:lux", value=10)
+        self.bus.dispatch("sensors:lux", value=5)
+        self.assertEqual(len(self.joseph.tasks), 1)
+
+        self.bus.dispatch("sensors:lux", value=50)
+        self.bus.dispatch("sensors:lux", value=10)
+        self.assertEqual(len(self.joseph.tasks), 2)
+
+    def test_shared_conditions(self):
+        self.engine.rule(self.motion, self.dark)(lights_on)
+        self.engine.rule(Fact("sensors:motion", "detected") == True, name="motion")(heating_off)
+
+        self.assertEqual(len(self.engine.nodes), 2)
+        self.assertIs(self.engine.rules["lights_on"].nodes[0], self.engine.rules["motion"].nodes[0])
+
+        self.bus.dispatch("sensors:motion", detected=True)
+        self.assertEqual([task for task, _ in self.joseph.calls], [heating_off])
+
+    def test_unrelated_events(self):
+        self.engine.rule(self.motion)(lights_on)
+
+        self.bus.dispatch("sensors:temperature", detected=True)
+        self.bus.dispatch("sensors:motion", foo=True)
+        self.assertEqual(self.joseph.tasks, [])
+
+    def test_existing_memory(self):
+        self.bus.dispatch("sensors:lux", value=10)
+        self.assertEqual(self.engine.get("sensors:lux", "value"), None)
+
+        self.engine.rule(self.dark)(lights_on)
+        self.bus.dispatch("sensors:lux", value=10)
+        self.assertEqual(len(self.joseph.tasks), 1)
+
+        self.engine.rule(Fact("sensors:lux", "value") < 20, name="darker")(heating_off)
+        self.assertTrue(self.engine.rules["darker"].active)
+
+    def test_operators(self):
+        self.engine.rule(Fact("house:mode", "name").is_in(("away", "night")))(lights_on)
+        self.engine.rule(Fact("sensors:lux", "value").test(lambda value: value % 2))(heating_off)
+
+        self.bus.dispatch("house:mode", name="night")
+        self.bus.dispatch("sensors:lux", value=3)
+        self.assertEqual([task for task, _ in self.joseph.calls], [lights_on, heating_off])
+
+    def test_type_errors(self):
+        self.engine.rule(self.dark)(lights_on)
+
+        self.bus.dispatch("sensors:lux", value=None)
+        self.assertEqual(self.joseph.tasks, [])
+
+    def test_container_values(self):
+        self.engine.rule(Fact("lights:scene", "colors") == ["red", "blue"])(lights_on)
+        self.engine.rule(Fact("lights:scene", "colors") == ("red", "blue"), name="tuple")(heating_off)
+        self.engine.rule(Fact("lights:scene", "levels") == {"hall": 1}, name="levels")(heating_off)
+
+        # Equal lists share a node, a tuple with the same items doesn't
+        self.assertEqual(len(self.engine.nodes), 3)
+        self.engine.rule(Fact("lights:scene", "colors") == ["red", "blue"], name="same")(heating_off)
+        self.assertEqual(len(self.engine.nodes), 3)
+
+        self.bus.dispatch("lights:scene", colors=["red", "blue"], levels={"hall": 1})
+        self.assertEqual(sorted(task.__name__ for task, _ in self.joseph.calls),
+                         ["heating_off", "heating_off", "lights_on"])
+
+        with self.assertRaises(TypeError):
+            Fact("lights:scene", "colors") == [bytearray()]
+
+    def test_queue_full(self):
+        self.engine.rule(self.motion)(lights_on)
+        self.engine.rule(self.motion, name="heating")(heating_off)
+
+        def full(calls):
+            raise QueueFull("The queue has room for 0 of the {} items".format(len(calls)))
+
+        self.joseph.add_tasks_nowait = full
+        with self.assertRaises(QueueFull):
+            self.bus.dispatch("sensors:motion", detected=True)
+        self.assertEqual(self.joseph.calls, [])
+        self.assertEqual([rule.active for rule in self.engine.rules.values()], [False, False])
+
+        del self.joseph.add_tasks_nowait
+        self.bus.dispatch("sensors:motion", detected=False)
+        self.bus.dispatch("sensors:motion", detected=True)
+        self.assertEqual([task for task, _ in self.joseph.calls], [lights_on, heating_off])
+
+    def test_remove_rule(self):
+        self.engine.rule(self.motion, self.dark)(lights_on)
+        self.engine.rule(Fact("sensors:motion", "detected") == True, name="motion")(heating_off)
+
+        self.engine.remove_rule("lights_on")
+        self.assertEqual(len(self.engine.nodes), 1)
+        self.assertNotIn("sensors:lux", self.engine.events)
+
+        with self.assertRaises(KeyError):
+            self.engine.remove_rule("lights_on")
+
+    def test_invalid_rules(self):
+        self.engine.rule(self.motion)(lights_on)
+
+        with self.assertRaises(ValueError):
+            self.engine.rule(self.dark)(lights_on)
+
+        with self.assertRaises(ValueError):
+            self.engine.rule()(heating_off)
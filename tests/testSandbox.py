@@ -0,0 +1,156 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from joseph.codec import encode_event
+from joseph.core import Joseph
+from joseph.events import Event, EventBus, Namespace
+from joseph.plugins import Manifest, PluginLoader
+from joseph.sandbox import SharedRing, shared_memory
+
+PLUGIN = """
+import os
+
+EVENTS = ['ping:*']
+SANDBOX = {'restart': True, 'backoff': 0.05}
+
+
+def setup(bus):
+    @bus.listen('ping:request')
+    def request(event):
+        bus.dispatch('pong:reply', value=event.value, pid=os.getpid())
+
+    @bus.listen('ping:crash')
+    def crash(event):
+        os._exit(3)
+"""
+
+
+@unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory is not available")
+class TestSharedRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedRing(size=256)
+
+    def tearDown(self):
+        self.ring.close(unlink=True)
+
+    def make_event(self, value):
+        return Event(Namespace("sensors"), "power", watts=value)
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_write_read(self):
+        for value in range(3):
+            self.assertTrue(self.ring.write(encode_event(self.make_event(value))))
+
+        attached = SharedRing(self.ring.name)
+        try:
+            self.assertEqual([event.watts for event in attached.read()], [0, 1, 2])
+            self.assertEqual(list(attached.read()), [])
+        finally:
+            attached.close()
+
+        self.assertEqual(len(self.ring), 0)
+
+    def test_full(self):
+        record = encode_event(self.make_event(1))
+        written = 0
+        while self.ring.write(record):
+            written += 1
+
+        self.assertEqual(written, self.ring.capacity // len(record))
+        self.assertEqual(len(list(self.ring.read())), written)
+        self.assertTrue(self.ring.write(record))
+
+    def test_wrap(self):
+        values = []
+        for value in range(100):
+            self.assertTrue(self.ring.write(encode_event(self.make_event(value))))
+            values.extend(event.watts for event in self.ring.read())
+
+        self.assertEqual(values, list(range(100)))
+
+
+@unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory is not available")
+class TestSandbox(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, "echo.py"), "w") as file:
+            file.write(PLUGIN)
+
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Joseph(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.joseph.workers = [self.loop.create_task(self.joseph.worker())]
+
+        self.replies = []
+        self.bus.listen("pong:reply")(self.replies.append)
+
+        self.loader = PluginLoader(self.bus, self.directory)
+        self.loader.scan()
+
+    def tearDown(self):
+        for name in list(self.loader.modules):
+            self.loader.unload(name)
+        for worker in self.joseph.workers:
+            worker.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def wait_for_replies(self, count, timeout=10.0):
+        async def wait():
+            while len(self.replies) < count:
+                await asyncio.sleep(0.01)
+
+        self.loop.run_until_complete(asyncio.wait_for(wait(), timeout))
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_manifest(self):
+        manifest = Manifest.read(self.directory, "echo.py")
+        self.assertEqual(manifest.sandbox, {'restart': True, 'backoff': 0.05})
+
+    def test_round_trip(self):
+        for value in range(100):
+            self.bus.dispatch("ping:request", value=value)
+        self.wait_for_replies(100)
+
+        sandbox = self.loader.modules["echo"]
+        self.assertEqual(sorted(event.value for event in self.replies), list(range(100)))
+        self.assertEqual({event.pid for event in self.replies}, {sandbox.process.pid})
+        self.assertNotEqual(sandbox.process.pid, os.getpid())
+        self.assertEqual(sandbox.dropped, 0)
+
+    def test_restart(self):
+        self.bus.dispatch("ping:request", value=1)
+        self.wait_for_replies(1)
+        sandbox = self.loader.modules["echo"]
+        pid = sandbox.process.pid
+
+        async def restarted():
+            while not sandbox.restarts or not sandbox.alive:
+                await asyncio.sleep(0.01)
+
+        self.bus.dispatch("ping:crash")
+        self.loop.run_until_complete(asyncio.wait_for(restarted(), 10.0))
+
+        self.bus.dispatch("ping:request", value=2)
+        self.wait_for_replies(2)
+
+        self.assertEqual(sandbox.restarts, 1)
+        self.assertNotEqual(self.replies[-1].pid, pid)
+
+    def test_unload(self):
+        self.bus.dispatch("ping:request", value=1)
+        self.wait_for_replies(1)
+        sandbox = self.loader.modules["echo"]
+
+        self.loader.unload("echo")
+        self.assertFalse(sandbox.alive)
+        self.assertEqual(list(self.bus.get_listeners(Event(Namespace("ping"), "request"))), [])
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import unittest
+
+from joseph.exceptions import QueueFull
+from joseph.scheduler import BLOCK, DROP_LOWEST, DROP_OLDEST, REJECT, Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.scheduler = Scheduler(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        del self.scheduler
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_priority(self):
+        self.scheduler.put_nowait("low", 9)
+        self.scheduler.put_nowait("high", 1)
+        self.scheduler.put_nowait("negative", -1)
+        self.scheduler.put_nowait("normal", 5)
+
+        self.assertEqual(len(self.scheduler), 4)
+        self.assertEqual(self.scheduler.get_nowait(), "negative")
+        self.assertEqual(self.scheduler.get_nowait(), "high")
+        self.assertEqual(self.scheduler.get_nowait(), "normal")
+        self.assertEqual(self.scheduler.get_nowait(), "low")
+        self.assertTrue(self.scheduler.empty())
+
+    def test_equal_priority(self):
+        # Unorderable items with the same priority should keep their order
+        items = [object() for _ in range(10)]
+        for item in items:
+            self.scheduler.put_nowait(item, 3)
+
+        self.assertEqual(self.scheduler.depth(3), 10)
+        self.assertEqual([self.scheduler.get_nowait() for _ in items], items)
+
+    def test_drain_nowait(self):
+        for item, priority in (("low", 9), ("high", 1), ("normal", 5), ("low again", 9)):
+            self.scheduler.put_nowait(item, priority)
+
+        self.assertEqual(self.scheduler.drain_nowait(), [(1, "high"), (5, "normal"), (9, "low"), (9, "low again")])
+        self.assertTrue(self.scheduler.empty())
+        self.scheduler.put_nowait("next", 3)
+        self.assertEqual(self.scheduler.get_nowait(), "next")
+
+    def test_get_nowait_empty(self):
+        with self.assertRaises(asyncio.QueueEmpty):
+            self.scheduler.get_nowait()
+
+    def test_get_waits(self):
+        async def consume():
+            return await self.scheduler.get()
+
+        task = self.loop.create_task(consume())
+        self.loop.call_soon(self.scheduler.put_nowait, "foo")
+
+        self.assertEqual(self.loop.run_until_complete(task), "foo")
+
+    def test_submit_threadsafe(self):
+        thread = threading.Thread(target=self.scheduler.submit_threadsafe, args=("foo", 1))
+        thread.start()
+        thread.join()
+
+        result = self.loop.run_until_complete(asyncio.wait_for(self.scheduler.get(), 1))
+        self.assertEqual(result, "foo")
+
+    def test_submit_threadsafe_full(self):
+        self.scheduler.limit(1, REJECT)
+        self.scheduler.put_nowait("foo")
+        futures = []
+        thread = threading.Thread(target=lambda: futures.append(self.scheduler.submit_threadsafe("bar")))
+        thread.start()
+        thread.join()
+
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertIsInstance(futures[0].exception(timeout=1), QueueFull)
+        self.assertEqual(self.scheduler.dropped, 1)
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.limit(10, "foo")
+
+    def test_reject(self):
+        self.scheduler.limit(2, REJECT)
+        self.scheduler.put_nowait("foo")
+        self.scheduler.put_nowait("bar")
+        self.assertTrue(self.scheduler.full())
+
+        with self.assertRaises(QueueFull):
+            self.scheduler.put_nowait("baz")
+        self.assertEqual(len(self.scheduler), 2)
+
+    def test_put_many(self):
+        self.scheduler.put_many_nowait([("low", 9), ("high", 1), ("same", 9)])
+        self.assertEqual([self.scheduler.get_nowait() for _ in range(3)], ["high", "low", "same"])
+
+        # A batch that doesn't fit is refused as a whole
+        self.scheduler.limit(2, REJECT)
+        self.scheduler.put_nowait("foo")
+        with self.assertRaises(QueueFull):
+            self.scheduler.put_many_nowait([("bar", 9), ("baz", 9)])
+        self.assertEqual(len(self.scheduler), 1)
+
+        self.scheduler.limit(2, DROP_OLDEST)
+        self.assertEqual(self.scheduler.put_many_nowait([("bar", 9), ("baz", 9)]), ["foo"])
+
+    def test_drop_oldest(self):
+        self.scheduler.limit(2, DROP_OLDEST)
+        self.scheduler.put_nowait("oldest", 1)
+        self.scheduler.put_nowait("old", 9)
+
+        self.assertEqual(self.scheduler.put_nowait("new", 9), "oldest")
+        self.assertEqual(self.scheduler.dropped, 1)
+        self.assertEqual([self.scheduler.get_nowait() for _ in range(2)], ["old", "new"])
+
+    def test_drop_lowest(self):
+        self.scheduler.limit(100, DROP_LOWEST)
+        for i in range(1000):
+            self.scheduler.put_nowait(i, 9 if i % 10 else 1)
+
+        self.assertEqual(len(self.scheduler), 100)
+        self.assertEqual(self.scheduler.depth(1), 100)
+        self.assertEqual(self.scheduler.dropped, 900)
+
+        # A new item with the lowest priority is dropped itself
+        self.assertEqual(self.scheduler.put_nowait("low", 1), "low")
+
+    def test_block(self):
+        self.scheduler.limit(1, BLOCK)
+        self.scheduler.put_nowait("foo")
+
+        with self.assertRaises(QueueFull):
+            self.scheduler.put_nowait("bar")
+
+        async def produce():
+            await self.scheduler.put("bar")
+
+        task = self.loop.create_task(produce())
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertFalse(task.done())
+
+        self.assertEqual(self.scheduler.get_nowait(), "foo")
+        self.loop.run_until_complete(task)
+        self.assertEqual(self.scheduler.get_nowait(), "bar")
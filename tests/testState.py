@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from joseph.events import EventBus
+from joseph.state import StateCache
+
+from tests.helpers import Recorder
+
+
+def listener(event):
+    pass
+
+
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.joseph = Recorder(self.loop)
+        self.bus = EventBus(self.joseph)
+        self.bus.state.set_state("RUNNING")
+        self.bus.listen("*:state_changed")(listener)
+
+        self.state = StateCache(self.bus)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def changes(self) -> list:
+        return [(event.entity, event.attribute, event.value, event.previous) for event in self.joseph.tasks]
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_untracked(self):
+        self.bus.dispatch("sensors:kitchen", temperature=20)
+
+        self.assertEqual(self.joseph.tasks, [])
+        self.assertIsNone(self.state.get("sensors", "kitchen", "temperature"))
+
+    def test_changes_only(self):
+        self.state.track("sensors")
+
+        for temperature in (20, 20, 21, 21, 21, 20):
+            self.bus.dispatch("sensors:kitchen", temperature=temperature)
+
+        self.assertEqual(self.changes(), [("kitchen", "temperature", 20, None), ("kitchen", "temperature", 21, 20),
+                                          ("kitchen", "temperature", 20, 21)])
+        self.assertEqual(str(self.joseph.tasks[0]), "sensors:state_changed")
+        self.assertEqual(self.state.suppressed, 3)
+
+    def test_deadband(self):
+        self.state.track("sensors", deadband={"temperature": 0.5})
+
+        for temperature in (20.0, 20.3, 20.5, 19.6, 20.6, 20.2):
+            self.bus.dispatch("sensors:kitchen", temperature=temperature, door="closed")
+
+        self.assertEqual(self.changes(), [("kitchen", "temperature", 20.0, None), ("kitchen", "door", "closed", None),
+                                          ("kitchen", "temperature", 20.6, 20.0)])
+
+        # Reads return the latest value, not the last reported one
+        self.assertEqual(self.state.get("sensors", "kitchen", "temperature"), 20.2)
+
+    def test_entity_key(self):
+        self.state.track("lights", entity_key="light")
+
+        self.bus.dispatch("lights:switched", light="porch", on=True)
+        self.bus.dispatch("lights:switched", light="hall", on=False)
+        self.bus.dispatch("lights:switched", light="porch", on=True)
+        self.bus.dispatch("lights:switched", on=True)
+
+        self.assertEqual(self.changes(), [("porch", "on", True, None), ("hall", "on", False, None)])
+        self.assertEqual(self.state.entity("lights", "porch"), {"on": True})
+        self.assertIn(("lights", "hall", "on"), self.state)
+        self.assertEqual(len(self.state), 2)
+
+    def test_listen_to_attribute(self):
+        self.state.track("sensors")
+        self.bus.unlisten(listener)
+        self.bus.listen("sensors:state_changed", entity="hall", attribute="lux")(listener)
+
+        self.bus.dispatch("sensors:hall", lux=10, motion=True)
+        self.bus.dispatch("sensors:kitchen", lux=10)
+
+        self.assertEqual(self.changes(), [("hall", "lux", 10, None)])
+
+    def test_retrack(self):
+        self.state.track("sensors")
+        self.bus.dispatch("sensors:kitchen", temperature=20)
+        self.state.track("sensors", deadband=1)
+        self.bus.dispatch("sensors:kitchen", temperature=21)
+
+        self.assertEqual(len(self.joseph.tasks), 1)
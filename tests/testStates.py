@@ -1,7 +1,8 @@
+import asyncio
 import unittest
 
 from joseph.exceptions import InvalidState
-from joseph.utils import State
+from joseph.utils import State, StateMachine
 
 
 class TestState(unittest.TestCase):
@@ -82,3 +83,67 @@ class TestState(unittest.TestCase):
         self.assertEqual(self.state, "STARTING")
         self.assertTrue(self.state == "STARTING")
         self.assertFalse(self.state == True)
+
+
+class TestStateMachine(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.state = StateMachine('STOPPED', loop=self.loop)
+        self.calls = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_test(self):
+        self.assertTrue(True)
+
+    def test_transitions(self):
+        self.state.set_state('STARTING')
+        self.state.set_state('RUNNING')
+        self.state.set_state('RUNNING')
+        self.assertEqual(self.state, 'RUNNING')
+        self.assertEqual(self.state.current_index, 2)
+
+        with self.assertRaises(InvalidState):
+            self.state.set_state('STARTING')
+        with self.assertRaises(InvalidState):
+            self.state.set_state('FOOBAR')
+        self.assertEqual(self.state, 'RUNNING')
+
+        # Without a table every transition is allowed
+        state = StateMachine(transitions={}, states=('A', 'B'))
+        state.set_state('B')
+        state.set_state('A')
+        self.assertEqual(state, 'A')
+
+        # The default table is meant for the default states only
+        with self.assertRaises(InvalidState):
+            StateMachine(states=('A', 'B'))
+
+    def test_hooks(self):
+        self.state.on_exit('STOPPED', lambda *states: self.calls.append(('exit',) + states))
+        self.state.on_enter('STARTING', lambda *states: self.calls.append(('enter',) + states))
+        self.state.on_transition(lambda *states: self.calls.append(('transition',) + states))
+
+        @self.state.on_transition
+        def fail(previous, state):
+            raise RuntimeError
+
+        with self.assertLogs('joseph.utils.states', 'ERROR'):
+            self.state.set_state('STARTING')
+
+        self.assertEqual(self.state, 'STARTING')
+        self.assertEqual(self.calls, [('exit', 'STOPPED', 'STARTING'), ('enter', 'STOPPED', 'STARTING'),
+                                      ('transition', 'STOPPED', 'STARTING')])
+
+    def test_wait_for(self):
+        async def test():
+            self.assertEqual(await self.state.wait_for('STOPPED'), 'STOPPED')
+
+            running = self.state.wait_for('RUNNING')
+            self.loop.call_soon(self.state.set_state, 'STARTING')
+            self.loop.call_later(0.01, self.state.set_state, 'RUNNING')
+            return await asyncio.wait_for(running, 1)
+
+        self.assertEqual(self.loop.run_until_complete(test()), 'RUNNING')
+        self.assertEqual(self.state.waiters, {})